@@ -4,4 +4,5 @@ from .models import *
 admin.site.register(Profile)
 admin.site.register(Instances)
 admin.site.register(Ports)
-admin.site.register(Missions)
\ No newline at end of file
+admin.site.register(Missions)
+admin.site.register(PresetMod)
\ No newline at end of file
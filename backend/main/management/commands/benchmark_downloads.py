@@ -0,0 +1,118 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from time import perf_counter
+from unittest import mock
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from main.modpreset.workshop_manifest import directory_size
+from main.steamcmd.mods_download import download_mods
+from main.utils.config import config
+from main.utils.timing import PhaseTimer
+
+FAKE_STEAMCMD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'tests', 'fake_steamcmd')
+BENCHMARK_CACHES = {'default': {'BACKEND': 'main.management.commands.benchmark_downloads.LockingLocMemCache', 'LOCATION': 'download-benchmark'}}
+
+
+class LockingLocMemCache(LocMemCache):
+    """A local memory cache with the lock() of django-redis, enough for the single benchmark process."""
+    _locks = {}
+    _locks_guard = threading.Lock()
+
+    def lock(self, key: str, timeout: float = None, **kwargs) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(self.make_key(key), threading.Lock())
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the mod download pipeline end to end against a fake SteamCMD.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mods', type=int, default=50, help='The number of mods to download.')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1], help='The SteamCMD worker counts to compare.')
+        parser.add_argument('--batch-size', type=int, default=10, help='The number of mods in one batch.')
+        parser.add_argument('--mod-size', type=int, default=4 * 1024 * 1024, help='The size of every mod in bytes.')
+        parser.add_argument('--files-per-mod', type=int, default=8, help='The number of PBO files in every mod.')
+        parser.add_argument('--login-latency', type=float, default=1.0, help='Seconds a login takes.')
+        parser.add_argument('--item-latency', type=float, default=0.2, help='Seconds before an item starts downloading.')
+        parser.add_argument('--bandwidth', type=int, default=50 * 1024 * 1024, help='Download speed of one SteamCMD process in bytes per second, 0 for unlimited.')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Probability of an item failing.')
+        parser.add_argument('--rate-limit-after', type=int, default=0, help='Items after which SteamCMD returns 84, 0 to disable.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random failures.')
+
+    def handle(self, *args, **options):
+        for workers in options['workers']:
+            result = self.run_benchmark(workers, options)
+            phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in result['phases'].items())
+            self.stdout.write(
+                f"workers={workers} downloaded={result['downloaded']}/{options['mods']} "
+                f"time={result['elapsed']:.2f}s mods/min={result['mods_per_minute']:.1f} "
+                f"MiB/s={result['bytes_per_second'] / (1024 * 1024):.2f} | {phases}"
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
+
+    def run_benchmark(self, workers: int, options: dict) -> dict:
+        """Runs download_mods once with the given number of workers.
+
+        Args:
+            workers (int): The number of SteamCMD workers.
+            options (dict): The command options.
+
+        Returns:
+            dict: The number of downloaded mods, the elapsed time, the throughput and the time per phase.
+        """
+        base_dir = tempfile.mkdtemp(prefix='download_benchmark_')
+        try:
+            mods_dir = os.path.join(base_dir, 'mods')
+            fake_settings_path = os.path.join(base_dir, 'fake_steamcmd.json')
+            with open(fake_settings_path, 'w') as file:
+                json.dump({
+                    'login_latency': options['login_latency'],
+                    'item_latency': options['item_latency'],
+                    'bandwidth': options['bandwidth'],
+                    'mod_size': options['mod_size'],
+                    'files_per_mod': options['files_per_mod'],
+                    'failure_rate': options['failure_rate'],
+                    'rate_limit_after': options['rate_limit_after'],
+                    'seed': options['seed'],
+                }, file)
+            overrides = {
+                'paths': {
+                    'steamcmd': FAKE_STEAMCMD_DIR,
+                    'mods_directory': mods_dir,
+                    'download_directory': os.path.join(base_dir, 'downloads'),
+                    'logs_directory': os.path.join(base_dir, 'logs'),
+                },
+                'steam_auth': {'username': 'benchmark', 'password': 'benchmark', 'shared_secret': ''},
+                'download': {**config.get('download', {}), 'max_workers': workers},
+            }
+            mods = [str(1000000 + index) for index in range(options['mods'])]
+            timer = PhaseTimer()
+
+            # A local cache keeps the benchmark away from the shared rate limit and in-flight state and
+            # still provides the locks, the fake mods are unknown to the workshop so their sizes are provided directly
+            with mock.patch.dict(config.config, overrides), \
+                    mock.patch.dict(os.environ, {'FAKE_STEAMCMD_CONFIG': fake_settings_path}), \
+                    mock.patch('main.steamcmd.mods_download.fetch_workshop_details', return_value={
+                        wid: {'size': options['mod_size'], 'time_updated': 0} for wid in mods
+                    }), \
+                    override_settings(CACHES=BENCHMARK_CACHES):
+                cache.clear()  # Every run starts without the rate limits of the previous one
+                start = perf_counter()
+                failed_mods = download_mods(mods_to_download=mods, name='benchmark', logger=None, lim=options['batch_size'], timer=timer) or []
+                elapsed = perf_counter() - start
+
+            downloaded = len(mods) - len(failed_mods)
+            return {
+                'downloaded': downloaded,
+                'elapsed': elapsed,
+                'mods_per_minute': downloaded / elapsed * 60 if elapsed else 0.0,
+                'bytes_per_second': directory_size(mods_dir) / elapsed if elapsed else 0.0,
+                'phases': dict(timer.totals),
+            }
+        finally:
+            shutil.rmtree(base_dir, ignore_errors=True)
@@ -0,0 +1,112 @@
+import os
+import random
+import tempfile
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from main.modpreset.preset_extraction import extract_links, extract_workshop_ids, parse_preset
+
+PRESET_HEADER = '''<?xml version="1.0" encoding="utf-8"?>
+<html>
+  <!--Created by Arma 3 Launcher: https://arma3.com-->
+  <head>
+    <meta name="arma:Type" content="preset" />
+    <meta name="arma:PresetName" content="Benchmark" />
+    <title>Arma 3</title>
+  </head>
+  <body>
+    <h1>Arma 3  - Preset <strong>Benchmark</strong></h1>
+    <div class="mod-list">
+      <table>
+'''
+MOD_ROW = '''        <tr data-type="ModContainer">
+          <td data-type="DisplayName">Mod {wid}</td>
+          <td>
+            <span class="from-steam">Steam</span>
+          </td>
+          <td>
+            <a href="https://steamcommunity.com/sharedfiles/filedetails/?id={wid}" data-type="Link">https://steamcommunity.com/sharedfiles/filedetails/?id={wid}</a>
+          </td>
+        </tr>
+'''
+LOCAL_ROW = '''        <tr data-type="ModContainer">
+          <td data-type="DisplayName">@local_{index}</td>
+          <td>
+            <span class="from-local">Local</span>
+          </td>
+          <td>
+            <span data-type="Link">local_{index}</span>
+          </td>
+        </tr>
+'''
+DLC_HEADER = '''      </table>
+    </div>
+    <div class="dlc-list">
+      <table>
+'''
+DLC_ROW = '''        <tr data-type="DlcContainer">
+          <td data-type="DisplayName">DLC {appid}</td>
+          <td>
+            <a href="https://store.steampowered.com/app/{appid}" data-type="Link">https://store.steampowered.com/app/{appid}</a>
+          </td>
+        </tr>
+'''
+PRESET_FOOTER = '''      </table>
+    </div>
+  </body>
+</html>
+'''
+
+
+class Command(BaseCommand):
+    help = 'Compares the streaming preset parser with the legacy regex parser on a synthetic launcher preset.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mods', type=int, default=5000, help='The number of workshop mods in the preset.')
+        parser.add_argument('--repeat', type=int, default=10, help='The number of runs of each parser.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated workshop IDs.')
+
+    def write_preset(self, path: str, mods: int, seed: int) -> None:
+        """Writes a launcher preset with workshop mods, a few duplicates, local mods and DLCs."""
+        rng = random.Random(seed)
+        wids = [str(rng.randint(400000000, 3500000000)) for _ in range(mods)]
+        with open(path, 'w') as file:
+            file.write(PRESET_HEADER)
+            for index, wid in enumerate(wids):
+                file.write(MOD_ROW.format(wid=wid))
+                if index % 500 == 0:
+                    file.write(MOD_ROW.format(wid=wids[0]))  # Duplicate rows happen in hand-edited presets
+                    file.write(LOCAL_ROW.format(index=index))
+            file.write(DLC_HEADER)
+            for appid in ('1021790', '1175380', '1681170'):
+                file.write(DLC_ROW.format(appid=appid))
+            file.write(PRESET_FOOTER)
+
+    def time_parser(self, parse: callable, repeat: int) -> tuple[float, list[str]]:
+        """Returns the best time of a parser over the runs and its result."""
+        best = None
+        for _ in range(repeat):
+            start = perf_counter()
+            result = parse()
+            elapsed = perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'preset.html')
+            self.write_preset(path, options['mods'], options['seed'])
+            size = os.path.getsize(path)
+
+            legacy_time, legacy_ids = self.time_parser(lambda: extract_workshop_ids(extract_links(path)), options['repeat'])
+            streaming_time, preset = self.time_parser(lambda: parse_preset(path), options['repeat'])
+
+        if list(dict.fromkeys(legacy_ids)) != preset['workshop_ids']:
+            self.stderr.write(self.style.ERROR('The parsers returned different workshop IDs'))
+            return
+        self.stdout.write(f"Preset: {options['mods']} mods, {size / 1024:.0f} KiB")
+        self.stdout.write(f"Legacy:    {legacy_time * 1000:8.2f} ms, {len(legacy_ids)} IDs with duplicates")
+        self.stdout.write(
+            f"Streaming: {streaming_time * 1000:8.2f} ms, {len(preset['workshop_ids'])} IDs, "
+            f"{len(preset['local_mods'])} local mods, {len(preset['dlcs'])} DLCs"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Streaming parser is {legacy_time / streaming_time:.2f}x the speed of the legacy parser"))
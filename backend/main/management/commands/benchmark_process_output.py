@@ -0,0 +1,72 @@
+import contextlib
+import os
+import subprocess
+import sys
+import threading
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from main.utils.process_output import OutputMultiplexer, stream_process_output
+
+# Writes lines alternately to stdout and stderr, like a server logging warnings between its output
+CHILD_SCRIPT = '''
+import sys
+line = "x" * {line_length}
+for i in range({lines}):
+    (sys.stdout if i % 2 else sys.stderr).write(f"{{i}} {{line}}\\n")
+'''
+
+
+class Command(BaseCommand):
+    help = 'Compares the lines per second of the threaded process output reader with the multiplexed one.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=10, help='The number of processes writing output at once.')
+        parser.add_argument('--lines', type=int, default=100000, help='The number of lines every process writes.')
+        parser.add_argument('--line-length', type=int, default=80, help='The length of every line.')
+
+    def _spawn(self, options: dict, text: bool) -> list[subprocess.Popen]:
+        script = CHILD_SCRIPT.format(lines=options['lines'], line_length=options['line_length'])
+        return [
+            subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=text, bufsize=1 if text else -1)
+            for _ in range(options['processes'])
+        ]
+
+    def run_threaded(self, options: dict) -> tuple[int, float, int]:
+        received = []
+        start = perf_counter()
+        processes = self._spawn(options, text=True)
+        threads = [threading.Thread(target=stream_process_output, args=(process, received.append)) for process in processes]
+        # The threaded reader prints every line, the console output is discarded but still paid for
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for thread in threads:
+                thread.start()
+            peak_threads = threading.active_count()
+            for thread in threads:
+                thread.join()
+        return len(received), perf_counter() - start, peak_threads
+
+    def run_multiplexed(self, options: dict) -> tuple[int, float, int]:
+        received = []
+        multiplexer = OutputMultiplexer()
+        closed = threading.Semaphore(0)
+        start = perf_counter()
+        processes = self._spawn(options, text=False)
+        for process in processes:
+            multiplexer.add(process, log_callback=received.append, on_close=closed.release, decode=False)
+        peak_threads = threading.active_count()
+        for _ in processes:
+            closed.acquire()
+        for process in processes:
+            process.wait()
+        return len(received), perf_counter() - start, peak_threads
+
+    def handle(self, *args, **options):
+        expected = options['processes'] * options['lines']
+        for name, run in (('threaded', self.run_threaded), ('multiplexed', self.run_multiplexed)):
+            base_threads = threading.active_count()
+            lines, elapsed, peak_threads = run(options)
+            self.stdout.write(
+                f"{name:>11}: {lines}/{expected} lines in {elapsed:.2f}s, {lines / elapsed:,.0f} lines/s, "
+                f"{peak_threads - base_threads} reader threads"
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
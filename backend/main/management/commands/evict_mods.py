@@ -0,0 +1,40 @@
+import datetime
+import os
+from django.core.management.base import BaseCommand
+from main.modpreset.eviction import evict_mods, plan_eviction
+from main.modpreset.readiness import refresh_readiness
+from main.utils.config import config
+
+
+def _gb(size: int) -> str:
+    return f"{size / 1024 ** 3:.2f} GB"
+
+
+class Command(BaseCommand):
+    help = 'Evicts mods no instance preset references, least recently used first, while the mods directory is over its quota.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the reclaimable space and the mods that would be evicted.')
+        parser.add_argument('--quota-gb', type=float, default=None, help='The quota in GB. Defaults to download.mods_quota_gb from the config.')
+
+    def handle(self, *args, **options):
+        mods_dir = config.get("paths.mods_directory", "")
+        if not os.path.isdir(mods_dir):
+            self.stderr.write(self.style.ERROR(f'Mods directory {mods_dir} does not exist'))
+            return
+        quota_gb = options['quota_gb'] if options['quota_gb'] is not None else config.get("download.mods_quota_gb", 0)
+        plan = plan_eviction(mods_dir, int(quota_gb * 1024 ** 3))
+
+        self.stdout.write(f"Mods directory: {_gb(plan['total_bytes'])}, quota: {_gb(plan['quota_bytes']) if quota_gb else 'none'}")
+        self.stdout.write(f"Unreferenced mods: {len(plan['unreferenced'])}, reclaimable: {_gb(plan['reclaimable_bytes'])}")
+        for mod in plan['unreferenced']:
+            last_used = datetime.datetime.fromtimestamp(mod['last_used']).strftime('%Y-%m-%d %H:%M')
+            marker = '*' if mod in plan['to_evict'] else ' '
+            self.stdout.write(f" {marker} {mod['wid']:>12}  {_gb(mod['size']):>10}  last used {last_used}")
+
+        if options['dry_run']:
+            self.stdout.write(f"Would evict {len(plan['to_evict'])} mods (marked with *), freeing {_gb(plan['freed_bytes'])}")
+            return
+        evicted = evict_mods([mod['wid'] for mod in plan['to_evict']], mods_dir, log_callback=self.stdout.write)
+        refresh_readiness(wids=evicted, mods_dir=mods_dir)
+        self.stdout.write(self.style.SUCCESS(f'Evicted {len(evicted)} mods'))
@@ -0,0 +1,30 @@
+import os
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from main.modpreset.workshop_manifest import ModManifestStore
+from main.utils.config import config
+from main.workaround.modsrenamer import lowercase_mods
+
+
+class Command(BaseCommand):
+    help = 'Lowercases the addons directories of all installed mods, skipping mods that are already normalized.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mods-dir', default=None, help='The mods directory. Defaults to paths.mods_directory from the config.')
+        parser.add_argument('--workers', type=int, default=None, help='The number of threads. Defaults to the number of CPUs, at most 8.')
+        parser.add_argument('--force', action='store_true', help='Lowercase every mod even if its marker is up to date.')
+
+    def handle(self, *args, **options):
+        mods_dir = options['mods_dir'] or config.get("paths.mods_directory", "")
+        if not os.path.isdir(mods_dir):
+            self.stderr.write(self.style.ERROR(f'Mods directory {mods_dir} does not exist'))
+            return
+
+        wids = [entry.name for entry in os.scandir(mods_dir) if entry.is_dir() and entry.name.isdigit()]
+        start = perf_counter()
+        walked = lowercase_mods(wids, mods_dir, store=ModManifestStore(mods_dir), force=options['force'], max_workers=options['workers'])
+        elapsed = perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Normalized {len(walked)} of {len(wids)} mods in {elapsed:.2f}s, {len(wids) - len(walked)} were skipped'
+        ))
@@ -0,0 +1,38 @@
+import asyncio
+import signal
+import psutil
+from django.core.management.base import BaseCommand
+from main.models import Instances
+from main.serverhandling.supervisor import ServerSupervisor
+
+
+def mark_server_exited(instance_id: int, pid: int, returncode: int) -> None:
+    # Filtering by PID leaves the instance alone if it was started again in the meantime
+    Instances.objects.filter(id=instance_id, pid=pid).update(is_running=False, pid=None)
+
+
+class Command(BaseCommand):
+    help = 'Runs the supervisor that starts and stops game servers, writes their output to the instance logs and tracks their exits.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=None, help='The unix socket to listen on. Defaults to paths.supervisor_socket from the config.')
+
+    def handle(self, *args, **options):
+        # Servers of a previous supervisor lost their output pipe, only their bookkeeping is cleaned up
+        for instance in Instances.objects.filter(is_running=True):
+            if not instance.pid or not psutil.pid_exists(instance.pid):
+                mark_server_exited(instance.id, instance.pid, None)
+                self.stdout.write(f"Instance {instance.name} is no longer running")
+
+        supervisor = ServerSupervisor(socket_path=options['socket'], on_exit=mark_server_exited, log_callback=self.stdout.write)
+        asyncio.run(self._run(supervisor))
+
+    async def _run(self, supervisor: ServerSupervisor) -> None:
+        task = asyncio.create_task(supervisor.serve_forever())
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, task.cancel)
+        try:
+            await task
+        except asyncio.CancelledError:
+            self.stdout.write(self.style.SUCCESS('Supervisor stopped'))
@@ -0,0 +1,35 @@
+import os
+from django.core.management.base import BaseCommand
+from main.modpreset.integrity import record_file_lists, verify_mods
+from main.modpreset.workshop_manifest import ModManifestStore
+from main.utils.config import config
+
+
+class Command(BaseCommand):
+    help = 'Verifies installed mods against the file lists recorded in their manifests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('wids', nargs='*', help='The workshop IDs to verify. Defaults to all installed mods.')
+        parser.add_argument('--mods-dir', default=None, help='The mods directory. Defaults to paths.mods_directory from the config.')
+        parser.add_argument('--deep', action='store_true', help='Also compare the content hashes, hashing files in parallel.')
+        parser.add_argument('--record', action='store_true', help='Record file lists for mods that have none, without verifying them.')
+        parser.add_argument('--hash', action='store_true', help='Store content hashes when recording file lists.')
+
+    def handle(self, *args, **options):
+        mods_dir = options['mods_dir'] or config.get("paths.mods_directory", "")
+        if not os.path.isdir(mods_dir):
+            self.stderr.write(self.style.ERROR(f'Mods directory {mods_dir} does not exist'))
+            return
+
+        wids = options['wids'] or [entry.name for entry in os.scandir(mods_dir) if entry.is_dir() and entry.name.isdigit()]
+        if options['record']:
+            store = ModManifestStore(mods_dir)
+            unrecorded = [wid for wid in wids if "files" not in (store.get(wid) or {})]
+            record_file_lists(unrecorded, mods_dir, hash_files=options['hash'], log_callback=self.stdout.write)
+            return
+
+        broken = verify_mods(wids, mods_dir, deep=options['deep'], log_callback=self.stdout.write)
+        if broken:
+            self.stderr.write(self.style.ERROR(f'Broken mods: {", ".join(broken)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No broken mods found'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_alter_instances_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresetMod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('workshop_id', models.CharField(db_index=True, max_length=20)),
+                ('position', models.PositiveIntegerField()),
+                ('instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='preset_mods', to='main.instances')),
+            ],
+            options={
+                'ordering': ['position'],
+                'constraints': [models.UniqueConstraint(fields=('instance', 'workshop_id'), name='unique_preset_mod')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+import os
+import re
+from django.conf import settings
+from django.db import migrations
+
+WORKSHOP_LINK_PATTERN = re.compile(r'<a href="https?://[^"]*\?id=(\d+)[^"]*"')
+
+
+def populate_preset_mods(apps, schema_editor):
+    """Stores the workshop IDs of the presets uploaded before they were stored at upload."""
+    Instances = apps.get_model('main', 'Instances')
+    PresetMod = apps.get_model('main', 'PresetMod')
+    for instance in Instances.objects.all():
+        if not instance.preset:
+            continue
+        path = os.path.join(settings.MEDIA_ROOT, instance.preset.name)
+        if not path.endswith('.html') or not os.path.exists(path):
+            continue
+        with open(path, 'r', errors='replace') as file:
+            workshop_ids = list(dict.fromkeys(WORKSHOP_LINK_PATTERN.findall(file.read())))
+        PresetMod.objects.bulk_create(
+            PresetMod(instance=instance, workshop_id=wid, position=position)
+            for position, wid in enumerate(workshop_ids)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_presetmod'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_preset_mods, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 import os
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.base_user import BaseUserManager
+from .modpreset.preset_extraction import preset_parser
+from .utils.log_sink import delete_log
 
 class ProfileManager(BaseUserManager):
     def create_user(self, username, password, **extra_fields):
@@ -58,12 +60,45 @@ class Instances(models.Model):
 
     def __str__(self):
         return self.name
+
+    def refresh_preset_mods(self, log_callback: callable = None) -> list[str]:
+        """Parses the preset file and stores its workshop IDs in the PresetMod table.
+
+        Args:
+            log_callback (callable, optional): A callback function for logging. Defaults to None.
+
+        Returns:
+            list[str]: The workshop IDs of the preset in load order.
+        """
+        workshop_ids = []
+        if self.preset and os.path.exists(self.preset.path):
+            workshop_ids = list(dict.fromkeys(preset_parser(self.preset.path, log_callback=log_callback)))
+        with transaction.atomic():
+            self.preset_mods.all().delete()
+            PresetMod.objects.bulk_create(
+                PresetMod(instance=self, workshop_id=wid, position=position)
+                for position, wid in enumerate(workshop_ids)
+            )
+        return workshop_ids
+
+    def workshop_ids(self) -> list[str]:
+        """Returns the workshop IDs of the preset stored at upload.
+
+        Presets uploaded before the IDs were stored are parsed once and stored on first use.
+
+        Returns:
+            list[str]: The workshop IDs of the preset in load order.
+        """
+        workshop_ids = list(self.preset_mods.values_list('workshop_id', flat=True))
+        if not workshop_ids:
+            workshop_ids = self.refresh_preset_mods()
+        return workshop_ids
     
     def delete(self, *args, **kwargs):
         if self.preset and os.path.exists(self.preset.path):
             os.remove(self.preset.path)
-        if self.log_file and os.path.exists(self.log_file.path):
-            os.remove(self.log_file.path)
+        if self.log_file:
+            delete_log(self.log_file.path)
         if self.start_file_path and os.path.exists(self.start_file_path):
             os.remove(self.start_file_path)
         if self.port:
@@ -71,6 +106,20 @@ class Instances(models.Model):
             self.port.save()
         super().delete(*args, **kwargs)
     
+class PresetMod(models.Model):
+    instance = models.ForeignKey(Instances, on_delete=models.CASCADE, related_name='preset_mods')
+    workshop_id = models.CharField(max_length=20, db_index=True)
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['instance', 'workshop_id'], name='unique_preset_mod'),
+        ]
+
+    def __str__(self):
+        return f"{self.instance.name}: {self.workshop_id}"
+
 class Ports(models.Model):
     port_number = models.IntegerField(unique=True)
     is_available = models.BooleanField(default=True)
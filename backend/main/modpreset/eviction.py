@@ -0,0 +1,124 @@
+import os
+import shutil
+from collections import Counter
+from time import time
+from django.db.models import Count
+from ..models import Instances, PresetMod
+from ..steamcmd.inflight import is_in_flight
+from .workshop_manifest import ModManifestStore, directory_size
+
+
+def referenced_mods() -> Counter:
+    """Counts how many instance presets reference each workshop ID.
+
+    Returns:
+        Counter: Workshop IDs mapped to the number of presets referencing them.
+    """
+    # Presets uploaded before their IDs were stored are parsed first, so their mods are not evicted
+    for instance in Instances.objects.filter(preset_mods__isnull=True):
+        instance.workshop_ids()
+    return Counter({
+        row['workshop_id']: row['references']
+        for row in PresetMod.objects.values('workshop_id').annotate(references=Count('instance'))
+    })
+
+def mark_mods_used(wids: list[str], mods_dir: str) -> None:
+    """Records that mods were just used by a starting server.
+
+    Args:
+        wids (list[str]): The workshop IDs of the mods.
+        mods_dir (str): The directory where mods are installed.
+    """
+    store = ModManifestStore(mods_dir)
+    now = time()
+    for wid in wids:
+        if os.path.isdir(os.path.join(mods_dir, str(wid))):
+            store.update(wid, last_used=now)
+
+def _mod_size(wid: str, mods_dir: str, manifest: dict) -> int:
+    if "files" in manifest:
+        return sum(item["size"] for item in manifest["files"].values())
+    if "size" in manifest:
+        return manifest["size"]
+    return directory_size(os.path.join(mods_dir, str(wid)))
+
+def _last_used(wid: str, mods_dir: str, manifest: dict) -> float:
+    if "last_used" in manifest or "installed_at" in manifest:
+        return manifest.get("last_used", manifest.get("installed_at"))
+    try:
+        return os.path.getmtime(os.path.join(mods_dir, str(wid)))
+    except OSError:
+        return 0.0
+
+def plan_eviction(mods_dir: str, quota_bytes: int) -> dict:
+    """Plans which unreferenced mods to evict to bring the mods directory under the quota.
+
+    Mods no instance preset references are evicted in least recently used order, mods used
+    by a preset or being downloaded are never evicted.
+
+    Args:
+        mods_dir (str): The directory where mods are installed.
+        quota_bytes (int): The maximum size of the mods directory in bytes, 0 to only report.
+
+    Returns:
+        dict: The total size, the reclaimable size and the unreferenced mods, and the mods to evict
+            with the number of bytes they free.
+    """
+    store = ModManifestStore(mods_dir)
+    references = referenced_mods()
+    total = 0
+    unreferenced = []
+    for entry in os.scandir(mods_dir):
+        if not entry.is_dir() or not entry.name.isdigit():
+            continue
+        manifest = store.get(entry.name) or {}
+        size = _mod_size(entry.name, mods_dir, manifest)
+        total += size
+        if references[entry.name] == 0 and not is_in_flight(entry.name):
+            unreferenced.append({"wid": entry.name, "size": size, "last_used": _last_used(entry.name, mods_dir, manifest)})
+    unreferenced.sort(key=lambda mod: mod["last_used"])
+
+    to_evict = []
+    freed = 0
+    if quota_bytes:
+        for mod in unreferenced:
+            if total - freed <= quota_bytes:
+                break
+            to_evict.append(mod)
+            freed += mod["size"]
+    return {
+        "total_bytes": total,
+        "quota_bytes": quota_bytes,
+        "reclaimable_bytes": sum(mod["size"] for mod in unreferenced),
+        "unreferenced": unreferenced,
+        "to_evict": to_evict,
+        "freed_bytes": freed,
+    }
+
+def evict_mods(wids: list[str], mods_dir: str, log_callback: callable = None) -> list[str]:
+    """Deletes mods and their manifests from the mods directory.
+
+    Args:
+        wids (list[str]): The workshop IDs of the mods to delete.
+        mods_dir (str): The directory where mods are installed.
+        log_callback (callable, optional): A callback function for logging. Defaults to None.
+
+    Returns:
+        list[str]: The workshop IDs of the deleted mods.
+    """
+    store = ModManifestStore(mods_dir)
+    evicted = []
+    for wid in wids:
+        if is_in_flight(wid):
+            continue  # Claimed for download since the plan was made
+        try:
+            shutil.rmtree(os.path.join(mods_dir, str(wid)))
+        except OSError as e:
+            if log_callback:
+                log_callback(f"Failed to evict mod {wid}: {e}")
+            continue
+        store.delete(wid)
+        evicted.append(wid)
+    if log_callback:
+        log_callback(f"Evicted {len(evicted)} unused mods: {evicted}")
+    return evicted
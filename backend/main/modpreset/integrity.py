@@ -0,0 +1,142 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from .workshop_manifest import ModManifestStore
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_workers() -> int:
+    return os.cpu_count() or 1
+
+def hash_file(path: str) -> str:
+    """Calculates the SHA-1 hash of a file.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        str: The hex digest of the file content.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_file_list(mod_path: str, hash_files: bool = False) -> dict:
+    """Lists all files of a mod with their sizes and modification times.
+
+    Args:
+        mod_path (str): The directory of the mod.
+        hash_files (bool, optional): Whether to add the SHA-1 hash of every file. Files are hashed in parallel,
+            hashlib releases the GIL while hashing so threads use all cores. Defaults to False.
+
+    Returns:
+        dict: Paths relative to the mod directory mapped to their size, modification time and optional hash.
+    """
+    files = {}
+    stack = [mod_path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat()
+                    files[os.path.relpath(entry.path, mod_path)] = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+    if hash_files and files:
+        paths = list(files)
+        with ThreadPoolExecutor(max_workers=_hash_workers(), thread_name_prefix="hash") as executor:
+            for path, digest in zip(paths, executor.map(lambda path: hash_file(os.path.join(mod_path, path)), paths)):
+                files[path]["sha1"] = digest
+    return files
+
+def record_file_lists(wids: list[str], mods_dir: str, hash_files: bool = False, log_callback: callable = None) -> None:
+    """Stores the file lists of installed mods in their manifests.
+
+    Args:
+        wids (list[str]): The workshop IDs of the mods.
+        mods_dir (str): The directory where mods are installed.
+        hash_files (bool, optional): Whether to store the SHA-1 hash of every file. Defaults to False.
+        log_callback (callable, optional): A callback function for logging. Defaults to None.
+    """
+    store = ModManifestStore(mods_dir)
+    for wid in wids:
+        mod_path = os.path.join(mods_dir, str(wid))
+        if not os.path.isdir(mod_path):
+            continue
+        store.update(wid, files=build_file_list(mod_path, hash_files=hash_files))
+    if log_callback:
+        log_callback(f"Recorded file lists for {len(wids)} mods{' with hashes' if hash_files else ''}.")
+
+def verify_mod(wid: str, mods_dir: str, deep: bool = False, store: ModManifestStore = None) -> list[str] | None:
+    """Compares an installed mod with the file list recorded in its manifest.
+
+    The quick check compares sizes and modification times. The deep check also hashes the files
+    in parallel and compares the hashes, if the manifest has them.
+
+    Args:
+        wid (str): The workshop ID of the mod.
+        mods_dir (str): The directory where mods are installed.
+        deep (bool, optional): Whether to compare the content hashes. Defaults to False.
+        store (ModManifestStore, optional): The manifest store. Defaults to the store of the mods directory.
+
+    Returns:
+        list[str] | None: The problems found, None if the mod has no recorded file list.
+    """
+    store = store or ModManifestStore(mods_dir)
+    expected = (store.get(wid) or {}).get("files")
+    if expected is None:
+        return None
+    mod_path = os.path.join(mods_dir, str(wid))
+    if not os.path.isdir(mod_path):
+        return ["mod directory is missing"]
+
+    actual = build_file_list(mod_path)
+    problems = []
+    for path, recorded in expected.items():
+        current = actual.get(path)
+        if current is None:
+            problems.append(f"missing {path}")
+        elif current["size"] != recorded["size"]:
+            problems.append(f"size of {path} is {current['size']} instead of {recorded['size']}")
+        elif current["mtime"] != recorded["mtime"] and not (deep and "sha1" in recorded):
+            problems.append(f"{path} was modified")
+    for path in actual.keys() - expected.keys():
+        problems.append(f"unexpected {path}")
+
+    if deep:
+        to_hash = [path for path, recorded in expected.items() if "sha1" in recorded and path in actual and actual[path]["size"] == recorded["size"]]
+        with ThreadPoolExecutor(max_workers=_hash_workers(), thread_name_prefix="hash") as executor:
+            for path, digest in zip(to_hash, executor.map(lambda path: hash_file(os.path.join(mod_path, path)), to_hash)):
+                if digest != expected[path]["sha1"]:
+                    problems.append(f"content of {path} does not match")
+    return problems
+
+def verify_mods(wids: list[str], mods_dir: str, deep: bool = False, log_callback: callable = None) -> dict:
+    """Verifies installed mods against their recorded file lists.
+
+    Args:
+        wids (list[str]): The workshop IDs of the mods.
+        mods_dir (str): The directory where mods are installed.
+        deep (bool, optional): Whether to compare the content hashes. Defaults to False.
+        log_callback (callable, optional): A callback function for logging. Defaults to None.
+
+    Returns:
+        dict: Workshop IDs of the broken mods mapped to their problems.
+    """
+    store = ModManifestStore(mods_dir)
+    broken = {}
+    unverified = []
+    for wid in wids:
+        problems = verify_mod(wid, mods_dir, deep=deep, store=store)
+        if problems is None:
+            unverified.append(wid)
+        elif problems:
+            broken[wid] = problems
+            if log_callback:
+                log_callback(f"Mod {wid} is broken: {'; '.join(problems[:5])}{'...' if len(problems) > 5 else ''}")
+    if log_callback:
+        log_callback(f"Verified {len(wids) - len(unverified)} mods, {len(broken)} broken, {len(unverified)} without a file list.")
+    return broken
@@ -0,0 +1,139 @@
+import os
+from threading import Lock
+from .workshop_manifest import ModManifestStore
+
+
+class ModInventory:
+    def __init__(self, mods_dir: str) -> None:
+        """Keeps the set of installed mods of a mods directory in memory.
+
+        The directory is listed once and listed again only when its modification time changes, which
+        happens whenever a mod directory is added, removed or replaced. Manifests are reloaded the same
+        way when the manifests directory changes. Lookups are set lookups without touching the disk.
+
+        Args:
+            mods_dir (str): The directory where mods are installed.
+        """
+        self.mods_dir = mods_dir
+        self.store = ModManifestStore(mods_dir)
+        self._mods = {}
+        self._dir_mtime = None
+        self._manifests_mtime = None
+        self._manifest_mtimes = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _mtime(path: str) -> int | None:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self) -> None:
+        """Updates the inventory with the mods added or removed since the last refresh."""
+        with self._lock:
+            dir_mtime = self._mtime(self.mods_dir)
+            if dir_mtime != self._dir_mtime:
+                self._dir_mtime = dir_mtime
+                installed = set()
+                if dir_mtime is not None:
+                    with os.scandir(self.mods_dir) as entries:
+                        installed = {entry.name for entry in entries if entry.name.isdigit() and entry.is_dir()}
+                for wid in set(self._mods) - installed:
+                    del self._mods[wid]
+                for wid in installed - set(self._mods):
+                    self._mods[wid] = self._entry(wid)
+
+            manifests_mtime = self._mtime(self.store.manifests_dir)
+            if manifests_mtime != self._manifests_mtime:
+                self._manifests_mtime = manifests_mtime
+                self._reload_manifests()
+
+    def _reload_manifests(self) -> None:
+        """Reloads the manifests that changed since they were last read."""
+        manifest_mtimes = {}
+        if self._manifests_mtime is not None:
+            with os.scandir(self.store.manifests_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".json"):
+                        manifest_mtimes[entry.name[:-len(".json")]] = entry.stat().st_mtime_ns
+        for wid in self._mods:
+            if manifest_mtimes.get(wid) != self._manifest_mtimes.get(wid):
+                self._mods[wid] = self._entry(wid)
+        self._manifest_mtimes = manifest_mtimes
+
+    def _entry(self, wid: str) -> dict:
+        """Builds the inventory entry of an installed mod from its manifest.
+
+        Args:
+            wid (str): The workshop ID of the mod.
+
+        Returns:
+            dict: The size recorded at download time, None without a manifest, and whether the mod has a
+                manifest. The size is not measured on disk.
+        """
+        manifest = self.store.get(wid)
+        return {"size": (manifest or {}).get("size"), "has_manifest": manifest is not None}
+
+    def is_installed(self, wid: str) -> bool:
+        """Checks whether a mod is installed.
+
+        Args:
+            wid (str): The workshop ID of the mod.
+
+        Returns:
+            bool: True if the mod directory exists.
+        """
+        self.refresh()
+        return str(wid) in self._mods
+
+    def get(self, wid: str) -> dict | None:
+        """Returns the inventory entry of a mod.
+
+        Args:
+            wid (str): The workshop ID of the mod.
+
+        Returns:
+            dict | None: The recorded size of the mod and whether it has a manifest, None if it is not installed.
+        """
+        self.refresh()
+        return self._mods.get(str(wid))
+
+    def missing(self, wids: list[str]) -> list[str]:
+        """Returns the mods that are not installed.
+
+        Args:
+            wids (list[str]): The workshop IDs to check.
+
+        Returns:
+            list[str]: The workshop IDs of the mods that are not installed, in the given order.
+        """
+        self.refresh()
+        return [wid for wid in wids if str(wid) not in self._mods]
+
+    def installed(self) -> set[str]:
+        """Returns the workshop IDs of all installed mods.
+
+        Returns:
+            set[str]: The workshop IDs.
+        """
+        self.refresh()
+        return set(self._mods)
+
+
+_inventories = {}
+_inventories_lock = Lock()
+
+def get_mod_inventory(mods_dir: str) -> ModInventory:
+    """Returns the inventory of a mods directory, shared within the process.
+
+    Args:
+        mods_dir (str): The directory where mods are installed.
+
+    Returns:
+        ModInventory: The inventory of the directory.
+    """
+    with _inventories_lock:
+        if mods_dir not in _inventories:
+            _inventories[mods_dir] = ModInventory(mods_dir)
+        return _inventories[mods_dir]
@@ -1,5 +1,5 @@
 import os
-
+from .inventory import get_mod_inventory
 
 
 def mod_path(mods_dir: str, wid: str, log_callback: callable = None) -> str:
@@ -21,6 +21,9 @@ def mod_path(mods_dir: str, wid: str, log_callback: callable = None) -> str:
 def check_installed(wids: list, mods_dir: str, log_callback: callable = None) -> tuple:
     """Check if mods are installed.
 
+    The check is answered from the in-memory mod inventory, which lists the mods directory
+    again only when it changed.
+
     Args:
         wids (list): List of workshop IDs to check.
         mods_dir (str): Directory where mods are installed.
@@ -30,16 +33,10 @@ def check_installed(wids: list, mods_dir: str, log_callback: callable = None) ->
         tuple: A tuple containing two lists - the first with paths to installed mods,
             and the second with workshop IDs of mods to download.
     """
-    mod_paths = []
-    mods_to_download = []
-    for wid in wids:
-        mod_dir = mod_path(mods_dir, wid, log_callback)
-        mod_paths.append(mod_dir)
-        if os.path.exists(mod_dir):
-            if log_callback:
-                log_callback(f"Mod {wid} already installed in {mods_dir}. Skipping download.")
-        else:
-            mods_to_download.append(wid)
-            if log_callback:
-                log_callback(f"Mod {wid} not found in {mods_dir}. Marking for download.")
-    return mod_paths, mods_to_download
\ No newline at end of file
+    mod_paths = [os.path.join(mods_dir, str(wid)) for wid in wids]
+    mods_to_download = get_mod_inventory(mods_dir).missing(wids)
+    if log_callback:
+        log_callback(f"{len(wids) - len(mods_to_download)} of {len(wids)} mods already installed in {mods_dir}.")
+        if mods_to_download:
+            log_callback(f"Mods not found in {mods_dir}, marking for download: {mods_to_download}")
+    return mod_paths, mods_to_download
@@ -36,6 +36,110 @@ def extract_workshop_ids(links: list[str], log_callback: callable = None) -> lis
         log_callback(f'Extracted workshop ids from links: {workshop_ids}')
     return workshop_ids
 
+PRESET_CHUNK_SIZE = 64 * 1024
+ROW_MARKERS = ("DlcContainer", "from-local")
+# Workshop links are the only thing most of a preset contains, the literal prefix keeps this scan fast
+WORKSHOP_LINK_PATTERN = re.compile(r'href="[^"?]*\?(?:[^"&]*&)*id=(\d+)')
+PRESET_TOKEN_PATTERN = re.compile(
+    r'<(?:tr\b[^>]*?data-type="(\w+)"'
+    r'|a\b[^>]*?href="(?:[^"?]*\?(?:[^"&]*&)*id=(\d+)|https?://store\.steampowered\.com/app/(\d+))'
+    r'|span\b[^>]*?class="from-(local)"'
+    r'|td\b[^>]*?data-type="DisplayName"[^>]*>([^<]*)<)'
+)
+
+
+class _PresetScanner:
+    def __init__(self) -> None:
+        """Collects the contents of a launcher preset from consecutive pieces of whole rows."""
+        self.workshop_ids = {}
+        self.dlcs = []
+        self.local_mods = []
+
+    def _scan_links(self, text: str) -> None:
+        workshop_ids = self.workshop_ids
+        for wid in WORKSHOP_LINK_PATTERN.findall(text):
+            if wid not in workshop_ids:
+                workshop_ids[wid] = None
+
+    def _scan_row(self, text: str) -> None:
+        row_type, row_name, row_local, row_linked = None, None, False, False
+        for token_row_type, wid, dlc, local, name in PRESET_TOKEN_PATTERN.findall(text):
+            if token_row_type:
+                row_type = token_row_type
+            elif wid:
+                self.workshop_ids.setdefault(wid, None)
+                row_linked = True
+            elif dlc:
+                if row_type == "DlcContainer":
+                    self.dlcs.append(dlc)
+            elif local:
+                row_local = True
+            else:
+                row_name = name
+        if row_type == "ModContainer" and row_local and not row_linked and row_name:
+            self.local_mods.append(row_name.strip())
+
+    def feed(self, text: str) -> None:
+        """Scans a piece of the preset made of whole rows.
+
+        Most rows only need their workshop link, which a single fast regex finds for the whole piece.
+        Only DLC and local mod rows are tokenized.
+
+        Args:
+            text (str): The piece of the preset.
+        """
+        position = 0
+        while True:
+            markers = [index for index in (text.find(marker, position) for marker in ROW_MARKERS) if index >= 0]
+            if not markers:
+                self._scan_links(text[position:])
+                return
+            marker = min(markers)
+            row_start = text.rfind("<tr", position, marker)
+            row_start = position if row_start < 0 else row_start
+            row_end = text.find("<tr", marker)
+            row_end = len(text) if row_end < 0 else row_end
+            self._scan_links(text[position:row_start])
+            self._scan_row(text[row_start:row_end])
+            position = row_end
+
+    def close(self) -> dict:
+        """Returns the collected contents.
+
+        Returns:
+            dict: The workshop IDs in load order without duplicates, the app IDs of the DLCs and the names of the local mods.
+        """
+        return {"workshop_ids": list(self.workshop_ids), "dlcs": self.dlcs, "local_mods": self.local_mods}
+
+def parse_preset(file_path: str, chunk_size: int = PRESET_CHUNK_SIZE) -> dict:
+    """Parse an Arma 3 launcher preset export in a single streaming pass.
+
+    The file is read in chunks and every chunk is scanned once, up to the last row that starts in it,
+    so no row is split between pieces. Mod rows give workshop IDs, DLC rows give app IDs, and mod
+    rows marked as local without a workshop link give the names of local mods.
+
+    Args:
+        file_path (str): The path to the HTML file.
+        chunk_size (int, optional): The number of characters read at once. Defaults to 64 KiB.
+
+    Returns:
+        dict: The workshop IDs in load order without duplicates, the app IDs of the DLCs and the names of the local mods.
+    """
+    scanner = _PresetScanner()
+    buffer = ""
+    has_rows = False
+    with open(file_path, 'r', errors='replace') as file:
+        while chunk := file.read(chunk_size):
+            buffer += chunk
+            has_rows = has_rows or "<tr" in buffer
+            # Presets without rows, like hand-written link lists, are cut before their last link instead
+            split = buffer.rfind("<tr", 1) if has_rows else buffer.rfind("<a ", 1)
+            if split > 0:
+                scanner.feed(buffer[:split])
+                buffer = buffer[split:]
+    scanner.feed(buffer)
+    return scanner.close()
+
 def preset_parser(file_path: str, log_callback: callable = None) -> list[str]:
     """Parse a preset HTML file and extract workshop IDs.
 
@@ -44,7 +148,7 @@ def preset_parser(file_path: str, log_callback: callable = None) -> list[str]:
         log_callback (callable, optional): The logging callback function. Defaults to None.
 
     Returns:
-        list[str]: A list of extracted workshop IDs.
+        list[str]: A list of extracted workshop IDs in load order, without duplicates.
     """
     if log_callback:
         log_callback(f'Parsing preset file: {file_path}')
@@ -52,6 +156,25 @@ def preset_parser(file_path: str, log_callback: callable = None) -> list[str]:
         if log_callback:
             log_callback('File is not an HTML file, returning empty list.')
         return []
-    links = extract_links(file_path, log_callback=log_callback)
-    workshop_ids = extract_workshop_ids(links, log_callback=log_callback)
-    return workshop_ids
\ No newline at end of file
+    preset = parse_preset(file_path)
+    if log_callback:
+        log_callback(f'Extracted workshop ids from preset: {preset["workshop_ids"]}')
+        if preset["dlcs"]:
+            log_callback(f'Preset requires DLCs: {preset["dlcs"]}')
+        if preset["local_mods"]:
+            log_callback(f'Preset contains local mods that cannot be downloaded: {preset["local_mods"]}')
+    return preset["workshop_ids"]
+
+def diff_workshop_ids(old: list[str], new: list[str]) -> tuple[list[str], list[str]]:
+    """Compare the workshop IDs of two presets.
+
+    Args:
+        old (list[str]): The workshop IDs of the previous preset.
+        new (list[str]): The workshop IDs of the new preset.
+
+    Returns:
+        tuple[list[str], list[str]]: The added workshop IDs in the order of the new preset,
+            and the removed workshop IDs in the order of the old preset.
+    """
+    old_set, new_set = set(old), set(new)
+    return [wid for wid in new if wid not in old_set], [wid for wid in old if wid not in new_set]
@@ -0,0 +1,45 @@
+from ..models import Instances, PresetMod
+from ..utils.config import config
+from .inventory import get_mod_inventory
+
+
+def refresh_readiness(wids: list[str] = None, instance_ids: list[int] = None, mods_dir: str = None) -> list[int]:
+    """Recomputes the readiness of the instances that depend on the given mods.
+
+    The PresetMod table is the index from workshop ID to the instances needing the mod, and the
+    mod inventory answers which mods are installed, so no preset file or mod directory is read.
+    Only instances whose readiness changed are written, in a single bulk update.
+
+    Args:
+        wids (list[str], optional): The workshop IDs of the installed or removed mods. Defaults to None.
+        instance_ids (list[int], optional): The IDs of instances to recompute. Defaults to None.
+            When neither wids nor instance_ids are given, all instances are recomputed.
+        mods_dir (str, optional): The directory where mods are installed. Defaults to paths.mods_directory from the config.
+
+    Returns:
+        list[int]: The IDs of the instances whose readiness changed.
+    """
+    instances = Instances.objects.all()
+    if wids is not None or instance_ids is not None:
+        affected = set(instance_ids or [])
+        if wids:
+            affected.update(PresetMod.objects.filter(workshop_id__in=wids).values_list('instance_id', flat=True).distinct())
+        if not affected:
+            return []
+        instances = instances.filter(id__in=affected)
+    instances = list(instances.only('id', 'is_ready'))
+
+    installed = get_mod_inventory(mods_dir or config.get("paths.mods_directory", "")).installed()
+    missing = set()
+    for instance_id, wid in PresetMod.objects.filter(instance__in=instances).values_list('instance_id', 'workshop_id'):
+        if wid not in installed:
+            missing.add(instance_id)
+
+    changed = []
+    for instance in instances:
+        is_ready = instance.id not in missing
+        if instance.is_ready != is_ready:
+            instance.is_ready = is_ready
+            changed.append(instance)
+    Instances.objects.bulk_update(changed, ['is_ready'])
+    return [instance.id for instance in changed]
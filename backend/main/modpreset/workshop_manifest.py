@@ -0,0 +1,246 @@
+import json
+import os
+import re
+from time import time
+import requests
+
+APPID = 107410  # Arma 3 appid
+WORKSHOP_DETAILS_URL = "https://api.steampowered.com/ISteamRemoteStorage/GetPublishedFileDetails/v1/"
+VDF_TOKEN_PATTERN = re.compile(r'"((?:[^"\\]|\\.)*)"|([{}])')
+
+
+def parse_vdf(text: str) -> dict:
+    """Parse a Valve KeyValues (VDF/ACF) document.
+
+    Args:
+        text (str): The content of the document.
+
+    Returns:
+        dict: The parsed document, nested sections become dictionaries.
+    """
+    root = {}
+    stack = [root]
+    key = None
+    for match in VDF_TOKEN_PATTERN.finditer(text):
+        string, brace = match.groups()
+        if brace == "{":
+            section = {}
+            stack[-1][key] = section
+            stack.append(section)
+            key = None
+        elif brace == "}":
+            if len(stack) > 1:
+                stack.pop()
+        elif key is None:
+            key = string
+        else:
+            stack[-1][key] = string
+            key = None
+    return root
+
+def read_workshop_acf(install_dir: str, appid: int = APPID) -> dict:
+    """Read the installed items from the SteamCMD workshop manifest of an install directory.
+
+    Args:
+        install_dir (str): The directory SteamCMD installed the workshop items into.
+        appid (int, optional): The app ID of the game. Defaults to the Arma 3 appid.
+
+    Returns:
+        dict: Workshop IDs mapped to their size, update timestamp and manifest ID.
+    """
+    acf_path = os.path.join(install_dir, "steamapps", "workshop", f"appworkshop_{appid}.acf")
+    if not os.path.exists(acf_path):
+        return {}
+    with open(acf_path, 'r', errors='replace') as file:
+        document = parse_vdf(file.read())
+    installed = document.get("AppWorkshop", {}).get("WorkshopItemsInstalled", {})
+    return {
+        wid: {
+            "size": int(item.get("size", 0)),
+            "time_updated": int(item.get("timeupdated", 0)),
+            "manifest": item.get("manifest", ""),
+        }
+        for wid, item in installed.items() if isinstance(item, dict)
+    }
+
+def fetch_workshop_details(wids: list[str], chunk_size: int = 100, log_callback: callable = None) -> dict:
+    """Fetch the current size and update timestamp of workshop items from the Steam Web API.
+
+    Args:
+        wids (list[str]): The workshop IDs to look up.
+        chunk_size (int, optional): The number of items requested at once. Defaults to 100.
+        log_callback (callable, optional): A callback function for logging. Defaults to None.
+
+    Returns:
+        dict: Workshop IDs mapped to their size and update timestamp. Items that could not be looked up are omitted.
+    """
+    details = {}
+    for i in range(0, len(wids), chunk_size):
+        chunk = wids[i:i + chunk_size]
+        data = {"itemcount": len(chunk)}
+        for index, wid in enumerate(chunk):
+            data[f"publishedfileids[{index}]"] = wid
+        try:
+            response = requests.post(WORKSHOP_DETAILS_URL, data=data, timeout=30)
+            response.raise_for_status()
+            items = response.json().get("response", {}).get("publishedfiledetails", [])
+        except (requests.RequestException, ValueError) as e:
+            if log_callback:
+                log_callback(f"Failed to fetch workshop details: {e}")
+            continue
+        for item in items:
+            if item.get("result") != 1:
+                continue
+            details[str(item["publishedfileid"])] = {
+                "size": int(item.get("file_size", 0)),
+                "time_updated": int(item.get("time_updated", 0)),
+            }
+    return details
+
+def directory_size(path: str) -> int:
+    """Calculate the total size of all files in a directory.
+
+    Args:
+        path (str): The directory to measure.
+
+    Returns:
+        int: The total size in bytes.
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+class ModManifestStore:
+    def __init__(self, mods_dir: str) -> None:
+        """Keeps one small JSON manifest per installed mod.
+
+        The manifests are stored in a hidden directory inside the mods directory, so they move
+        together with the mods.
+
+        Args:
+            mods_dir (str): The directory where mods are installed.
+        """
+        self.mods_dir = mods_dir
+        self.manifests_dir = os.path.join(mods_dir, ".manifests")
+
+    def _path(self, wid: str) -> str:
+        return os.path.join(self.manifests_dir, f"{wid}.json")
+
+    def get(self, wid: str) -> dict | None:
+        """Returns the manifest of a mod.
+
+        Args:
+            wid (str): The workshop ID of the mod.
+
+        Returns:
+            dict | None: The manifest, None if the mod has none.
+        """
+        try:
+            with open(self._path(wid), 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, wid: str, manifest: dict) -> None:
+        """Stores the manifest of a mod.
+
+        Args:
+            wid (str): The workshop ID of the mod.
+            manifest (dict): The manifest to store.
+        """
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        tmp_path = f"{self._path(wid)}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(manifest, file)
+        os.replace(tmp_path, self._path(wid))
+
+    def update(self, wid: str, **fields) -> dict:
+        """Merges fields into the manifest of a mod.
+
+        Args:
+            wid (str): The workshop ID of the mod.
+            **fields: The fields to set.
+
+        Returns:
+            dict: The updated manifest.
+        """
+        manifest = self.get(wid) or {"wid": str(wid)}
+        manifest.update(fields)
+        self.save(wid, manifest)
+        return manifest
+
+    def delete(self, wid: str) -> None:
+        """Removes the manifest of a mod.
+
+        Args:
+            wid (str): The workshop ID of the mod.
+        """
+        try:
+            os.remove(self._path(wid))
+        except FileNotFoundError:
+            pass
+
+def record_downloaded_mods(install_dir: str, wids: list[str], mods_dir: str, log_callback: callable = None) -> None:
+    """Store manifests for freshly downloaded mods from the SteamCMD workshop manifest.
+
+    Args:
+        install_dir (str): The directory SteamCMD installed the workshop items into.
+        wids (list[str]): The workshop IDs of the downloaded mods.
+        mods_dir (str): The directory where mods are installed.
+        log_callback (callable, optional): A callback function for logging. Defaults to None.
+    """
+    installed = read_workshop_acf(install_dir)
+    store = ModManifestStore(mods_dir)
+    for wid in wids:
+        item = installed.get(str(wid))
+        if item is None:
+            continue
+        store.update(wid, **item, installed_at=time())
+    if log_callback:
+        log_callback(f"Recorded workshop manifests for {len([wid for wid in wids if str(wid) in installed])} mods.")
+
+def check_outdated(wids: list[str], mods_dir: str, log_callback: callable = None) -> list[str]:
+    """Find installed mods that are outdated or incomplete.
+
+    The update timestamps and sizes recorded at download time are compared with the current workshop
+    details, nothing is measured on disk. Files damaged after the download are caught by verify_mods().
+    Mods without a manifest cannot be checked and are queued for download again.
+
+    Args:
+        wids (list[str]): The workshop IDs of the installed mods to check.
+        mods_dir (str): The directory where mods are installed.
+        log_callback (callable, optional): A callback function for logging. Defaults to None.
+
+    Returns:
+        list[str]: The workshop IDs of the mods that should be downloaded again.
+    """
+    store = ModManifestStore(mods_dir)
+    details = fetch_workshop_details(list(wids), log_callback=log_callback)
+    outdated = []
+    for wid in wids:
+        remote = details.get(str(wid))
+        if remote is None:
+            continue
+        manifest = store.get(wid)
+        if manifest is None or "size" not in manifest:
+            outdated.append(wid)
+            if log_callback:
+                log_callback(f"Mod {wid} has no manifest, its version is unknown. Marking for download.")
+            continue
+        files = manifest.get("files")
+        recorded_size = sum(entry["size"] for entry in files.values()) if files else manifest["size"]
+        if recorded_size < remote["size"]:
+            outdated.append(wid)
+            if log_callback:
+                log_callback(f"Mod {wid} is incomplete ({recorded_size}/{remote['size']} bytes). Marking for download.")
+        elif manifest.get("time_updated", 0) < remote["time_updated"]:
+            outdated.append(wid)
+            if log_callback:
+                log_callback(f"Mod {wid} has an update on the workshop. Marking for download.")
+    return outdated
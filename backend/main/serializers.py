@@ -72,11 +72,20 @@ class Profiles_moderatorPanelSerializer(serializers.ModelSerializer):
 class ConfigSerializer(serializers.Serializer):
     paths = serializers.DictField(child=serializers.CharField(), required=True)
     steam_auth = serializers.DictField(child=serializers.CharField(allow_blank=True), required=True)
+    download = serializers.DictField(child=serializers.IntegerField(min_value=0), required=False)
     
     def validate_paths(self, value):
         # Place for validation logic in the future
         return value
     
+    def validate_download(self, value):
+        max_workers = value.get('max_workers')
+        if max_workers is not None and max_workers < 1:
+            raise serializers.ValidationError({
+                'max_workers': ["Liczba równoległych pobierań musi wynosić co najmniej 1"]
+            })
+        return value
+    
     def validate_steam_auth(self, value):
         # Validate shared_secret if provided
         shared_secret = value.get('shared_secret', '')
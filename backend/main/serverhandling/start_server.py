@@ -1,7 +1,6 @@
-import os
 import subprocess
-import threading
-from ..utils.process_output import stream_process_output
+from ..utils.log_sink import BufferedLogSink
+from ..utils.process_output import output_multiplexer
 
 
 def start_server(arma3_dir: str, start_file_path: str, log_file_path: str) -> subprocess.Popen:
@@ -23,27 +22,10 @@ def start_server(arma3_dir: str, start_file_path: str, log_file_path: str) -> su
         stdout=subprocess.PIPE, 
         stderr=subprocess.PIPE,
         cwd=arma3_dir,  # Set working directory to Arma 3 directory
-        text=True,
-        bufsize=1,
-        universal_newlines=True,
     )
     
-    def active_log_callback(line: str) -> None:
-            try:
-                os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
-                
-                with open(log_file_path, 'a', encoding='utf-8') as log_file:
-                    log_file.write(line)
-                    log_file.flush()
-            except Exception as e:
-                raise e
-    
-    # Start streaming process output in a separate thread
-    output_thread = threading.Thread(
-        target=stream_process_output,
-        args=(process, active_log_callback),
-        daemon=True  # Thread will die when main program exits
-    )
-    output_thread.start()
+    # All servers started here share the reader thread of the output multiplexer
+    log_sink = BufferedLogSink(log_file_path)
+    output_multiplexer.add(process, log_callback=log_sink.write, on_close=log_sink.close, decode=False)
     
     return process
\ No newline at end of file
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import os
+import signal
+import tempfile
+from time import time
+from ..utils.config import config
+from ..utils.log_sink import BufferedLogSink
+
+DEFAULT_SOCKET_NAME = "servermanager-supervisor.sock"
+STOP_TIMEOUT = 30
+LINE_LIMIT = 1024 * 1024
+
+
+def supervisor_socket_path() -> str:
+    """Returns the path of the unix socket the supervisor listens on.
+
+    Returns:
+        str: paths.supervisor_socket from the config, or a socket in the temporary directory.
+    """
+    return config.get("paths.supervisor_socket", "") or os.path.join(tempfile.gettempdir(), DEFAULT_SOCKET_NAME)
+
+
+class ManagedServer:
+    def __init__(self, instance_id: int, process: asyncio.subprocess.Process, log_file_path: str):
+        """A game server process owned by the supervisor.
+
+        Args:
+            instance_id (int): The ID of the instance the server belongs to.
+            process (asyncio.subprocess.Process): The server process.
+            log_file_path (str): The path to the log file the output is appended to.
+        """
+        self.instance_id = instance_id
+        self.process = process
+        self.log_file_path = log_file_path
+        self.started_at = time()
+        self.exited_at = None
+        self.lines = 0
+        self.exited = asyncio.Event()
+        self.task = None
+
+    def state(self) -> dict:
+        return {
+            "instance_id": self.instance_id,
+            "pid": self.process.pid,
+            "running": self.process.returncode is None,
+            "returncode": self.process.returncode,
+            "started_at": self.started_at,
+            "exited_at": self.exited_at,
+            "lines": self.lines,
+        }
+
+
+class ServerSupervisor:
+    def __init__(self, socket_path: str = None, on_exit: callable = None, log_callback: callable = None):
+        """Owns all game server processes and serves start, stop and status commands over a unix socket.
+
+        Every server runs in its own session so it can be signalled as a process group. Its stdout and
+        stderr are merged into one pipe, read by a coroutine and buffered into the instance log, so
+        any number of servers share a single event loop. Exits are reaped by the asyncio child watcher,
+        which waits on a pidfd where the kernel supports it and falls back to waitpid otherwise.
+
+        The protocol is one JSON object per line in both directions. A request names a command and its
+        parameters, a response has "ok" and either the result or an "error".
+
+        Args:
+            socket_path (str, optional): The unix socket to listen on. Defaults to supervisor_socket_path().
+            on_exit (callable, optional): Called with the instance ID, the PID and the return code when a
+                server exits. It runs in a thread, so it may block. Defaults to None.
+            log_callback (callable, optional): A callback function for logging. Defaults to None.
+        """
+        self.socket_path = socket_path or supervisor_socket_path()
+        self.on_exit = on_exit
+        self.log_callback = log_callback
+        self.servers: dict[int, ManagedServer] = {}
+        self._server = None
+
+    def _log(self, message: str) -> None:
+        if self.log_callback:
+            self.log_callback(message)
+
+    async def serve_forever(self) -> None:
+        """Listens on the socket until cancelled, then stops all servers."""
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)  # Left behind by a supervisor that did not shut down cleanly
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        # The socket is created accessible to the owner only, there is no window before a chmod
+        old_umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        finally:
+            os.umask(old_umask)
+        self._log(f"Supervisor listening on {self.socket_path}")
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            await self.shutdown()
+
+    async def shutdown(self) -> None:
+        """Stops all running servers and removes the socket."""
+        running = [instance_id for instance_id, server in self.servers.items() if server.process.returncode is None]
+        if running:
+            self._log(f"Stopping {len(running)} servers before shutdown")
+            await asyncio.gather(*(self.stop_server(instance_id) for instance_id in running), return_exceptions=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    response = {"ok": True, **await self.dispatch(request.pop("command", None), **request)}
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, command: str, **params) -> dict:
+        """Runs a command received over the socket.
+
+        Args:
+            command (str): One of "start", "stop", "status" and "ping".
+            **params: The parameters of the command.
+
+        Returns:
+            dict: The result of the command.
+        """
+        if command == "start":
+            return await self.start_server(**params)
+        if command == "stop":
+            return await self.stop_server(**params)
+        if command == "status":
+            return self.status(**params)
+        if command == "ping":
+            return {"pid": os.getpid(), "servers": len(self.servers)}
+        raise ValueError(f"Unknown command: {command}")
+
+    async def start_server(self, instance_id: int, start_file_path: str, arma3_dir: str, log_file_path: str) -> dict:
+        """Starts a game server and begins appending its output to the log file.
+
+        Args:
+            instance_id (int): The ID of the instance.
+            start_file_path (str): The path to the server start file.
+            arma3_dir (str): The Arma 3 directory, used as the working directory.
+            log_file_path (str): The path to the log file.
+
+        Returns:
+            dict: The state of the started server.
+        """
+        current = self.servers.get(instance_id)
+        if current and current.process.returncode is None:
+            raise RuntimeError(f"Server of instance {instance_id} is already running with PID {current.process.pid}")
+
+        os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
+        process = await asyncio.create_subprocess_exec(
+            start_file_path,
+            cwd=arma3_dir,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True,
+            limit=LINE_LIMIT,
+        )
+        server = ManagedServer(instance_id, process, log_file_path)
+        self.servers[instance_id] = server
+        server.task = asyncio.create_task(self._supervise(server), name=f"server-{instance_id}")
+        self._log(f"Started server of instance {instance_id} with PID {process.pid}")
+        return server.state()
+
+    @staticmethod
+    async def _read_line(stream: asyncio.StreamReader) -> bytes:
+        """Reads the next line of output, a line over LINE_LIMIT is returned in pieces instead of raising.
+
+        Args:
+            stream (asyncio.StreamReader): The output of the server.
+
+        Returns:
+            bytes: The line, empty at the end of the output.
+        """
+        try:
+            return await stream.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            return e.partial  # The last line without a newline
+        except asyncio.LimitOverrunError as e:
+            return await stream.readexactly(e.consumed)
+
+    async def _supervise(self, server: ManagedServer) -> None:
+        # The pipe is drained no matter what, a full pipe would block the server on its next write
+        sink = BufferedLogSink(server.log_file_path, log_callback=self.log_callback)
+        write_failed = False
+        try:
+            while line := await self._read_line(server.process.stdout):
+                try:
+                    sink.write(line.rstrip())
+                except Exception as e:
+                    if not write_failed:
+                        self._log(f"Failed to write the output of instance {server.instance_id}: {e}")
+                    write_failed = True
+                    continue
+                write_failed = False
+                server.lines += 1
+        except Exception as e:
+            self._log(f"Failed to read the output of instance {server.instance_id}, discarding the rest: {e}")
+            while await server.process.stdout.read(LINE_LIMIT):
+                pass
+        finally:
+            try:
+                sink.close()
+            except Exception as e:
+                self._log(f"Failed to close the log of instance {server.instance_id}: {e}")
+        returncode = await server.process.wait()
+        server.exited_at = time()
+        server.exited.set()
+        self._log(f"Server of instance {server.instance_id} (PID {server.process.pid}) exited with code {returncode}")
+        if self.on_exit:
+            try:
+                await asyncio.to_thread(self.on_exit, server.instance_id, server.process.pid, returncode)
+            except Exception as e:
+                self._log(f"Exit callback failed for instance {server.instance_id}: {e}")
+
+    async def stop_server(self, instance_id: int, timeout: float = STOP_TIMEOUT) -> dict:
+        """Stops a game server, terminating its process group and killing it after a timeout.
+
+        Args:
+            instance_id (int): The ID of the instance.
+            timeout (float, optional): Seconds to wait after SIGTERM before SIGKILL. Defaults to STOP_TIMEOUT.
+
+        Returns:
+            dict: The state of the stopped server.
+        """
+        server = self.servers.get(instance_id)
+        if server is None:
+            raise LookupError(f"Server of instance {instance_id} is not managed by the supervisor")
+        if server.process.returncode is None:
+            self._signal(server, signal.SIGTERM)
+            try:
+                await asyncio.wait_for(server.exited.wait(), timeout)
+            except asyncio.TimeoutError:
+                self._log(f"Server of instance {instance_id} did not stop in {timeout}s, killing it")
+                self._signal(server, signal.SIGKILL)
+                await server.exited.wait()
+        return server.state()
+
+    def _signal(self, server: ManagedServer, signum: int) -> None:
+        try:
+            # The server runs in its own session, so its PID is also the process group ID
+            os.killpg(server.process.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def status(self, instance_id: int = None) -> dict:
+        """Returns the state of the managed servers.
+
+        Args:
+            instance_id (int, optional): Only return this instance. Defaults to None.
+
+        Returns:
+            dict: The states of the servers under "servers".
+        """
+        servers = self.servers.values() if instance_id is None else [self.servers[instance_id]] if instance_id in self.servers else []
+        return {"servers": [server.state() for server in servers]}
@@ -0,0 +1,89 @@
+import json
+import socket
+from .supervisor import STOP_TIMEOUT, supervisor_socket_path
+
+
+class SupervisorUnavailable(Exception):
+    """Raised when the supervisor socket cannot be reached."""
+
+
+class SupervisorError(Exception):
+    """Raised when the supervisor rejects a command."""
+
+
+def send_command(command: str, params: dict = None, timeout: float = 10, socket_path: str = None) -> dict:
+    """Sends a command to the server supervisor and waits for its response.
+
+    Args:
+        command (str): The command, one of "start", "stop", "status" and "ping".
+        params (dict, optional): The parameters of the command. Defaults to None.
+        timeout (float, optional): Seconds to wait for the response. Defaults to 10.
+        socket_path (str, optional): The supervisor socket. Defaults to supervisor_socket_path().
+
+    Raises:
+        SupervisorUnavailable: If the supervisor is not running or does not answer in time.
+        SupervisorError: If the command failed.
+
+    Returns:
+        dict: The result of the command.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(socket_path or supervisor_socket_path())
+            client.sendall(json.dumps({"command": command, **(params or {})}).encode() + b"\n")
+            with client.makefile("rb") as reader:
+                line = reader.readline()
+    except OSError as e:
+        # Includes timeouts, a supervisor that does not answer is treated as not running
+        raise SupervisorUnavailable(f"Supervisor cannot be reached: {e}") from e
+    if not line:
+        raise SupervisorUnavailable("Supervisor closed the connection")
+
+    response = json.loads(line)
+    if not response.pop("ok"):
+        raise SupervisorError(response.get("error"))
+    return response
+
+def start_server(instance_id: int, arma3_dir: str, start_file_path: str, log_file_path: str) -> int:
+    """Starts a server through the supervisor.
+
+    Args:
+        instance_id (int): The ID of the instance.
+        arma3_dir (str): The Arma 3 directory.
+        start_file_path (str): The path to the server start file.
+        log_file_path (str): The path to the log file.
+
+    Returns:
+        int: The PID of the server.
+    """
+    state = send_command("start", {
+        "instance_id": instance_id,
+        "arma3_dir": arma3_dir,
+        "start_file_path": start_file_path,
+        "log_file_path": log_file_path,
+    })
+    return state["pid"]
+
+def stop_server(instance_id: int, timeout: float = STOP_TIMEOUT) -> dict:
+    """Stops a server through the supervisor, waiting until it has exited.
+
+    Args:
+        instance_id (int): The ID of the instance.
+        timeout (float, optional): Seconds the server has to exit before it is killed. Defaults to STOP_TIMEOUT.
+
+    Returns:
+        dict: The state of the stopped server.
+    """
+    return send_command("stop", {"instance_id": instance_id, "timeout": timeout}, timeout=timeout + 10)
+
+def server_status(instance_id: int = None) -> list[dict]:
+    """Returns the state of the servers owned by the supervisor.
+
+    Args:
+        instance_id (int, optional): Only return this instance. Defaults to None.
+
+    Returns:
+        list[dict]: The states of the servers.
+    """
+    return send_command("status", {"instance_id": instance_id})["servers"]
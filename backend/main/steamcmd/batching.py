@@ -0,0 +1,130 @@
+from collections import deque
+from queue import Empty
+from threading import Lock
+from django.core.cache import cache
+from ..utils.config import config
+from .rate_limit import rate_limit_governor
+
+
+class AdaptiveBatcher:
+    _state_key = "download_batcher_state"
+
+    def __init__(self, wids: list[str], sizes: dict, max_items: int = 10, log_callback: callable = None) -> None:
+        """Cuts the mods to download into batches sized by their estimated bytes and the recent success rate.
+
+        Batches are cut lazily when a worker asks for one, so every batch uses the latest limits.
+        A batch ends when it reaches the item limit or the byte budget, whichever comes first.
+        Batches with failures halve the item limit and clean batches grow it back by half. The item
+        limit never exceeds the rate limit governor's batch size. The learned limit and success rate
+        are kept in the cache, so the next download starts where the previous one ended.
+
+        Args:
+            wids (list[str]): The workshop IDs of the mods to download.
+            sizes (dict): Workshop IDs mapped to their size in bytes, usually from fetch_workshop_details().
+            max_items (int, optional): The maximum number of mods in a batch. Defaults to 10.
+            log_callback (callable, optional): A callback function for logging. Defaults to None.
+        """
+        self.max_items = max(1, max_items)
+        self.byte_budget = config.get("download.batch_target_mb", 2048) * 1024 * 1024
+        self.log_callback = log_callback
+        self._pending = deque(wids)
+        self._lock = Lock()
+        self.sizes = {str(wid): size for wid, size in sizes.items() if size}
+        # Mods the workshop did not report are assumed to be of average size
+        self.default_size = sum(self.sizes.values()) // len(self.sizes) if self.sizes else 0
+        state = cache.get(self._state_key) or {}
+        self.limit = min(self.max_items, state.get("limit", self.max_items))
+        self.success_rate = state.get("success_rate", 1.0)
+
+    def estimated_size(self, wid: str) -> int:
+        """Returns the estimated size of a mod.
+
+        Args:
+            wid (str): The workshop ID of the mod.
+
+        Returns:
+            int: The size in bytes, the average size if unknown.
+        """
+        return self.sizes.get(str(wid), self.default_size)
+
+    def get_nowait(self) -> list[str]:
+        """Cuts the next batch.
+
+        Raises:
+            Empty: If there are no mods left.
+
+        Returns:
+            list[str]: The workshop IDs of the batch.
+        """
+        with self._lock:
+            if not self._pending:
+                raise Empty
+            limit = min(self.limit, rate_limit_governor.batch_size(self.max_items))
+            # Shrinking the item limit also shrinks the byte budget
+            budget = self.byte_budget * limit / self.max_items
+            batch = [self._pending.popleft()]
+            batch_bytes = self.estimated_size(batch[0])
+            while self._pending and len(batch) < limit:
+                size = self.estimated_size(self._pending[0])
+                if batch_bytes + size > budget:
+                    break
+                batch.append(self._pending.popleft())
+                batch_bytes += size
+        if self.log_callback:
+            self.log_callback(
+                f"Next batch: {len(batch)} mods, ~{batch_bytes / (1024 * 1024):.0f} MB "
+                f"(limit {limit}, success rate {self.success_rate:.0%})."
+            )
+        return batch
+
+    def put(self, batch: list[str]) -> None:
+        """Returns an unprocessed batch to the front of the queue.
+
+        Args:
+            batch (list[str]): The workshop IDs of the batch.
+        """
+        with self._lock:
+            self._pending.extendleft(reversed(batch))
+
+    def empty(self) -> bool:
+        """Whether all mods were handed out."""
+        with self._lock:
+            return not self._pending
+
+    def estimated_batches(self) -> int:
+        """Returns the number of batches left at the current item limit.
+
+        Returns:
+            int: The estimated number of batches.
+        """
+        with self._lock:
+            return -(-len(self._pending) // max(1, self.limit))
+
+    def drain(self) -> list[str]:
+        """Removes all mods that were not handed out.
+
+        Returns:
+            list[str]: The workshop IDs of the removed mods.
+        """
+        with self._lock:
+            remaining = list(self._pending)
+            self._pending.clear()
+            return remaining
+
+    def record(self, batch: list[str], failed: list[str]) -> None:
+        """Adapts the limits to the result of a downloaded batch.
+
+        Args:
+            batch (list[str]): The workshop IDs of the batch.
+            failed (list[str]): The workshop IDs from the batch that failed to download.
+        """
+        if not batch:
+            return
+        with self._lock:
+            batch_success = 1 - len(failed) / len(batch)
+            self.success_rate = 0.5 * self.success_rate + 0.5 * batch_success
+            if failed:
+                self.limit = max(1, self.limit // 2)
+            else:
+                self.limit = min(self.max_items, self.limit + max(1, self.limit // 2))
+            cache.set(self._state_key, {"limit": self.limit, "success_rate": self.success_rate}, timeout=None)
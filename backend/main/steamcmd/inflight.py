@@ -0,0 +1,90 @@
+from time import sleep, time
+from celery.result import AsyncResult
+from celery import states
+from django.core.cache import cache
+
+INFLIGHT_TIMEOUT = 14400  # Same as the download task lock, 4 hours
+
+
+def _inflight_key(wid: str) -> str:
+    return f"mod_inflight_{wid}"
+
+def claim_mods(wids: list[str], owner: str) -> tuple[list[str], dict[str, str]]:
+    """Claim mods for download in the global in-flight registry.
+
+    Args:
+        wids (list[str]): The workshop IDs of the mods to download.
+        owner (str): The ID of the claiming task.
+
+    Returns:
+        tuple[list[str], dict[str, str]]: The mods claimed by the owner, and the mods
+            already being downloaded mapped to the ID of the task downloading them.
+    """
+    owned = []
+    shared = {}
+    for wid in wids:
+        key = _inflight_key(wid)
+        # cache.add only sets the key if it is missing, which makes the claim atomic
+        while not cache.add(key, owner, timeout=INFLIGHT_TIMEOUT):
+            current_owner = cache.get(key)
+            if current_owner is None:
+                continue  # Released in the meantime, try again
+            if current_owner == owner:
+                break
+            if AsyncResult(current_owner).state in states.READY_STATES:
+                # The owner finished without releasing the claim, take it over
+                cache.delete(key)
+                continue
+            shared[wid] = current_owner
+            break
+        if wid not in shared:
+            owned.append(wid)
+    return owned, shared
+
+def release_mods(wids: list[str], owner: str) -> None:
+    """Release mods claimed by the owner.
+
+    Args:
+        wids (list[str]): The workshop IDs of the mods to release.
+        owner (str): The ID of the task that claimed the mods.
+    """
+    for wid in wids:
+        key = _inflight_key(wid)
+        if cache.get(key) == owner:
+            cache.delete(key)
+
+def wait_for_mods(shared: dict[str, str], progress_callback: callable = None, poll_interval: float = 10, timeout: float = INFLIGHT_TIMEOUT) -> list[str]:
+    """Wait until mods downloaded by other tasks are released.
+
+    Args:
+        shared (dict[str, str]): The workshop IDs mapped to the ID of the task downloading them.
+        progress_callback (callable, optional): Called with the number of released mods and the number of shared mods. Defaults to None.
+        poll_interval (float, optional): Seconds between checks of the registry. Defaults to 10.
+        timeout (float, optional): The maximum number of seconds to wait. Defaults to the claim timeout.
+
+    Returns:
+        list[str]: The workshop IDs of the mods that were still in flight when waiting timed out.
+    """
+    pending = dict(shared)
+    deadline = time() + timeout
+    while pending and time() < deadline:
+        for wid, owner in list(pending.items()):
+            if cache.get(_inflight_key(wid)) != owner or AsyncResult(owner).state in states.READY_STATES:
+                del pending[wid]
+        if progress_callback:
+            progress_callback(len(shared) - len(pending), len(shared))
+        if pending:
+            sleep(poll_interval)
+    return list(pending)
+
+def is_in_flight(wid: str) -> bool:
+    """Check whether a mod is claimed for download by a running task.
+
+    Args:
+        wid (str): The workshop ID of the mod.
+
+    Returns:
+        bool: True if a task that has not finished holds the claim.
+    """
+    owner = cache.get(_inflight_key(wid))
+    return owner is not None and AsyncResult(owner).state not in states.READY_STATES
@@ -1,52 +1,48 @@
-import math
 import os
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from queue import Empty
+from threading import Lock
 from time import sleep, time
-from ..utils.process_output import stream_process_output
+from celery import states
+from celery.result import AsyncResult
+from ..modpreset.integrity import record_file_lists
+from ..modpreset.workshop_manifest import ModManifestStore, fetch_workshop_details, record_downloaded_mods
 from ..utils.logger import Logger
 from ..utils.config import config
+from ..utils.timing import PhaseTimer
 from ..workaround.cache_deletion import delete_steamcmd_appcache
 from ..workaround.ghost_folder import GhostFolder
-from ..workaround.modsrenamer import lowercase_addons_directory
-from .steam_auth import load_credentials, generate_steam_guard_code
+from ..workaround.modsrenamer import lowercase_mods
+from .inflight import release_mods
+from .batching import AdaptiveBatcher
+from .rate_limit import rate_limit_governor, RATE_LIMIT_RETURN_CODE
+from .session import SteamCMDSession, SteamCMDError
+from .steam_auth import load_credentials
+from .steam_guard import steam_guard_provider
 
 
-def assign_new_steamguard(steamguard, buffer_seconds: int = 7, log_callback: callable = None) -> str:
-    def _get_time_until_next_steamguard_change() -> float:
-        """Get the time in seconds until the next Steam Guard code change.
-
-        Returns:
-            float: Seconds until next code change (0-30).
-        """
-        return 30 - (time() % 30)
-    def _new_steamguard_code() -> str:
-        """Generate a new Steam Guard code.
-
-        Returns:
-            str: The new Steam Guard code.
-        """
-        return generate_steam_guard_code(config.get("steam_auth.shared_secret", ""))
-
-    # Generate a new Steam Guard code, ensuring it's different from the previous one
-    for _ in range(10):  # Retry up to 10 times
-        new_code = _new_steamguard_code()
-        if new_code != steamguard or new_code == "":
-            return new_code
-        time_until_change = _get_time_until_next_steamguard_change() + buffer_seconds
-        if log_callback:
-            log_callback(f"Waiting {time_until_change:.1f}s to generate new Steam Guard code...")
-        sleep(time_until_change)
-    return ""
-
-def download_mods(mods_to_download: list[str], name: str, logger: Logger, lim: int = 10, progress_callback: callable = None) -> list[str] | None:
+def download_mods(mods_to_download: list[str], name: str, logger: Logger, lim: int = 10, progress_callback: callable = None, installed_callback: callable = None, task_id: str = None, hostname: str = None, timer: PhaseTimer = None) -> list[str] | None:
     """Downloads mods using SteamCMD.
 
+    Batches are cut by an AdaptiveBatcher, which sizes them by the mods' estimated bytes and the
+    recent success rate, and distributed over a pool of SteamCMD workers. The pool size is read from
+    the ``download.max_workers`` config entry. Every worker logs in once and downloads into its
+    own ghost folder sub-directory. As soon as a batch lands its mods are lowercased and moved
+    into the mods directory on a separate thread, overlapping with the next batch's download.
+    Progress is kept in the ghost folder journal, so a download interrupted by a crash resumes
+    with the same ghost folder instead of starting from zero.
+
     Args:
         mods_to_download (list[str]): The list of workshop IDs for the mods to download.
         name (str): The name of the mod set being downloaded.
         logger (Logger): Logger instance for logging download progress.
         lim (int): The maximum number of downloads in one batch.
         progress_callback (callable, optional): Callback function to report download progress.
+        installed_callback (callable, optional): Called with the workshop IDs moved into the mods directory after each batch.
+        task_id (str, optional): The ID of the task running the download, stored in the journal. Defaults to None.
+        hostname (str, optional): The name of the worker running the task, stored in the journal. Defaults to None.
+        timer (PhaseTimer, optional): Collects the time spent logging in, downloading, lowercasing and moving. Defaults to None.
 
     Returns:
         list[str]: A list containing mods that failed to download, if any.
@@ -57,60 +53,120 @@ def download_mods(mods_to_download: list[str], name: str, logger: Logger, lim: i
     mods_dir = config.get("paths.mods_directory", "")
     download_dir = config.get("paths.download_directory", "")
     steamcmd_dir = config.get("paths.steamcmd", "")
-    steamguard = None
-    
+    log_callback = logger.log if logger else None
+    timer = timer or PhaseTimer()
+
+    if rate_limit_governor.seconds_until_resume() > 0:
+        if logger:
+            logger.log(f"Downloads are throttled for another {rate_limit_governor.seconds_until_resume():.0f}s. Deferring all mods.")
+        return list(mods_to_download)
     
     login, password = load_credentials()
-    steamguard = assign_new_steamguard(steamguard=steamguard, log_callback=logger.log if logger else None)
     if logger:
         logger.log('Loaded login credentials.')
     
-    delete_steamcmd_appcache(steamcmd_dir, logger.log if logger else None)
+    delete_steamcmd_appcache(steamcmd_dir, log_callback)
 
-    ghost_folder = GhostFolder(name=name, path=download_dir, log_callback=logger.log if logger else None)
-    
-    if not test_connection(steamcmd_dir, login, password, steamguard):
-        raise Exception("Nie udało się połączyć z SteamCMD. Sprawdź dane logowania lub połączenie internetowe.")
+    ghost_folder = GhostFolder(name=name, path=download_dir, log_callback=log_callback)
+    # An interrupted download of the same name leaves its journal behind, continue where it stopped
+    journal = ghost_folder.start_journal(mods_to_download, task_id=task_id, hostname=hostname)
+    resumed = install_leftovers(ghost_folder, mods_dir, log_callback=log_callback, timer=timer)
+    if resumed and installed_callback:
+        installed_callback(resumed)
+    already_installed = set(journal["installed"]) | set(resumed)
+    mods_to_download = [wid for wid in mods_to_download if str(wid) not in already_installed]
+
+    with timer.phase("workshop_details"):
+        details = fetch_workshop_details(mods_to_download, log_callback=log_callback) if mods_to_download else {}
+    sizes = {wid: item["size"] for wid, item in details.items()}
+    batches = AdaptiveBatcher(mods_to_download, sizes, max_items=lim, log_callback=log_callback)
+
+    max_workers = max(1, int(config.get("download.max_workers", 1)))
+    workers_count = min(max_workers, batches.estimated_batches()) or 1
+    progress_lock = Lock()
+    downloaded_count = 0
 
     if progress_callback:
         progress_callback(0, len(mods_to_download))
 
-    for i in range(math.ceil(len(mods_to_download) / lim)):
-        batch = mods_to_download[i * lim:min((i + 1) * lim, len(mods_to_download))]
+    def _install_batch(worker_folder: GhostFolder, downloaded: list[str]) -> None:
+        """Install the downloaded mods of a batch and record them in the journal.
 
+        Args:
+            worker_folder (GhostFolder): The ghost folder of the worker that downloaded the batch.
+            downloaded (list[str]): The workshop IDs downloaded successfully.
+        """
+        try:
+            install_mods(worker_folder, downloaded, mods_dir, log_callback=log_callback, timer=timer)
+        except Exception as e:
+            if logger:
+                logger.error(f"Failed to install mods {downloaded}: {e}")
+            with progress_lock:
+                failed_mods.extend(downloaded)
+            return
+        ghost_folder.update_journal(installed=downloaded)
+        if installed_callback:
+            installed_callback(downloaded)
 
-        steamguard = assign_new_steamguard(steamguard=steamguard, log_callback=logger.log if logger else None)
+    def _batch_done(worker_folder: GhostFolder, batch: list[str], batch_failed: list[str]) -> None:
+        """Collect the results of a finished batch, hand it to post-processing and report progress.
 
-        return_code = steamcmd_download(
-            mod=batch,
-            appid=appid,
-            login=login,
-            password=password,
-            steamcmd_dir=steamcmd_dir,
-            ghost_folder_path=ghost_folder.ghost_folder_path,
-            steamguard=steamguard,
-            log_callback=logger.log if logger else None
-        )
+        Args:
+            worker_folder (GhostFolder): The ghost folder of the worker that downloaded the batch.
+            batch (list[str]): The workshop IDs of the finished batch.
+            batch_failed (list[str]): The workshop IDs from the batch that failed to download.
+        """
+        nonlocal downloaded_count
+        downloaded = [wid for wid in batch if wid not in batch_failed]
+        if downloaded:
+            ghost_folder.update_journal(downloaded=downloaded)
+            postprocess_executor.submit(_install_batch, worker_folder, downloaded)
+        with progress_lock:
+            failed_mods.extend(batch_failed)
+            downloaded_count += len(batch)
+            if progress_callback:
+                progress_callback(downloaded_count, len(mods_to_download))
 
-        if return_code == 84:
-            for mod in batch:
-                failed_mods.append(mod)
-            time.sleep(600)  # Wait for 10 minutes to avoid rate limiting
-            continue
-        elif return_code != 0:
-            steamguard = assign_new_steamguard(steamguard=steamguard, log_callback=logger.log if logger else None)
-            for mod in batch:
-                if download_fallback(mod, appid, login, password, steamcmd_dir, ghost_folder.ghost_folder_path, steamguard, log_callback=logger.log if logger else None):
-                    failed_mods.append(mod)
-                    if logger:
-                        logger.log(f"Failed to download mod {mod}.")
-        if progress_callback:
-            progress_callback(min((i + 1) * lim, len(mods_to_download)), len(mods_to_download))
-
-    for wid in mods_to_download:
-        lowercase_addons_directory(wid, os.path.join(ghost_folder.ghost_folder_path, "steamapps/workshop/content/107410"), log_callback=logger.log if logger else None)
-    ghost_folder.move_files(destination_path=mods_dir, internal_path="steamapps/workshop/content/107410")
+    worker_folders = [
+        GhostFolder(name=f"worker_{worker_id}", path=ghost_folder.ghost_folder_path, log_callback=log_callback)
+        for worker_id in range(workers_count)
+    ]
+    if logger:
+        logger.log(f"Downloading {len(mods_to_download)} mods in batches of up to {batches.limit} with {workers_count} SteamCMD worker(s).")
+
+    # A single post-processing thread keeps the moves sequential while the workers keep downloading
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"postprocess_{name}") as postprocess_executor:
+        with ThreadPoolExecutor(max_workers=workers_count, thread_name_prefix=f"steamcmd_{name}") as executor:
+            futures = [
+                executor.submit(
+                    download_worker,
+                    batches=batches,
+                    appid=appid,
+                    login=login,
+                    password=password,
+                    steamcmd_dir=steamcmd_dir,
+                    ghost_folder_path=worker_folder.ghost_folder_path,
+                    batch_callback=partial(_batch_done, worker_folder),
+                    log_callback=log_callback,
+                    timer=timer,
+                )
+                for worker_folder in worker_folders
+            ]
+            for future in futures:
+                future.result()
+
+    # Batches are left in the queue only if no worker managed to log in
+    leftover_mods = batches.drain()
+    if leftover_mods:
+        if rate_limit_governor.seconds_until_resume() == 0:
+            raise Exception("Nie udało się połączyć z SteamCMD. Sprawdź dane logowania lub połączenie internetowe.")
+        failed_mods.extend(leftover_mods)
+
+    for worker_folder in worker_folders:
+        worker_folder.cleanup()
     ghost_folder.cleanup()
+    if logger:
+        logger.log(f"Download timings: {timer.summary()}")
     
     if failed_mods:
         if logger:
@@ -120,94 +176,272 @@ def download_mods(mods_to_download: list[str], name: str, logger: Logger, lim: i
         logger.log("All mods downloaded successfully.")
     return None
 
-def steamcmd_download(mod: str | list[str], appid: int, login: str, password: str, steamcmd_dir: str, ghost_folder_path: str, steamguard: str = None, log_callback: callable = None, is_retry: bool = False) -> int:
-    """Download a mod using SteamCMD.
+def install_mods(worker_folder: GhostFolder, wids: list[str], mods_dir: str, appid: int = 107410, log_callback: callable = None, timer: PhaseTimer = None) -> None:
+    """Record, lowercase and move downloaded mods from a worker's ghost folder into the mods directory.
+
+    The file list of every moved mod is stored in its manifest for later verification.
+
+    Args:
+        worker_folder (GhostFolder): The ghost folder SteamCMD downloaded the mods into.
+        wids (list[str]): The workshop IDs of the downloaded mods.
+        mods_dir (str): The directory where mods are installed.
+        appid (int, optional): The app ID of the game. Defaults to the Arma 3 appid.
+        log_callback (callable, optional): A callback function for logging. Defaults to None.
+        timer (PhaseTimer, optional): Collects the time spent lowercasing and moving. Defaults to None.
+    """
+    timer = timer or PhaseTimer()
+    content_path = f"steamapps/workshop/content/{appid}"
+    worker_content_path = os.path.join(worker_folder.ghost_folder_path, content_path)
+    record_downloaded_mods(worker_folder.ghost_folder_path, wids, mods_dir, log_callback=log_callback)
+    with timer.phase("lowercase"):
+        # Fresh downloads are always lowercased, the stored markers let later runs skip them
+        lowercase_mods(wids, worker_content_path, store=ModManifestStore(mods_dir), force=True, log_callback=log_callback)
+    with timer.phase("move"):
+        worker_folder.move_files(destination_path=mods_dir, internal_path=content_path, items=wids)
+    with timer.phase("file_list"):
+        record_file_lists(wids, mods_dir, hash_files=bool(config.get("download.hash_on_install", 0)), log_callback=log_callback)
+
+def install_leftovers(ghost_folder: GhostFolder, mods_dir: str, appid: int = 107410, log_callback: callable = None, timer: PhaseTimer = None) -> list[str]:
+    """Install mods an interrupted download finished but did not move out of its worker folders.
 
     Args:
-        mod (str | list[str]): The workshop ID or ID's of the mod to download.
+        ghost_folder (GhostFolder): The ghost folder of the interrupted download.
+        mods_dir (str): The directory where mods are installed.
+        appid (int, optional): The app ID of the game. Defaults to the Arma 3 appid.
+        log_callback (callable, optional): A callback function for logging. Defaults to None.
+        timer (PhaseTimer, optional): Collects the time spent lowercasing and moving. Defaults to None.
+
+    Returns:
+        list[str]: The workshop IDs of the installed mods.
+    """
+    journal = ghost_folder.read_journal() or {}
+    leftovers = [wid for wid in journal.get("downloaded", []) if wid not in journal.get("installed", [])]
+    installed = []
+    if not leftovers:
+        return installed
+    content_path = f"steamapps/workshop/content/{appid}"
+    suffix = "_download_folder"
+    for entry in os.scandir(ghost_folder.ghost_folder_path):
+        if not entry.is_dir() or not entry.name.endswith(suffix):
+            continue
+        worker_folder = GhostFolder(name=entry.name[:-len(suffix)], path=ghost_folder.ghost_folder_path, log_callback=log_callback)
+        found = [wid for wid in leftovers if os.path.isdir(os.path.join(worker_folder.ghost_folder_path, content_path, wid))]
+        if found:
+            install_mods(worker_folder, found, mods_dir, appid=appid, log_callback=log_callback, timer=timer)
+            ghost_folder.update_journal(installed=found)
+            installed.extend(found)
+    if installed and log_callback:
+        log_callback(f"Installed mods left behind by an interrupted download: {installed}")
+    return installed
+
+def recover_orphaned_downloads(hostname: str = None, log_callback: callable = None) -> None:
+    """Adopt or clean up ghost folders of downloads whose task is no longer running.
+
+    A download is orphaned when its task ran on the given (restarting) worker or has already finished.
+    Finished mods are installed, folders with remaining work are kept for the next download to resume
+    until they are older than ``download.journal_ttl``, everything else is deleted.
+
+    Args:
+        hostname (str, optional): The name of the worker that is starting. Defaults to None.
+        log_callback (callable, optional): A callback function for logging. Defaults to None.
+    """
+    download_dir = config.get("paths.download_directory", "")
+    mods_dir = config.get("paths.mods_directory", "")
+    journal_ttl = config.get("download.journal_ttl", 86400)
+    suffix = "_download_folder"
+    if not download_dir or not os.path.isdir(download_dir):
+        return
+
+    for entry in os.scandir(download_dir):
+        if not entry.is_dir() or not entry.name.endswith(suffix):
+            continue
+        ghost_folder = GhostFolder(name=entry.name[:-len(suffix)], path=download_dir, log_callback=log_callback)
+        journal = ghost_folder.read_journal()
+        if journal is None:
+            if time() - entry.stat().st_mtime > journal_ttl:
+                ghost_folder.cleanup()
+            continue
+
+        task_id = journal.get("task_id")
+        orphaned = (
+            not task_id
+            or journal.get("hostname") == hostname
+            or AsyncResult(task_id).state in states.READY_STATES
+        )
+        if not orphaned:
+            continue
+
+        installed = set(journal["installed"]) | set(install_leftovers(ghost_folder, mods_dir, log_callback=log_callback))
+        if task_id:
+            release_mods(journal["mods"], owner=task_id)
+        remaining = [wid for wid in journal["mods"] if wid not in installed]
+        if not remaining or time() - journal.get("updated_at", 0) > journal_ttl:
+            ghost_folder.cleanup()
+        else:
+            ghost_folder.update_journal(task_id=None, hostname=None)
+            if log_callback:
+                log_callback(f"Kept {ghost_folder.ghost_folder_path} to resume {len(remaining)} mods.")
+
+def download_worker(batches: AdaptiveBatcher, appid: int, login: str, password: str, steamcmd_dir: str, ghost_folder_path: str, batch_callback: callable, log_callback: callable = None, timer: PhaseTimer = None) -> bool:
+    """Download batches of mods with a single SteamCMD worker until the queue is empty.
+
+    Every worker keeps its own Steam Guard code, logs in once and installs into its own ghost folder.
+    While downloads are throttled by the rate limit governor the remaining batches are
+    reported as failed, so they get rescheduled instead of blocking the worker. A batch during
+    which SteamCMD dies is reported as failed as well and the worker logs in again for the next one.
+
+    Args:
+        batches (AdaptiveBatcher): The batcher cutting the batches shared between workers.
         appid (int): The app ID of the game (Arma 3).
         login (str): The Steam username.
         password (str): The Steam password.
         steamcmd_dir (str): The directory where SteamCMD is located.
-        ghost_folder_path (str): The path to the ghost folder.
-        steamguard (str, optional): The Steam Guard code. Defaults to None.
+        ghost_folder_path (str): The path to the worker's ghost folder.
+        batch_callback (callable): Called with the batch and the failed mods after each batch.
         log_callback (callable, optional): A callback function for logging. Defaults to None.
-        is_retry (bool, optional): Whether this is a retry of a failed download. Defaults to False.
+        timer (PhaseTimer, optional): Collects the time spent logging in and downloading. Defaults to None.
 
     Returns:
-        int: The return code from the SteamCMD process.
+        bool: False if the worker could not log in to Steam, True otherwise.
     """
-    args = ['bash', f'{os.path.join(steamcmd_dir, "steamcmd.sh")}', f'+force_install_dir {ghost_folder_path}']
-
-    if steamguard:
-        args.append(f'+set_steam_guard_code {steamguard}')
-
-    args.append(f'+login {login} {password}')
-    if is_retry:
-        args.append(f'+workshop_download_item {appid} {int(mod)} validate')
-    else:
-        if isinstance(mod, list):
-            for m in mod:
-                args.append(f'+workshop_download_item {appid} {int(m)}')
-        else:
-            args.append(f'+workshop_download_item {appid} {int(mod)}')
-    args.append("+quit")
+    timer = timer or PhaseTimer()
+    session = None
+    first_batch = True
+    try:
+        while True:
+            try:
+                batch = batches.get_nowait()
+            except Empty:
+                return True
 
-    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    
-    stream_process_output(process, log_callback if log_callback else None)
-    
-    return process.returncode
+            if rate_limit_governor.seconds_until_resume() > 0:
+                if log_callback:
+                    log_callback(f"Downloads are throttled, deferring mods {batch}.")
+                batch_callback(batch, list(batch))
+                continue
 
-def download_fallback(mod: str, appid: int, login: str, password: str, steamcmd_dir: str, ghost_folder_path: str, steamguard: str = None, log_callback: callable = None) -> str | None:
-    """Attempt to download failed mod again.
+            if not first_batch and (delay := rate_limit_governor.inter_batch_delay()):
+                if log_callback:
+                    log_callback(f"Waiting {delay:.0f}s before the next batch...")
+                sleep(delay)
+            first_batch = False
 
-        Args:
-            mod (str): The workshop ID of the mod to download.
-            appid (int): The app ID of the game (Arma 3).
-            login (str): The Steam username.
-            password (str): The Steam password.
-            steamcmd_dir (str): The directory where SteamCMD is located.
-            ghost_folder_path (str): The path to the ghost folder.
-            steamguard (str, optional): The Steam Guard code. Defaults to None.
-            log_callback (callable, optional): A callback function for logging. Defaults to None.
-
-        Returns:
-            str | None: The workshop ID of the mod if the download fails again, otherwise None.
-    """
-    stop_time = time() + 7200  # 120 minutes timeout
-    while time() < stop_time:
-        if log_callback:
-            log_callback(f"Retrying download for mod {mod}...")
-        sleep(60)
-        steamguard = assign_new_steamguard(steamguard=steamguard, log_callback=log_callback)
-        return_code = steamcmd_download(mod=mod, appid=appid, login=login, password=password, steamcmd_dir=steamcmd_dir, ghost_folder_path=ghost_folder_path, steamguard=steamguard, log_callback=log_callback, is_retry=True)
-        if return_code == 0:
-            if log_callback:
-                log_callback(f"Successfully downloaded mod {mod} after retry.")
-            return None
-    return mod
+            if session is None or not session.is_alive:
+                if session:
+                    session.close()
+                with timer.phase("steam_guard"):
+                    steamguard = steam_guard_provider.get_code(log_callback=log_callback)
+                try:
+                    with timer.phase("login"):
+                        session = open_session(steamcmd_dir, ghost_folder_path, login, password, steamguard, log_callback=log_callback)
+                except SteamCMDError as e:
+                    if log_callback:
+                        log_callback(f"SteamCMD worker stopped: {e}")
+                    batches.put(batch)  # Leave the batch for the other workers
+                    return False
 
-def test_connection(steamcmd_dir: str, login: str, password: str, steamguard: str = None) -> bool:
-    """Test connection to SteamCMD.
+            try:
+                with timer.phase("download"):
+                    batch_failed = session.download_items(appid, batch)
+            except (SteamCMDError, OSError) as e:
+                # SteamCMD died mid-batch, the batch is rescheduled and the next one gets a new session
+                if log_callback:
+                    log_callback(f"SteamCMD session lost while downloading mods {batch}: {e}")
+                session.close()
+                session = None
+                batch_callback(batch, list(batch))
+                continue
+            if session.rate_limited:
+                # Rate limits are handled by the governor, they say nothing about the batch
+                rate_limit_governor.record_rate_limit(log_callback=log_callback)
+                session.rate_limited = False
+            else:
+                batches.record(batch, batch_failed)
+                if not batch_failed:
+                    rate_limit_governor.record_success()
+            if batch_failed and log_callback:
+                log_callback(f"Failed to download mods {batch_failed}.")
+            batch_callback(batch, batch_failed)
+    finally:
+        if session:
+            session.close()
+
+def open_session(steamcmd_dir: str, install_dir: str, login: str, password: str, steamguard: str = None, log_callback: callable = None) -> SteamCMDSession:
+    """Start a SteamCMD session and log in.
 
     Args:
         steamcmd_dir (str): The directory where SteamCMD is located.
+        install_dir (str): The directory SteamCMD installs the workshop items into.
         login (str): The Steam username.
         password (str): The Steam password.
         steamguard (str, optional): The Steam Guard code. Defaults to None.
+        log_callback (callable, optional): A callback function for logging. Defaults to None.
+
+    Raises:
+        SteamCMDError: If the login failed.
 
     Returns:
-        bool: True if the connection is successful, False otherwise.
+        SteamCMDSession: The logged in session.
     """
-    args = ['bash', f'{os.path.join(steamcmd_dir, "steamcmd.sh")}']
-    if steamguard:
-        args.append(f'+set_steam_guard_code {steamguard}')
-    args.append(f'+login {login} {password}')
-    args.append("+quit")
+    session = SteamCMDSession(steamcmd_dir=steamcmd_dir, install_dir=install_dir, log_callback=log_callback)
+    session.start()
+    if not session.login(login, password, steamguard):
+        return_code = session.close()
+        if session.rate_limited or return_code == RATE_LIMIT_RETURN_CODE:
+            rate_limit_governor.record_rate_limit(log_callback=log_callback)
+            raise SteamCMDError("Przekroczono limit logowań SteamCMD.")
+        raise SteamCMDError("Nie udało się zalogować do SteamCMD.")
+    if log_callback:
+        log_callback("Logged in to SteamCMD.")
+    return session
 
-    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    
-    process.wait(timeout=10)
-    
-    return process.returncode == 0
\ No newline at end of file
+def retry_download(mods: list[str], name: str, logger: Logger) -> list[str] | None:
+    """Retry downloading previously failed mods within a single SteamCMD login.
+
+    Args:
+        mods (list[str]): The workshop IDs of the mods to retry.
+        name (str): The name of the ghost folder used for the retry.
+        logger (Logger): Logger instance for logging download progress.
+
+    Returns:
+        list[str] | None: A list containing mods that failed to download again, if any.
+    """
+    appid = 107410  # Arma 3 appid
+    mods_dir = config.get("paths.mods_directory", "")
+    download_dir = config.get("paths.download_directory", "")
+    steamcmd_dir = config.get("paths.steamcmd", "")
+    log_callback = logger.log if logger else None
+
+    login, password = load_credentials()
+    steamguard = steam_guard_provider.get_code(log_callback=log_callback)
+    ghost_folder = GhostFolder(name=name, path=download_dir, log_callback=log_callback)
+    content_path = f"steamapps/workshop/content/{appid}"
+    content_dir = os.path.join(ghost_folder.ghost_folder_path, content_path)
+
+    if log_callback:
+        log_callback(f"Retrying download for mods {mods}...")
+    try:
+        with open_session(steamcmd_dir, ghost_folder.ghost_folder_path, login, password, steamguard, log_callback=log_callback) as session:
+            failed_mods = session.download_items(appid, mods, validate=True)
+            if session.rate_limited:
+                rate_limit_governor.record_rate_limit(log_callback=log_callback)
+            elif not failed_mods:
+                rate_limit_governor.record_success()
+    except SteamCMDError as e:
+        if log_callback:
+            log_callback(f"Retry aborted: {e}")
+        failed_mods = list(mods)
+
+    downloaded = [wid for wid in mods if wid not in failed_mods]
+    if downloaded and os.path.isdir(content_dir):
+        # Failed or partial downloads stay in the ghost folder and are deleted with it
+        install_mods(ghost_folder, downloaded, mods_dir, appid=appid, log_callback=log_callback)
+    ghost_folder.cleanup()
+
+    if failed_mods:
+        if logger:
+            logger.log(f"Retry failed for mods: {failed_mods}")
+        return failed_mods
+    if logger:
+        logger.log("All retried mods downloaded successfully.")
+    return None
@@ -0,0 +1,108 @@
+import datetime
+from time import time
+from django.core.cache import cache
+from ..utils.config import config
+
+RATE_LIMIT_RETURN_CODE = 84
+
+
+class RateLimitGovernor:
+    _state_key = "steamcmd_rate_limit_state"
+    _lock_key = "steamcmd_rate_limit_lock"
+
+    def __init__(self) -> None:
+        """Tracks SteamCMD rate limiting (return code 84) shared by all download tasks.
+
+        The state lives in the cache, so every Celery worker sees the same throttle. Each rate limit
+        halves the batch size, lengthens the delay between batches and pushes back the time at which
+        downloads may resume. Clean batches slowly bring the values back to normal.
+        """
+
+    def _get_state(self) -> dict:
+        """Returns the current throttle state stored in the cache.
+
+        Returns:
+            dict: The number of recent rate limits and the timestamp at which downloads may resume.
+        """
+        return cache.get(self._state_key) or {"hits": 0, "resume_at": 0.0}
+
+    def record_rate_limit(self, log_callback: callable = None) -> float:
+        """Records a rate limit returned by SteamCMD.
+
+        Args:
+            log_callback (callable, optional): A callback function for logging. Defaults to None.
+
+        Returns:
+            float: Seconds until downloads may resume.
+        """
+        base_cooldown = config.get("download.rate_limit_cooldown", 600)
+        max_cooldown = config.get("download.rate_limit_max_cooldown", 3600)
+        with cache.lock(self._lock_key, timeout=10):
+            state = self._get_state()
+            state["hits"] += 1
+            cooldown = min(max_cooldown, base_cooldown * 2 ** (state["hits"] - 1))
+            state["resume_at"] = max(state["resume_at"], time() + cooldown)
+            cache.set(self._state_key, state, timeout=None)
+        if log_callback:
+            log_callback(f"SteamCMD rate limit hit ({state['hits']} in a row). Downloads paused for {cooldown}s.")
+        return state["resume_at"] - time()
+
+    def record_success(self) -> None:
+        """Records a batch downloaded without hitting the rate limit."""
+        with cache.lock(self._lock_key, timeout=10):
+            state = self._get_state()
+            if state["hits"] == 0 or state["resume_at"] > time():
+                return
+            state["hits"] -= 1
+            cache.set(self._state_key, state, timeout=None)
+
+    def seconds_until_resume(self) -> float:
+        """Returns the number of seconds until downloads may resume.
+
+        Returns:
+            float: Seconds until resume, 0 if downloads are not throttled.
+        """
+        return max(0.0, self._get_state()["resume_at"] - time())
+
+    def batch_size(self, default: int) -> int:
+        """Returns the batch size adapted to the recent rate limits.
+
+        Args:
+            default (int): The batch size used when not throttled.
+
+        Returns:
+            int: The batch size, halved for every recent rate limit.
+        """
+        return max(1, default >> self._get_state()["hits"])
+
+    def inter_batch_delay(self) -> float:
+        """Returns the delay between consecutive batches adapted to the recent rate limits.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        base_delay = config.get("download.rate_limit_batch_delay", 5)
+        return min(60.0, base_delay * self._get_state()["hits"])
+
+    def state(self, default_batch_size: int = 10) -> dict:
+        """Returns the throttle state for reporting.
+
+        Args:
+            default_batch_size (int, optional): The batch size used when not throttled. Defaults to 10.
+
+        Returns:
+            dict: The throttle state.
+        """
+        state = self._get_state()
+        seconds_until_resume = max(0.0, state["resume_at"] - time())
+        return {
+            "throttled": seconds_until_resume > 0,
+            "resume_at": datetime.datetime.fromtimestamp(state["resume_at"], tz=datetime.timezone.utc).isoformat() if seconds_until_resume > 0 else None,
+            "seconds_until_resume": round(seconds_until_resume),
+            "rate_limit_hits": state["hits"],
+            "batch_size": self.batch_size(default_batch_size),
+            "inter_batch_delay": self.inter_batch_delay(),
+        }
+
+# Create a single instance of RateLimitGovernor to be used throughout the application
+rate_limit_governor = RateLimitGovernor()
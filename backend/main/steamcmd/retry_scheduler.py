@@ -0,0 +1,86 @@
+import random
+from time import time
+from django.core.cache import cache
+from ..utils.config import config
+from .rate_limit import rate_limit_governor
+
+RETRY_PENDING_KEY = "download_retry_pending"
+RETRY_TASK_KEY = "download_retry_task"
+RETRY_LOCK_KEY = "download_retry_lock"
+
+
+def retry_delay(attempt: int, base_delay: float = None, max_delay: float = None) -> float:
+    """Compute the delay before a retry attempt using exponential backoff with jitter.
+
+    Args:
+        attempt (int): The number of the retry attempt, starting at 1.
+        base_delay (float, optional): The delay of the first attempt in seconds. Defaults to the config value.
+        max_delay (float, optional): The upper bound of the delay in seconds. Defaults to the config value.
+
+    Returns:
+        float: The delay in seconds.
+    """
+    if base_delay is None:
+        base_delay = config.get("download.retry_base_delay", 60)
+    if max_delay is None:
+        max_delay = config.get("download.retry_max_delay", 3600)
+    delay = min(max_delay, base_delay * 2 ** max(0, attempt - 1))
+    # Keep at least half of the backoff, randomize the rest so retries do not line up
+    return random.uniform(delay / 2, delay)
+
+def schedule_retry(mods: list[str], attempt: int, instance_ids: list[int], log_callback: callable = None) -> float | None:
+    """Hand failed mods over to the retry scheduler.
+
+    Mods are collected in a shared pending set. Only one delayed retry task is kept in the queue,
+    so every mod that is pending when it runs is downloaded within the same SteamCMD login.
+    The retry never runs before the rate limit governor allows downloads again.
+
+    Args:
+        mods (list[str]): The workshop IDs of the mods that failed to download.
+        attempt (int): The number of the upcoming retry attempt, starting at 1.
+        instance_ids (list[int]): The IDs of the instances waiting for these mods.
+        log_callback (callable, optional): A callback function for logging. Defaults to None.
+
+    Returns:
+        float | None: Seconds until the retry runs, or None if the mods ran out of attempts.
+    """
+    from ..tasks import retry_mods_task
+
+    max_retries = config.get("download.max_retries", 5)
+    if attempt > max_retries:
+        if log_callback:
+            log_callback(f"Mods {mods} exceeded the limit of {max_retries} retries. Giving up.")
+        return None
+
+    with cache.lock(RETRY_LOCK_KEY, timeout=30):
+        pending = cache.get(RETRY_PENDING_KEY) or {}
+        for mod in mods:
+            entry = pending.setdefault(str(mod), {"attempt": attempt, "instance_ids": []})
+            entry["attempt"] = max(entry["attempt"], attempt)
+            entry["instance_ids"] = sorted(set(entry["instance_ids"]) | set(instance_ids))
+        cache.set(RETRY_PENDING_KEY, pending, timeout=None)
+
+        scheduled_at = cache.get(RETRY_TASK_KEY)
+        if scheduled_at:
+            countdown = max(0.0, scheduled_at - time())
+        else:
+            countdown = max(retry_delay(attempt), rate_limit_governor.seconds_until_resume())
+            retry_mods_task.apply_async(countdown=countdown)
+            # Expire the marker if the task gets lost so a new retry can be scheduled
+            cache.set(RETRY_TASK_KEY, time() + countdown, timeout=int(countdown) + 600)
+
+    if log_callback:
+        log_callback(f"Scheduled retry {attempt} for mods {mods} in {countdown:.0f}s.")
+    return countdown
+
+def pop_pending_retries() -> dict:
+    """Take all pending retries out of the scheduler.
+
+    Returns:
+        dict: Workshop IDs mapped to their retry attempt and the IDs of the waiting instances.
+    """
+    with cache.lock(RETRY_LOCK_KEY, timeout=30):
+        pending = cache.get(RETRY_PENDING_KEY) or {}
+        cache.delete(RETRY_PENDING_KEY)
+        cache.delete(RETRY_TASK_KEY)
+    return pending
@@ -0,0 +1,193 @@
+import os
+import re
+import subprocess
+import threading
+from queue import Empty, Queue
+from time import time
+
+LOGIN_SUCCESS_PATTERN = re.compile(r"Waiting for user info\.\.\.OK|Logged in OK")
+LOGIN_FAILURE_PATTERN = re.compile(r"FAILED|ERROR \(|Login Failure")
+DOWNLOAD_SUCCESS_PATTERN = re.compile(r"Success\. Downloaded item (\d+)")
+DOWNLOAD_FAILURE_PATTERN = re.compile(r"ERROR! (?:Download item|Timeout downloading item) (\d+)")
+RATE_LIMIT_PATTERN = re.compile(r"Rate Limit Exceeded", re.IGNORECASE)
+
+
+class SteamCMDError(Exception):
+    """Raised when the SteamCMD session cannot be started or logged in."""
+
+
+class SteamCMDSession:
+    def __init__(self, steamcmd_dir: str, install_dir: str, log_callback: callable = None) -> None:
+        """A long-lived SteamCMD process driven with commands written to its stdin.
+
+        The session logs in once and then downloads any number of workshop items,
+        parsing the result of every item from the output stream.
+
+        Args:
+            steamcmd_dir (str): The directory where SteamCMD is located.
+            install_dir (str): The directory passed to force_install_dir.
+            log_callback (callable, optional): A callback function for logging the SteamCMD output. Defaults to None.
+        """
+        self.steamcmd_dir = steamcmd_dir
+        self.install_dir = install_dir
+        self.log_callback = log_callback
+        self.rate_limited = False
+        self.logged_in = False
+        self._process = None
+        self._lines = Queue()
+        self._reader = None
+
+    def __enter__(self) -> "SteamCMDSession":
+        if self._process is None:
+            self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @property
+    def is_alive(self) -> bool:
+        """Whether the SteamCMD process is still running."""
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        """Starts the SteamCMD process and the thread reading its output."""
+        args = ['bash', os.path.join(self.steamcmd_dir, "steamcmd.sh")]
+        self._process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        self._reader = threading.Thread(target=self._read_output, daemon=True)
+        self._reader.start()
+        self._send(f"force_install_dir {self.install_dir}")
+
+    def _read_output(self) -> None:
+        """Reads the SteamCMD output line by line and passes it to the waiting commands."""
+        try:
+            for line in iter(self._process.stdout.readline, b''):
+                decoded = line.decode('utf-8', errors='ignore').strip()
+                if not decoded:
+                    continue
+                if RATE_LIMIT_PATTERN.search(decoded):
+                    self.rate_limited = True
+                if self.log_callback:
+                    self.log_callback(decoded + '\n')
+                self._lines.put(decoded)
+        finally:
+            self._process.stdout.close()
+            self._lines.put(None)  # End of output
+
+    def _send(self, command: str) -> None:
+        """Writes a command to the SteamCMD prompt.
+
+        Args:
+            command (str): The command to send.
+        """
+        if not self.is_alive:
+            raise SteamCMDError("Proces SteamCMD nie działa.")
+        self._process.stdin.write(f"{command}\n".encode())
+        self._process.stdin.flush()
+
+    def _next_line(self, deadline: float) -> str | None:
+        """Returns the next output line.
+
+        Args:
+            deadline (float): The timestamp after which waiting is given up.
+
+        Returns:
+            str | None: The output line, None on timeout or when the process exited.
+        """
+        try:
+            return self._lines.get(timeout=max(0.0, deadline - time()))
+        except Empty:
+            return None
+
+    def login(self, login: str, password: str, steamguard: str = None, timeout: float = 60) -> bool:
+        """Logs in to Steam.
+
+        Args:
+            login (str): The Steam username.
+            password (str): The Steam password.
+            steamguard (str, optional): The Steam Guard code. Defaults to None.
+            timeout (float, optional): The maximum number of seconds to wait for the login. Defaults to 60.
+
+        Returns:
+            bool: True if the login succeeded, False otherwise.
+        """
+        if steamguard:
+            self._send(f"set_steam_guard_code {steamguard}")
+        self._send(f"login {login} {password}")
+        deadline = time() + timeout
+        while (line := self._next_line(deadline)) is not None:
+            if LOGIN_SUCCESS_PATTERN.search(line):
+                self.logged_in = True
+                break
+            if LOGIN_FAILURE_PATTERN.search(line):
+                break
+        return self.logged_in
+
+    def download_item(self, appid: int, wid: str, validate: bool = False, timeout: float = 3600) -> bool:
+        """Downloads a single workshop item.
+
+        Args:
+            appid (int): The app ID of the game (Arma 3).
+            wid (str): The workshop ID of the mod to download.
+            validate (bool, optional): Whether to validate the downloaded files. Defaults to False.
+            timeout (float, optional): The maximum number of seconds to wait for the download. Defaults to 3600.
+
+        Returns:
+            bool: True if the download succeeded, False otherwise.
+        """
+        wid = str(int(wid))
+        self._send(f"workshop_download_item {appid} {wid}{' validate' if validate else ''}")
+        deadline = time() + timeout
+        while (line := self._next_line(deadline)) is not None:
+            # Results of other items may still arrive after an earlier timeout, skip them
+            if (match := DOWNLOAD_SUCCESS_PATTERN.search(line)) and match.group(1) == wid:
+                return True
+            if (match := DOWNLOAD_FAILURE_PATTERN.search(line)) and match.group(1) == wid:
+                return False
+        return False
+
+    def download_items(self, appid: int, wids: list[str], validate: bool = False, timeout: float = 3600) -> list[str]:
+        """Downloads workshop items one after another within the logged in session.
+
+        Stops early when Steam reports a rate limit or the process exits.
+
+        Args:
+            appid (int): The app ID of the game (Arma 3).
+            wids (list[str]): The workshop IDs of the mods to download.
+            validate (bool, optional): Whether to validate the downloaded files. Defaults to False.
+            timeout (float, optional): The maximum number of seconds to wait for each item. Defaults to 3600.
+
+        Returns:
+            list[str]: The workshop IDs of the mods that failed to download.
+        """
+        failed = []
+        for index, wid in enumerate(wids):
+            if self.rate_limited or not self.is_alive:
+                failed.extend(wids[index:])
+                break
+            if not self.download_item(appid, wid, validate=validate, timeout=timeout):
+                failed.append(wid)
+        return failed
+
+    def close(self, timeout: float = 30) -> int | None:
+        """Quits SteamCMD and waits for the process to exit.
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait before killing the process. Defaults to 30.
+
+        Returns:
+            int | None: The return code of the SteamCMD process.
+        """
+        if self._process is None:
+            return None
+        try:
+            if self.is_alive:
+                self._send("quit")
+                self._process.stdin.close()
+            self._process.wait(timeout=timeout)
+        except (subprocess.TimeoutExpired, OSError, SteamCMDError):
+            self._process.kill()
+            self._process.wait()
+        if self._reader:
+            self._reader.join(timeout=5)
+        return self._process.returncode
@@ -16,11 +16,12 @@ def load_credentials() -> tuple[str, str]:
     password = config.get("steam_auth.password")
     return username, password
 
-def generate_steam_guard_code(shared_secret: str) -> str:
+def generate_steam_guard_code(shared_secret: str, timestamp: float = None) -> str:
     """Generates a 5-character Steam Guard code.
 
     Args:
         shared_secret (str): The shared secret used to generate the code.
+        timestamp (float, optional): The time the code is generated for. Defaults to the current time.
 
     Returns:
         str: A 5-character Steam Guard code.
@@ -32,8 +33,8 @@ def generate_steam_guard_code(shared_secret: str) -> str:
         # Decode the shared secret from Base64
         secret_bytes = base64.b64decode(shared_secret)
 
-        # Get the current time in 30-second intervals
-        current_time = int(time.time())
+        # Get the time in 30-second intervals
+        current_time = int(time.time() if timestamp is None else timestamp)
         time_buffer = pack('>Q', current_time // 30)  # Pack as 8-byte big-endian
 
         # Create the HMAC-SHA1 hash
@@ -0,0 +1,88 @@
+from time import sleep, time
+from django.core.cache import cache
+from ..utils.config import config
+from .steam_auth import generate_steam_guard_code
+
+STEAM_GUARD_PERIOD = 30  # Seconds a Steam Guard code is valid for
+
+
+class SteamGuardProvider:
+    _window_key_prefix = "steamguard_window_"
+    _metrics_key = "steamguard_metrics"
+    _lock_key = "steamguard_metrics_lock"
+
+    def __init__(self) -> None:
+        """Hands out Steam Guard codes so that no two logins use the same code.
+
+        Steam rejects a code that was already used to log in, so every login needs its own 30-second
+        TOTP window. Windows are reserved in the cache, which lets parallel workers and retries plan
+        their logins ahead: the first login takes the current window, the next ones the following
+        windows, and only a login whose window has not started yet waits for it.
+        """
+
+    def reserve_window(self, min_validity: float = None) -> int:
+        """Reserves the earliest TOTP window that no other login has used.
+
+        Args:
+            min_validity (float, optional): The minimum number of seconds the code of the current window
+                must stay valid to be used. Defaults to the download.steam_guard_min_validity config entry.
+
+        Returns:
+            int: The number of the reserved window.
+        """
+        if min_validity is None:
+            min_validity = config.get("download.steam_guard_min_validity", 5)
+        now = time()
+        window = int(now // STEAM_GUARD_PERIOD)
+        if (window + 1) * STEAM_GUARD_PERIOD - now < min_validity:
+            window += 1
+        # A window reserved by another login is taken, move on until a free one is reserved
+        while not cache.add(f"{self._window_key_prefix}{window}", True, timeout=(window + 2) * STEAM_GUARD_PERIOD - int(now)):
+            window += 1
+        return window
+
+    def get_code(self, log_callback: callable = None) -> str:
+        """Returns a Steam Guard code for a new login, waiting for its window if needed.
+
+        Args:
+            log_callback (callable, optional): A callback function for logging. Defaults to None.
+
+        Returns:
+            str: The Steam Guard code, empty if no shared secret is configured.
+        """
+        shared_secret = config.get("steam_auth.shared_secret", "")
+        if not shared_secret:
+            return ""
+        window = self.reserve_window()
+        wait = window * STEAM_GUARD_PERIOD - time()
+        if wait > 0:
+            if log_callback:
+                log_callback(f"Waiting {wait:.0f}s for an unused Steam Guard code...")
+            sleep(wait)
+        self._record_code(max(0.0, wait))
+        return generate_steam_guard_code(shared_secret, timestamp=window * STEAM_GUARD_PERIOD)
+
+    def _record_code(self, wait: float) -> None:
+        """Adds a handed out code and the time spent waiting for it to the metrics.
+
+        Args:
+            wait (float): The number of seconds waited for the code's window.
+        """
+        with cache.lock(self._lock_key, timeout=10):
+            metrics = self.metrics()
+            metrics["codes"] += 1
+            if wait > 0:
+                metrics["waits"] += 1
+                metrics["wait_seconds"] += wait
+            cache.set(self._metrics_key, metrics, timeout=None)
+
+    def metrics(self) -> dict:
+        """Returns the cumulative Steam Guard metrics.
+
+        Returns:
+            dict: The number of codes handed out, how many of them had to be waited for and the total wait in seconds.
+        """
+        return cache.get(self._metrics_key) or {"codes": 0, "waits": 0, "wait_seconds": 0.0}
+
+# Create a single instance of SteamGuardProvider to be used throughout the application
+steam_guard_provider = SteamGuardProvider()
@@ -1,35 +1,106 @@
 from celery import shared_task
+from celery.signals import worker_ready
 from .models import Instances
-from .steamcmd.mods_download import download_mods
-from .modpreset.preset_extraction import preset_parser
+from .steamcmd.inflight import claim_mods, release_mods, wait_for_mods
+from .steamcmd.mods_download import download_mods, retry_download, recover_orphaned_downloads
+from .steamcmd.rate_limit import rate_limit_governor
+from .steamcmd.retry_scheduler import schedule_retry, pop_pending_retries
 from .modpreset.modpathing import check_installed
+from .modpreset.workshop_manifest import check_outdated
+from .modpreset.integrity import verify_mods
+from .modpreset.eviction import evict_mods, mark_mods_used, plan_eviction
+from .modpreset.readiness import refresh_readiness
 from .serverhandling.start_server import start_server
+from .serverhandling import supervisor_client
+from .serverhandling.supervisor_client import SupervisorError, SupervisorUnavailable
 from .utils.logger import Logger
+from .utils.config import config
 import psutil
 from django.core.cache import cache
 from servermanager.celery import app as celery_app
 from celery.result import AsyncResult
+import math
+
+RECOVERY_LOCK_KEY = "download_recovery_lock"
+RECOVERY_LOCK_TIMEOUT = 600
+RECOVERY_LOCK_WAIT = 30
+DOWNLOAD_DEFER_DELAY = 60
+DOWNLOAD_DEFER_RETRIES = 240  # The 4 hours a download may hold the instance
+
+_task_loggers = {}
+
+def _task_logger(name: str) -> Logger:
+    """Returns the logger of a background task, created once per worker process.
+
+    Every Logger stays registered in Logger._instances, so a new one for every run would pile up.
+
+    Args:
+        name (str): The name of the task, also used as the user of the logger.
+
+    Returns:
+        Logger: The logger of the task.
+    """
+    if name not in _task_loggers:
+        _task_loggers[name] = Logger(name=name, user=name)
+    return _task_loggers[name]
+
+@worker_ready.connect
+def recover_downloads_on_worker_start(sender=None, **kwargs):
+    """Adopts or cleans up ghost folders left behind by downloads of dead tasks."""
+    recovery_logger = _task_logger("recovery")
+    hostname = getattr(sender, 'hostname', None)
+    # Workers starting together recover one after another instead of installing the same leftovers twice
+    lock = cache.lock(RECOVERY_LOCK_KEY, timeout=RECOVERY_LOCK_TIMEOUT, blocking_timeout=RECOVERY_LOCK_WAIT)
+    if not lock.acquire():
+        # The next download of an instance resumes its ghost folder anyway
+        recovery_logger.log(f"Another worker is still recovering downloads after {RECOVERY_LOCK_WAIT} seconds, skipping recovery.")
+        Logger.write_all_logs(one_directory=True, user="recovery")
+        return
+    try:
+        recover_orphaned_downloads(hostname=hostname, log_callback=recovery_logger.log)
+        changed = refresh_readiness()
+        recovery_logger.log(f"Refreshed readiness of instances, changed: {changed}")
+    finally:
+        lock.release()
+        Logger.write_all_logs(one_directory=True, user="recovery")
+
+def running_download_task(instance_id: int) -> str | None:
+    """Returns the ID of the download task running for an instance.
+
+    Args:
+        instance_id (int): The ID of the instance.
+
+    Returns:
+        str | None: The ID of the running task, None if no download is running.
+    """
+    task_id = cache.get(f"download_task_{instance_id}")
+    if task_id and AsyncResult(task_id).state in ['PENDING', 'PROGRESS', 'STARTED']:
+        return task_id
+    return None
 
 @shared_task(bind=True)
-def download_mods_task(self, instance_id: int, name: str, user: str, file_path: str, mods_directory: str) -> dict:
-    """Downloads mods based on the provided file path and directory.
+def download_mods_task(self, instance_id: int, name: str, user: str, mods_directory: str, update: bool = False, wids: list[str] = None) -> dict:
+    """Downloads the mods of an instance preset into the mods directory.
 
     Args:
         instance: The object of an instance.
         name (str): The name of the instance.
-        file_path (str): The path to the file containing the mod list.
         mods_directory (str): The directory where mods are located.
+        update (bool, optional): Whether to also download installed mods that are outdated or incomplete. Defaults to False.
+        wids (list[str], optional): The workshop IDs to download instead of the whole preset. While another
+            download of the instance is running they are deferred until it ends. Defaults to None.
 
     Returns:
         dict: The result of the download operation.
     """
     cache_key = f"download_task_{instance_id}"
-    existing_task_id = cache.get(cache_key)
+    existing_task_id = running_download_task(instance_id)
 
-    if existing_task_id:
-        existing_task = AsyncResult(existing_task_id)
-        if existing_task.state in ['PENDING', 'PROGRESS', 'STARTED']:
-            return {'status': 'Pobieranie jest już w toku.', 'task_id': existing_task_id}
+    if existing_task_id and existing_task_id != self.request.id:
+        if wids is not None:
+            # Mods added while the instance is downloading are fetched after the running download
+            raise self.retry(countdown=DOWNLOAD_DEFER_DELAY, max_retries=DOWNLOAD_DEFER_RETRIES)
+        return {'status': 'Pobieranie jest już w toku.', 'task_id': existing_task_id}
 
     cache.set(cache_key, self.request.id, timeout=14400)  # Timeout set to 4 hours
 
@@ -38,26 +109,83 @@ def download_mods_task(self, instance_id: int, name: str, user: str, file_path:
         
         operations_logger = Logger(name="operations", user=user)
         download_logger = Logger(name="download", user=user)
-        workshop_ids = preset_parser(file_path, log_callback=operations_logger.log)
+        workshop_ids = wids if wids is not None else Instances.objects.get(id=instance_id).workshop_ids()
         mods_to_download = check_installed(wids=workshop_ids, mods_dir=mods_directory, log_callback=operations_logger.log)[1]
+        if update:
+            self.update_state(state='PROGRESS', meta={'status': 'Sprawdzanie aktualizacji modów...'})
+            installed_ids = [wid for wid in workshop_ids if wid not in mods_to_download]
+            mods_to_download += check_outdated(wids=installed_ids, mods_dir=mods_directory, log_callback=operations_logger.log)
+            broken_mods = verify_mods(wids=installed_ids, mods_dir=mods_directory, log_callback=operations_logger.log)
+            mods_to_download += [wid for wid in broken_mods if wid not in mods_to_download]
         if mods_to_download:
+            # Mods already being downloaded by another task are awaited instead of fetched twice
+            owned_mods, shared_mods = claim_mods(mods_to_download, owner=self.request.id)
+            progress = {'downloaded': 0, 'total': len(owned_mods), 'shared_done': 0, 'shared_total': len(shared_mods)}
+
+            def report_progress():
+                """Update the task state with the current download progress."""
+                status = f"Pobieranie modów... {progress['downloaded']}/{progress['total']}"
+                if progress['shared_total']:
+                    status += f" (współdzielone z innymi pobieraniami: {progress['shared_done']}/{progress['shared_total']})"
+                self.update_state(state='PROGRESS', meta={'status': status, **progress})
+
             def progress_callback(current: int, total: int):
-                """Update the task state with the current download progress.
+                """Report the progress of the mods downloaded by this task.
 
                 Args:
                     current (int): The number of mods downloaded so far.
                     total (int): The total number of mods to download.
                 """
-                self.update_state(state='PROGRESS', meta={'status': f'Pobieranie modów... {current}/{total}'})
+                progress['downloaded'], progress['total'] = current, total
+                report_progress()
+
+            def shared_progress_callback(current: int, total: int):
+                """Report the progress of the mods downloaded by other tasks.
+
+                Args:
+                    current (int): The number of shared mods finished so far.
+                    total (int): The total number of shared mods.
+                """
+                progress['shared_done'], progress['shared_total'] = current, total
+                report_progress()
 
-            failed_mods = download_mods(mods_to_download=mods_to_download, name=name, logger=download_logger, progress_callback=progress_callback)
+            def mods_installed(wids: list[str]):
+                """Release installed mods to waiting tasks and update the instances that need them.
+
+                Args:
+                    wids (list[str]): The workshop IDs of the installed mods.
+                """
+                release_mods(wids, owner=self.request.id)
+                refresh_readiness(wids=wids, mods_dir=mods_directory)
+
+            failed_mods = []
+            try:
+                if owned_mods:
+                    failed_mods = download_mods(
+                        mods_to_download=owned_mods,
+                        name=name,
+                        logger=download_logger,
+                        progress_callback=progress_callback,
+                        # Let tasks waiting for shared mods continue as soon as they are installed
+                        installed_callback=mods_installed,
+                        task_id=self.request.id,
+                        hostname=self.request.hostname,
+                    ) or []
+            finally:
+                release_mods(owned_mods, owner=self.request.id)
+
+            if shared_mods:
+                operations_logger.log(f"Waiting for mods downloaded by other tasks: {list(shared_mods)}")
+                wait_for_mods(shared_mods, progress_callback=shared_progress_callback)
+                failed_mods += check_installed(wids=list(shared_mods), mods_dir=mods_directory, log_callback=operations_logger.log)[1]
 
             if failed_mods:
-                raise Exception(f'Nie udało się pobrać modów: {failed_mods}')
+                countdown = schedule_retry(failed_mods, attempt=1, instance_ids=[instance_id], log_callback=download_logger.log)
+                if countdown is None:
+                    raise Exception(f'Nie udało się pobrać modów: {failed_mods}')
+                raise Exception(f'Nie udało się pobrać modów: {failed_mods}. Ponowna próba za około {math.ceil(countdown / 60)} min.')
 
-        instance = Instances.objects.get(id=instance_id)
-        instance.is_ready = True
-        instance.save()
+        refresh_readiness(instance_ids=[instance_id], mods_dir=mods_directory)
 
         self.update_state(state='SUCCESS', meta={'status': 'Pobieranie zakończone pomyślnie!'})
         Logger.write_all_logs(one_directory=True, user=user)
@@ -68,6 +196,58 @@ def download_mods_task(self, instance_id: int, name: str, user: str, file_path:
         cache.delete(cache_key)
         raise e
     
+@shared_task(bind=True)
+def retry_mods_task(self) -> dict:
+    """Downloads all mods pending in the retry scheduler within one SteamCMD login.
+
+    Mods failing again are handed back to the scheduler with the next attempt number.
+    Instances waiting for the mods are marked as ready once all of their mods are installed.
+
+    Returns:
+        dict: The result of the retry operation.
+    """
+    pending = pop_pending_retries()
+    if not pending:
+        return {'status': 'Brak modów do ponownego pobrania.'}
+
+    retry_logger = _task_logger("retry")
+    if rate_limit_governor.seconds_until_resume() > 0:
+        # Throttled, put the mods back without using up an attempt
+        for mod, entry in pending.items():
+            schedule_retry([mod], attempt=entry['attempt'], instance_ids=entry['instance_ids'], log_callback=retry_logger.log)
+        Logger.write_all_logs(one_directory=True, user="retry")
+        return {'status': 'Pobieranie wstrzymane przez limit SteamCMD. Zaplanowano ponowną próbę.'}
+
+    try:
+        self.update_state(state='PROGRESS', meta={'status': f'Ponowne pobieranie modów... 0/{len(pending)}'})
+        owned_mods, shared_mods = claim_mods(list(pending), owner=self.request.id)
+        failed_mods = []
+        try:
+            if owned_mods:
+                failed_mods = retry_download(mods=owned_mods, name=f"retry_{self.request.id}", logger=retry_logger) or []
+        finally:
+            release_mods(owned_mods, owner=self.request.id)
+        if shared_mods:
+            wait_for_mods(shared_mods)
+            failed_mods += check_installed(wids=list(shared_mods), mods_dir=config.get("paths.mods_directory"), log_callback=retry_logger.log)[1]
+
+        retries_by_attempt = {}
+        for mod in failed_mods:
+            entry = pending[mod]
+            retries_by_attempt.setdefault(entry['attempt'] + 1, []).append((mod, entry['instance_ids']))
+        for attempt, entries in retries_by_attempt.items():
+            instance_ids = sorted({instance_id for _, ids in entries for instance_id in ids})
+            schedule_retry([mod for mod, _ in entries], attempt=attempt, instance_ids=instance_ids, log_callback=retry_logger.log)
+
+        instance_ids = {instance_id for entry in pending.values() for instance_id in entry['instance_ids']}
+        refresh_readiness(wids=[mod for mod in pending if mod not in failed_mods], instance_ids=list(instance_ids))
+
+        Logger.write_all_logs(one_directory=True, user="retry")
+        return {'status': f'Ponowne pobieranie zakończone. Nieudane: {failed_mods}' if failed_mods else 'Ponowne pobieranie zakończone pomyślnie!'}
+    except Exception as e:
+        Logger.write_all_logs(one_directory=True, user="retry")
+        raise e
+    
 @shared_task(bind=True)
 def start_server_task(self, instance_id: int, arma3_dir: str) -> dict:
     """Starts the Arma 3 server and saves its PID.
@@ -88,15 +268,32 @@ def start_server_task(self, instance_id: int, arma3_dir: str) -> dict:
             instance.save()
             raise Exception(f'Nie udało się uruchomić serwera, ponieważ jest już uruchomiony.')
 
+        self.update_state(state='PROGRESS', meta={'status': 'Sprawdzanie integralności modów...'})
+        start_logger = Logger(name="start", user=instance.user.username)
+        workshop_ids = instance.workshop_ids()
+        try:
+            broken_mods = verify_mods(wids=workshop_ids, mods_dir=config.get("paths.mods_directory"), log_callback=start_logger.log)
+        finally:
+            start_logger.write_log_to_file()
+        if broken_mods:
+            instance.is_ready = False
+            instance.save()
+            raise Exception(f"Niektóre mody są uszkodzone: {', '.join(broken_mods)}. Zaktualizuj mody przed uruchomieniem serwera.")
+        mark_mods_used(workshop_ids, config.get("paths.mods_directory"))
+
         self.update_state(state='PROGRESS', meta={'status': 'Uruchamianie serwera...'})
         
         log_file_path = instance.log_file.path
         start_file_path = instance.start_file_path
 
-        process = start_server(arma3_dir, start_file_path, log_file_path)
+        try:
+            pid = supervisor_client.start_server(instance.id, arma3_dir, start_file_path, log_file_path)
+        except SupervisorUnavailable:
+            # Without the supervisor the server is owned by this worker and loses its output if the worker restarts
+            pid = start_server(arma3_dir, start_file_path, log_file_path).pid
         
         instance.is_running = True
-        instance.pid = process.pid
+        instance.pid = pid
         instance.save()
 
         self.update_state(state='SUCCESS', meta={'status': 'Pobieranie zakończone pomyślnie!'})
@@ -122,6 +319,15 @@ def stop_server_task(self, instance_id: int) -> dict:
         
         self.update_state(state='PROGRESS', meta={'status': 'Zatrzymywanie serwera...'})
         
+        stopped_by_supervisor = False
+        try:
+            # The supervisor signals the whole process group and waits until the server has exited
+            supervisor_client.stop_server(instance.id)
+            stopped_by_supervisor = True
+            pid = None
+        except (SupervisorUnavailable, SupervisorError):
+            pass  # Not started by the supervisor, fall back to finding the processes
+
         pids_to_kill = set()
         if pid and psutil.pid_exists(pid):
             pids_to_kill.add(pid)
@@ -133,7 +339,7 @@ def stop_server_task(self, instance_id: int) -> dict:
         except Exception:
                 pass
 
-        if not pids_to_kill:
+        if not pids_to_kill and not stopped_by_supervisor:
             instance.pid = None
             instance.is_running = False
             instance.save()
@@ -190,8 +396,29 @@ def check_all_servers_status_task():
             instance.is_running = False
             instance.pid = None
         instance.save()
+    # Also catches mods added or removed outside of the application
+    refresh_readiness()
     return {'status': 'Status wszystkich serwerów został zaktualizowany.'}
 
+@shared_task()
+def evict_unused_mods_task():
+    """Evicts mods no instance preset references, least recently used first, while the mods directory is over its quota."""
+    quota_gb = config.get("download.mods_quota_gb", 0)
+    if not quota_gb:
+        return {'status': 'Limit miejsca na mody nie jest ustawiony.'}
+    mods_dir = config.get("paths.mods_directory")
+    plan = plan_eviction(mods_dir, quota_gb * 1024 ** 3)
+    if not plan["to_evict"]:
+        return {'status': 'Katalog modów mieści się w limicie.', 'evicted': []}
+    eviction_logger = _task_logger("eviction")
+    try:
+        eviction_logger.log(f"Mods directory uses {plan['total_bytes']} of {plan['quota_bytes']} bytes, evicting {plan['freed_bytes']} bytes.")
+        evicted = evict_mods([mod["wid"] for mod in plan["to_evict"]], mods_dir, log_callback=eviction_logger.log)
+        refresh_readiness(wids=evicted, mods_dir=mods_dir)
+    finally:
+        eviction_logger.write_log_to_file()
+    return {'status': f'Usunięto {len(evicted)} nieużywanych modów.', 'evicted': evicted}
+
 @shared_task()
 def instance_timeout_task(instance_id: int):
     """Handles the timeout for a specific instance."""
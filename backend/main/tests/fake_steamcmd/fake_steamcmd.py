@@ -0,0 +1,168 @@
+"""Fake SteamCMD reproducing the commands and output used by the download pipeline.
+
+Commands are accepted both as ``+command`` arguments and on stdin, like the real client.
+The behaviour is read from the JSON file pointed to by the FAKE_STEAMCMD_CONFIG environment variable:
+
+    login_latency (float): Seconds a login takes. Defaults to 0.
+    login_return_code (int): Return code of a failed login, 0 for a successful one. Defaults to 0.
+    item_latency (float): Seconds before an item starts downloading. Defaults to 0.
+    bandwidth (int): Download speed in bytes per second, 0 for unlimited. Defaults to 0.
+    mod_size (int): Size of every mod in bytes. Defaults to 1 MiB.
+    files_per_mod (int): Number of PBO files written per mod. Defaults to 4.
+    failure_rate (float): Probability of an item failing. Defaults to 0.
+    failing_items (list[str]): Workshop IDs that always fail. Defaults to [].
+    rate_limit_after (int): Number of items after which the client reports a rate limit and exits
+        with return code 84, 0 to disable. Defaults to 0.
+    seed (int): Seed of the random failures. Defaults to None.
+"""
+import json
+import os
+import random
+import re
+import sys
+import time
+
+APPID = "107410"
+RATE_LIMIT_RETURN_CODE = 84
+ACF_ITEM_PATTERN = re.compile(r'"(\d+)"\s*\{\s*"size"\s*"(\d+)"\s*"timeupdated"\s*"(\d+)"')
+
+
+class FakeSteamCMD:
+    def __init__(self, settings: dict) -> None:
+        self.settings = settings
+        self.install_dir = os.path.join(os.path.expanduser("~"), "Steam")
+        self.logged_in = False
+        self.downloaded_items = 0
+        self.random = random.Random(settings.get("seed"))
+
+    def write(self, text: str) -> None:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    def prompt(self) -> None:
+        self.write("Steam>")
+
+    def run(self, command: str) -> int | None:
+        """Runs a single command.
+
+        Args:
+            command (str): The command line.
+
+        Returns:
+            int | None: The return code if the client should exit, None otherwise.
+        """
+        parts = command.split()
+        if not parts:
+            return None
+        name, args = parts[0], parts[1:]
+        if name == "quit":
+            return 0
+        if name == "force_install_dir" and args:
+            self.install_dir = args[0]
+        elif name == "login":
+            return self.login(args)
+        elif name == "workshop_download_item" and len(args) >= 2:
+            return self.download_item(args[1], validate="validate" in args[2:])
+        return None
+
+    def login(self, args: list[str]) -> int | None:
+        time.sleep(self.settings.get("login_latency", 0))
+        username = args[0] if args else "anonymous"
+        return_code = self.settings.get("login_return_code", 0)
+        if return_code == RATE_LIMIT_RETURN_CODE:
+            self.write(f"Logging in user '{username}' to Steam Public...ERROR (Rate Limit Exceeded)\n")
+            return return_code
+        if return_code:
+            self.write(f"Logging in user '{username}' to Steam Public...FAILED (Invalid Password)\n")
+            return return_code
+        self.write(f"Logging in user '{username}' [U:1:1] to Steam Public...OK\n")
+        self.write("Waiting for client config...OK\n")
+        self.write("Waiting for user info...OK\n")
+        self.logged_in = True
+        return None
+
+    def download_item(self, wid: str, validate: bool = False) -> int | None:
+        rate_limit_after = self.settings.get("rate_limit_after", 0)
+        if rate_limit_after and self.downloaded_items >= rate_limit_after:
+            self.write(f"ERROR! Download item {wid} failed (Rate Limit Exceeded).\n")
+            return RATE_LIMIT_RETURN_CODE
+        self.downloaded_items += 1
+        time.sleep(self.settings.get("item_latency", 0))
+
+        if not self.logged_in or wid in self.settings.get("failing_items", []) or self.random.random() < self.settings.get("failure_rate", 0):
+            self.write(f"ERROR! Download item {wid} failed (Failure).\n")
+            return None
+
+        size = self.settings.get("mod_size", 1024 * 1024)
+        bandwidth = self.settings.get("bandwidth", 0)
+        if bandwidth:
+            time.sleep(size / bandwidth)
+        content_dir = os.path.join(self.install_dir, "steamapps", "workshop", "content", APPID, wid)
+        self.write_content(content_dir, wid, size)
+        self.update_manifest(wid, size)
+        self.write(f'Success. Downloaded item {wid} to "{content_dir}" ({size} bytes)\n')
+        return None
+
+    def write_content(self, content_dir: str, wid: str, size: int) -> None:
+        """Writes a workshop content tree resembling an Arma 3 mod."""
+        files_per_mod = max(1, self.settings.get("files_per_mod", 4))
+        addons_dir = os.path.join(content_dir, "Addons")
+        os.makedirs(os.path.join(addons_dir, "Data"), exist_ok=True)
+        with open(os.path.join(content_dir, "mod.cpp"), "w") as file:
+            file.write(f'name = "Fake mod {wid}";\n')
+        chunk = b"\0" * min(size // files_per_mod, 1024 * 1024)
+        for index in range(files_per_mod):
+            remaining = size // files_per_mod
+            with open(os.path.join(addons_dir, f"Fake_{wid}_{index}.PBO"), "wb") as file:
+                while remaining > 0:
+                    file.write(chunk[:remaining])
+                    remaining -= len(chunk) or remaining
+            with open(os.path.join(addons_dir, f"Fake_{wid}_{index}.PBO.Fake.BISIGN"), "wb") as file:
+                file.write(b"sig")
+        with open(os.path.join(addons_dir, "Data", f"Texture_{wid}.PAA"), "wb") as file:
+            file.write(b"paa")
+
+    def update_manifest(self, wid: str, size: int) -> None:
+        """Adds the item to appworkshop_107410.acf like SteamCMD does."""
+        acf_path = os.path.join(self.install_dir, "steamapps", "workshop", f"appworkshop_{APPID}.acf")
+        entries = {}
+        if os.path.exists(acf_path):
+            with open(acf_path) as file:
+                for item, item_size, updated in ACF_ITEM_PATTERN.findall(file.read()):
+                    entries[item] = (item_size, updated)
+        entries[wid] = (str(size), str(int(time.time())))
+        os.makedirs(os.path.dirname(acf_path), exist_ok=True)
+        with open(acf_path, "w") as file:
+            file.write(f'"AppWorkshop"\n{{\n\t"appid"\t\t"{APPID}"\n\t"WorkshopItemsInstalled"\n\t{{\n')
+            for item, (item_size, updated) in entries.items():
+                file.write(f'\t\t"{item}"\n\t\t{{\n\t\t\t"size"\t\t"{item_size}"\n\t\t\t"timeupdated"\t\t"{updated}"\n\t\t\t"manifest"\t\t"1"\n\t\t}}\n')
+            file.write("\t}\n}\n")
+
+
+def main() -> int:
+    settings = {}
+    config_path = os.environ.get("FAKE_STEAMCMD_CONFIG")
+    if config_path and os.path.exists(config_path):
+        with open(config_path) as file:
+            settings = json.load(file)
+
+    steamcmd = FakeSteamCMD(settings)
+    steamcmd.write("Redirecting stderr to 'logs/stderr.txt'\n")
+    steamcmd.write("Loading Steam API...OK\n")
+
+    for command in " ".join(sys.argv[1:]).split("+"):
+        return_code = steamcmd.run(command)
+        if return_code is not None:
+            return return_code
+
+    steamcmd.prompt()
+    for line in sys.stdin:
+        return_code = steamcmd.run(line)
+        if return_code is not None:
+            return return_code
+        steamcmd.prompt()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
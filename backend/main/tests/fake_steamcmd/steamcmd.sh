@@ -0,0 +1,4 @@
+#!/bin/bash
+# Stand-in for steamcmd.sh used by the tests and the download benchmark.
+# The behaviour is configured with the JSON file pointed to by FAKE_STEAMCMD_CONFIG.
+exec "${FAKE_STEAMCMD_PYTHON:-python3}" "$(dirname "${BASH_SOURCE[0]}")/fake_steamcmd.py" "$@"
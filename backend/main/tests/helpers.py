@@ -0,0 +1,14 @@
+from unittest import mock
+
+
+def start_patches(test_case, patches: dict) -> None:
+    """Patches the given targets until the end of a test.
+
+    Args:
+        test_case (TestCase): The test after which the patches are undone.
+        patches (dict): The values to patch in, by target.
+    """
+    for target, value in patches.items():
+        patcher = mock.patch(target, value)
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
@@ -0,0 +1,123 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from queue import Empty
+from main.steamcmd.batching import AdaptiveBatcher
+from main.steamcmd.rate_limit import RateLimitGovernor
+from main.steamcmd.retry_scheduler import RETRY_TASK_KEY, pop_pending_retries, retry_delay, schedule_retry
+from main.tests.helpers import start_patches
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'download-throttling'}}
+CONFIG = {
+    'download.rate_limit_cooldown': 600,
+    'download.rate_limit_max_cooldown': 3600,
+    'download.rate_limit_batch_delay': 5,
+    'download.retry_base_delay': 60,
+    'download.retry_max_delay': 3600,
+    'download.max_retries': 3,
+    'download.batch_target_mb': 1,
+}
+
+
+class CacheLockMixin:
+    """Runs the tests against a local memory cache, with the Redis lock replaced by a no-op."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(cache, 'lock', mock.MagicMock(), create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        config = mock.Mock(get=lambda key, default=None: CONFIG.get(key, default))
+        start_patches(self, {f'main.steamcmd.{module}.config': config for module in ('rate_limit', 'retry_scheduler', 'batching')})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TestRateLimitGovernor(CacheLockMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = 1000.0
+        patcher = mock.patch('main.steamcmd.rate_limit.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.governor = RateLimitGovernor()
+
+    def test_backoff_grows_with_every_rate_limit(self):
+        cooldowns = [self.governor.record_rate_limit() for _ in range(4)]
+        self.assertEqual(cooldowns, [600, 1200, 2400, 3600])
+        self.assertEqual(self.governor.batch_size(16), 1)
+        self.assertEqual(self.governor.inter_batch_delay(), 20)
+
+    def test_success_decays_only_after_the_cooldown(self):
+        self.governor.record_rate_limit()
+        self.governor.record_rate_limit()
+        self.governor.record_success()
+        self.assertEqual(self.governor.state()['rate_limit_hits'], 2)
+
+        self.now += 1200
+        self.assertEqual(self.governor.seconds_until_resume(), 0)
+        self.governor.record_success()
+        self.assertEqual(self.governor.batch_size(16), 8)
+        self.governor.record_success()
+        self.governor.record_success()
+        self.assertEqual(self.governor.state()['rate_limit_hits'], 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TestRetryScheduler(CacheLockMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('main.tasks.retry_mods_task.apply_async')
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retry_delay_is_bounded_exponential_backoff(self):
+        for attempt, full_delay in ((1, 60), (2, 120), (3, 240), (10, 3600)):
+            delay = retry_delay(attempt)
+            self.assertGreaterEqual(delay, full_delay / 2)
+            self.assertLessEqual(delay, full_delay)
+
+    def test_pending_mods_are_merged_into_one_retry(self):
+        schedule_retry(['1', '2'], attempt=1, instance_ids=[1])
+        schedule_retry(['2', '3'], attempt=2, instance_ids=[2])
+        self.assertEqual(self.apply_async.call_count, 1)
+
+        pending = pop_pending_retries()
+        self.assertEqual(sorted(pending), ['1', '2', '3'])
+        self.assertEqual(pending['2'], {'attempt': 2, 'instance_ids': [1, 2]})
+        self.assertIsNone(cache.get(RETRY_TASK_KEY))
+        self.assertEqual(pop_pending_retries(), {})
+
+    def test_mods_out_of_attempts_are_not_scheduled(self):
+        self.assertIsNone(schedule_retry(['1'], attempt=4, instance_ids=[1]))
+        self.apply_async.assert_not_called()
+        self.assertEqual(pop_pending_retries(), {})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TestAdaptiveBatcher(CacheLockMixin, SimpleTestCase):
+
+    def test_batches_end_at_the_byte_budget(self):
+        # Unknown mods are assumed to be of average size
+        sizes = {'1': 400 * 1024, '2': 400 * 1024, '3': 400 * 1024}
+        batcher = AdaptiveBatcher(['1', '2', '3', '4', '5'], sizes, max_items=4)
+        self.assertEqual(batcher.get_nowait(), ['1', '2'])
+        self.assertEqual(batcher.get_nowait(), ['3', '4'])
+        self.assertEqual(batcher.get_nowait(), ['5'])
+        with self.assertRaises(Empty):
+            batcher.get_nowait()
+
+    def test_limit_is_learned_and_remembered(self):
+        wids = [str(wid) for wid in range(40)]
+        batcher = AdaptiveBatcher(wids, {}, max_items=8)
+        batch = batcher.get_nowait()
+        self.assertEqual(len(batch), 8)
+        batcher.record(batch, failed=batch[:1])
+        self.assertEqual(len(batcher.get_nowait()), 4)
+        batcher.record(['1', '2'], failed=[])
+        self.assertEqual(batcher.limit, 6)
+        self.assertEqual(AdaptiveBatcher(wids, {}, max_items=8).limit, 6)
+        self.assertEqual(AdaptiveBatcher(wids, {}, max_items=3).limit, 3)
@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from main.models import Instances, Ports, PresetMod
+from main.modpreset.eviction import evict_mods, plan_eviction
+from main.modpreset.workshop_manifest import ModManifestStore
+
+User = get_user_model()
+
+
+class TestEviction(TestCase):
+
+    def setUp(self):
+        self.mods_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.mods_dir, True)
+        store = ModManifestStore(self.mods_dir)
+        for last_used, wid in enumerate(('1', '2', '3', '4'), start=1):
+            os.makedirs(os.path.join(self.mods_dir, wid))
+            store.save(wid, {'size': 100, 'last_used': last_used})
+        user = User.objects.create_user(username='testuser', password='testpassword')
+        instance = Instances.objects.create(name='test', user=user, port=Ports.objects.create(port_number=2302), preset='presets/test.html')
+        PresetMod.objects.create(instance=instance, workshop_id='2', position=0)
+        # Mod 4 is being downloaded
+        patcher = mock.patch('main.modpreset.eviction.is_in_flight', side_effect=lambda wid: wid == '4')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_plan_evicts_unreferenced_mods_least_recently_used_first(self):
+        plan = plan_eviction(self.mods_dir, quota_bytes=300)
+        self.assertEqual(plan['total_bytes'], 400)
+        self.assertEqual([mod['wid'] for mod in plan['unreferenced']], ['1', '3'])
+        self.assertEqual([mod['wid'] for mod in plan['to_evict']], ['1'])
+        self.assertEqual(plan['freed_bytes'], 100)
+        # Referenced and downloading mods are kept even when the quota cannot be met
+        self.assertEqual([mod['wid'] for mod in plan_eviction(self.mods_dir, quota_bytes=100)['to_evict']], ['1', '3'])
+        self.assertEqual(plan_eviction(self.mods_dir, quota_bytes=0)['to_evict'], [])
+
+    def test_evict_removes_mods_and_manifests(self):
+        self.assertEqual(evict_mods(['1', '4'], self.mods_dir), ['1'])
+        self.assertFalse(os.path.exists(os.path.join(self.mods_dir, '1')))
+        self.assertIsNone(ModManifestStore(self.mods_dir).get('1'))
+        self.assertTrue(os.path.isdir(os.path.join(self.mods_dir, '4')))
@@ -0,0 +1,43 @@
+import os
+import shutil
+import tempfile
+from django.test import SimpleTestCase
+from main.modpreset.integrity import record_file_lists, verify_mods
+
+
+class TestIntegrity(SimpleTestCase):
+
+    def setUp(self):
+        self.mods_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.mods_dir, True)
+        for wid in ('1', '2'):
+            self.write(wid, 'addons/mod.pbo', b'x' * 100)
+            self.write(wid, 'mod.cpp', b'name = "mod";')
+
+    def write(self, wid, path, content):
+        path = os.path.join(self.mods_dir, wid, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+        return path
+
+    def test_quick_check_finds_missing_resized_and_unexpected_files(self):
+        record_file_lists(['1', '2'], self.mods_dir)
+        self.assertEqual(verify_mods(['1', '2', '3'], self.mods_dir), {})
+        os.remove(os.path.join(self.mods_dir, '1', 'mod.cpp'))
+        self.write('2', 'addons/mod.pbo', b'x' * 50)
+        self.write('2', 'addons/extra.pbo', b'y')
+        broken = verify_mods(['1', '2'], self.mods_dir)
+        self.assertEqual(broken['1'], ['missing mod.cpp'])
+        self.assertEqual(sorted(broken['2']), [f'size of {os.path.join("addons", "mod.pbo")} is 50 instead of 100', f'unexpected {os.path.join("addons", "extra.pbo")}'])
+
+    def test_deep_check_compares_content(self):
+        record_file_lists(['1'], self.mods_dir, hash_files=True)
+        path = self.write('1', 'addons/mod.pbo', b'z' * 100)
+        # Same size, only the hash tells the content changed
+        self.assertEqual(verify_mods(['1'], self.mods_dir, deep=True), {'1': [f'content of {os.path.join("addons", "mod.pbo")} does not match']})
+        self.write('1', 'addons/mod.pbo', b'x' * 100)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(verify_mods(['1'], self.mods_dir, deep=True), {})
+        self.assertEqual(verify_mods(['1'], self.mods_dir), {'1': [f'{os.path.join("addons", "mod.pbo")} was modified']})
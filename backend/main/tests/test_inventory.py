@@ -0,0 +1,33 @@
+import os
+import shutil
+import tempfile
+from django.test import SimpleTestCase
+from main.modpreset.inventory import ModInventory
+from main.modpreset.workshop_manifest import ModManifestStore
+
+
+class TestModInventory(SimpleTestCase):
+
+    def setUp(self):
+        self.mods_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.mods_dir, True)
+        os.makedirs(os.path.join(self.mods_dir, '1'))
+        os.makedirs(os.path.join(self.mods_dir, 'not_a_mod'))
+
+    def test_follows_added_and_removed_mods(self):
+        inventory = ModInventory(self.mods_dir)
+        self.assertEqual(inventory.installed(), {'1'})
+        os.makedirs(os.path.join(self.mods_dir, '2'))
+        os.rmdir(os.path.join(self.mods_dir, '1'))
+        # Changes within one tick of the filesystem clock keep the mtime, which the test must not depend on
+        stat = os.stat(self.mods_dir)
+        os.utime(self.mods_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(inventory.missing(['1', '2', '3']), ['1', '3'])
+        self.assertTrue(inventory.is_installed(2))
+
+    def test_entries_follow_the_manifests(self):
+        inventory = ModInventory(self.mods_dir)
+        self.assertEqual(inventory.get('1'), {'size': None, 'has_manifest': False})
+        ModManifestStore(self.mods_dir).save('1', {'size': 100})
+        self.assertEqual(inventory.get('1'), {'size': 100, 'has_manifest': True})
+        self.assertIsNone(inventory.get('2'))
@@ -0,0 +1,63 @@
+import gzip
+import os
+import shutil
+import tempfile
+from django.test import SimpleTestCase
+from main.utils.log_download import LogStream, accepts_gzip, iter_log_range, open_log_parts, parse_range
+
+
+class TestLogDownload(SimpleTestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir, True)
+        self.log_path = os.path.join(self.base_dir, 'server.log')
+        with gzip.open(self.log_path + '.1.gz', 'wb') as file:
+            file.write(b'first segment\n')
+        with open(self.log_path + '.2', 'wb') as file:
+            file.write(b'second segment\n')
+        with open(self.log_path, 'wb') as file:
+            file.write(b'active file\n')
+        self.content = b'first segment\nsecond segment\nactive file\n'
+
+    def read(self, start, end):
+        return b''.join(iter_log_range(open_log_parts(self.log_path), start, end, chunk_size=4))
+
+    def test_segments_are_stitched_in_order(self):
+        parts = open_log_parts(self.log_path)
+        self.assertEqual(sum(part.size for part in parts), len(self.content))
+        self.assertEqual(b''.join(iter_log_range(parts, 0, len(self.content))), self.content)
+        # Ranges crossing the boundaries of a compressed segment
+        self.assertEqual(self.read(6, 20), self.content[6:20])
+        self.assertEqual(self.read(30, 35), self.content[30:35])
+
+    def test_stream_closes_its_parts(self):
+        parts = open_log_parts(self.log_path)
+        LogStream(parts, 0, len(self.content)).close()
+        self.assertTrue(all(part.file.closed for part in parts))
+        # Closing a compressed stream part way through closes the range it reads
+        parts = open_log_parts(self.log_path)
+        stream = LogStream(parts, 0, len(self.content), compress=True)
+        next(iter(stream))
+        stream.chunks.close()
+        self.assertTrue(all(part.file.closed for part in parts))
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=10-19', 100), (10, 20))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 100))
+        self.assertEqual(parse_range('bytes=-5', 100), (95, 100))
+        self.assertEqual(parse_range('bytes=95-200', 100), (95, 100))
+        self.assertIsNone(parse_range('', 100))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        for header in ('bytes=100-', 'bytes=20-10'):
+            with self.assertRaises(ValueError):
+                parse_range(header, 100)
+
+    def test_accepts_gzip_honours_quality_values(self):
+        self.assertTrue(accepts_gzip('gzip, deflate, br'))
+        self.assertTrue(accepts_gzip('br;q=1.0, gzip;q=0.5'))
+        self.assertTrue(accepts_gzip('*'))
+        self.assertFalse(accepts_gzip('gzip;q=0'))
+        self.assertFalse(accepts_gzip('gzip; q=0.000, *;q=1'))
+        self.assertFalse(accepts_gzip('identity'))
+        self.assertFalse(accepts_gzip(''))
@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+from django.test import SimpleTestCase
+from main.utils.log_reader import LogReader
+
+
+class TestLogReader(SimpleTestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir, True)
+        self.log_path = os.path.join(self.base_dir, 'log_file.txt')
+        self.lines = [f'line {i}' + 'x' * (i % 37) for i in range(5000)]
+        with open(self.log_path, 'w') as file:
+            file.write(''.join(line + '\n' for line in self.lines))
+
+    def test_tail_and_line_ranges(self):
+        reader = LogReader(self.log_path, stride=64)
+        self.assertEqual(reader.tail(3)['content'], ''.join(line + '\n' for line in self.lines[-3:]))
+        result = reader.read_lines(130, 135)
+        self.assertEqual(result['content'], ''.join(line + '\n' for line in self.lines[130:135]))
+        self.assertEqual(result['line_count'], 5000)
+
+    def test_since_offset_after_append(self):
+        reader = LogReader(self.log_path, stride=64)
+        offset = reader.tail(1)['end_offset']
+        with open(self.log_path, 'a') as file:
+            file.write('new line\npartial')
+        # A new reader loads the index from the sidecar and only scans the appended bytes
+        result = LogReader(self.log_path, stride=64).read_since(offset)
+        self.assertEqual(result['content'], 'new line\n')
+        self.assertEqual(result['line_count'], 5001)
+
+    def test_rebuilds_index_after_rotation(self):
+        LogReader(self.log_path, stride=64).tail(1)
+        os.replace(self.log_path, self.log_path + '.1')
+        with open(self.log_path, 'w') as file:
+            file.write('first\nsecond\n')
+        result = LogReader(self.log_path, stride=64).read_lines(0, 10)
+        self.assertEqual(result['content'], 'first\nsecond\n')
+        self.assertEqual(result['line_count'], 2)
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from django.test import SimpleTestCase
+from main.utils import log_sink
+from main.utils.log_sink import BufferedLogSink, log_segments
+
+
+def wait_for_compressor():
+    # The compressor has a single worker, so a no-op runs after everything submitted before it
+    log_sink._compressor.submit(lambda: None).result(timeout=10)
+
+
+class TestBufferedLogSink(SimpleTestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir, True)
+        self.log_path = os.path.join(self.base_dir, 'server.log')
+        self.log_callback = mock.Mock()
+        self.sink = BufferedLogSink(self.log_path, flush_bytes=1, max_bytes=10, retention=1, log_callback=self.log_callback)
+        self.addCleanup(self.sink.close)
+
+    def test_retention_skips_segments_being_compressed(self):
+        release = threading.Event()
+        compress_segment = log_sink._compress_segment
+
+        def blocked_compression(path):
+            release.wait(10)
+            compress_segment(path)
+
+        with mock.patch('main.utils.log_sink._compress_segment', blocked_compression):
+            for number in range(3):
+                self.sink.write(f'line number {number}')
+            # Retention would keep one segment, but all three are still queued for compression
+            self.assertEqual(len(log_segments(self.log_path)), 3)
+            release.set()
+            wait_for_compressor()
+        self.assertTrue(all(segment.endswith('.gz') for segment in log_segments(self.log_path)))
+
+        self.sink.write('line number 3')
+        wait_for_compressor()
+        self.assertEqual(log_segments(self.log_path), [self.log_path + '.4.gz'])
+        self.assertFalse([call for call in self.log_callback.call_args_list if 'Failed' in call.args[0]])
+
+    def test_failed_compression_is_logged(self):
+        with mock.patch('main.utils.log_sink._compress_segment', side_effect=OSError('No space left on device')):
+            self.sink.write('line number 0')
+            wait_for_compressor()
+        self.log_callback.assert_any_call(f'Failed to compress log segment {self.log_path}.1: No space left on device')
+        self.assertEqual(log_segments(self.log_path), [self.log_path + '.1'])
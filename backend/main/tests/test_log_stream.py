@@ -0,0 +1,59 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase
+from main.utils.log_stream import LogBroadcaster
+
+
+class TestLogBroadcaster(SimpleTestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir, True)
+        self.log_path = os.path.join(self.base_dir, 'server.log')
+        with open(self.log_path, 'w') as file:
+            file.write('old line\n')
+
+    def append(self, text):
+        with open(self.log_path, 'a') as file:
+            file.write(text)
+
+    def test_truncation_while_reading_does_not_stop_the_watcher(self):
+        broadcaster = LogBroadcaster(self.log_path, poll_interval=0.01)
+        read_since = broadcaster.reader.read_since
+        calls = []
+
+        def flaky_read_since(offset):
+            calls.append(offset)
+            if len(calls) == 1:
+                raise ValueError('mmap length is greater than file size')
+            return read_since(offset)
+
+        broadcaster.reader.read_since = flaky_read_since
+
+        async def run():
+            queue, position = await broadcaster.subscribe()
+            self.append('new line\n')
+            chunk = await asyncio.wait_for(queue.get(), 5)
+            broadcaster.unsubscribe(queue)
+            return position, chunk
+
+        position, chunk = asyncio.run(run())
+        self.assertEqual(position, 9)
+        self.assertEqual(chunk, (9, 18, 'new line\n'))
+
+    def test_fatal_error_ends_the_subscriptions(self):
+        broadcaster = LogBroadcaster(self.log_path, poll_interval=0.01)
+        broadcaster.reader.read_since = mock.Mock(side_effect=RuntimeError('broken'))
+
+        async def run():
+            queue, _ = await broadcaster.subscribe()
+            self.append('new line\n')
+            return await asyncio.wait_for(queue.get(), 5)
+
+        with mock.patch('main.utils.log_stream.log_error') as error:
+            self.assertIsNone(asyncio.run(run()))
+        error.assert_called_once()
+        self.assertEqual(broadcaster.subscribers, set())
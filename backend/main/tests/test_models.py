@@ -1,6 +1,11 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.db.utils import IntegrityError
+from main.models import Instances, Ports, PresetMod
 
 User = get_user_model()
 
@@ -32,3 +37,23 @@ class TestModels(TestCase):
     def test_profile_str_representation(self):
         user = User.objects.create_user(username='testuser', password='testpassword')
         self.assertEqual(str(user), 'testuser')
+
+    def test_preset_mods_stored_at_upload(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        preset = (
+            '<a href="https://steamcommunity.com/sharedfiles/filedetails/?id=450814997">CBA_A3</a>'
+            '<a href="https://steamcommunity.com/sharedfiles/filedetails/?id=463939057">ace</a>'
+            '<a href="https://steamcommunity.com/sharedfiles/filedetails/?id=450814997">CBA_A3</a>'
+        )
+        with override_settings(MEDIA_ROOT=media_root):
+            user = User.objects.create_user(username='testuser', password='testpassword')
+            instance = Instances.objects.create(
+                name='test', user=user, port=Ports.objects.create(port_number=2302),
+                preset=SimpleUploadedFile('preset.html', preset.encode()),
+            )
+            self.assertEqual(instance.refresh_preset_mods(), ['450814997', '463939057'])
+            self.assertEqual(list(PresetMod.objects.filter(instance=instance).values_list('workshop_id', flat=True)), ['450814997', '463939057'])
+            # The stored IDs are used even after the preset file is gone
+            os.remove(instance.preset.path)
+            self.assertEqual(instance.workshop_ids(), ['450814997', '463939057'])
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+from django.test import SimpleTestCase
+from main.modpreset.preset_extraction import diff_workshop_ids, parse_preset, preset_parser
+
+MOD_ROW = '''<tr data-type="ModContainer">
+  <td data-type="DisplayName">{name}</td>
+  <td><span class="from-steam">Steam</span></td>
+  <td><a href="https://steamcommunity.com/sharedfiles/filedetails/?id={wid}" data-type="Link">https://steamcommunity.com/sharedfiles/filedetails/?id={wid}</a></td>
+</tr>
+'''
+LOCAL_ROW = '''<tr data-type="ModContainer">
+  <td data-type="DisplayName">{name}</td>
+  <td><span class="from-local">Local</span></td>
+  <td></td>
+</tr>
+'''
+DLC_ROW = '''<tr data-type="DlcContainer">
+  <td data-type="DisplayName">Contact</td>
+  <td><a href="https://store.steampowered.com/app/{appid}" data-type="Link">https://store.steampowered.com/app/{appid}</a></td>
+</tr>
+'''
+
+
+class TestParsePreset(SimpleTestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir, True)
+        rows = [MOD_ROW.format(name=f'mod {wid}', wid=wid) for wid in range(1000, 1300)]
+        rows.insert(10, LOCAL_ROW.format(name=' my local mod '))
+        rows.insert(20, MOD_ROW.format(name='duplicate', wid=1005))
+        rows.append(DLC_ROW.format(appid=1021790))
+        self.preset_path = self.write('preset.html', '<html><body><table>\n' + ''.join(rows) + '</table></body></html>')
+
+    def write(self, name, content):
+        path = os.path.join(self.base_dir, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def test_launcher_export(self):
+        preset = parse_preset(self.preset_path)
+        self.assertEqual(preset['workshop_ids'], [str(wid) for wid in range(1000, 1300)])
+        self.assertEqual(preset['dlcs'], ['1021790'])
+        self.assertEqual(preset['local_mods'], ['my local mod'])
+
+    def test_result_does_not_depend_on_the_chunk_size(self):
+        expected = parse_preset(self.preset_path)
+        for chunk_size in (7, 100, 4096):
+            self.assertEqual(parse_preset(self.preset_path, chunk_size=chunk_size), expected)
+
+    def test_link_list_without_rows(self):
+        links = ''.join(f'<a href="https://steamcommunity.com/sharedfiles/filedetails/?l=en&id={wid}">mod</a>\n' for wid in (3, 1, 2, 1))
+        path = self.write('links.html', links)
+        self.assertEqual(parse_preset(path, chunk_size=16)['workshop_ids'], ['3', '1', '2'])
+        self.assertEqual(preset_parser(self.write('links.txt', links)), [])
+
+
+class TestDiffWorkshopIds(SimpleTestCase):
+
+    def test_added_and_removed_keep_their_preset_order(self):
+        self.assertEqual(diff_workshop_ids(['1', '2', '3'], ['4', '3', '1', '5']), (['4', '5'], ['2']))
+        self.assertEqual(diff_workshop_ids([], ['1']), (['1'], []))
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import threading
+from unittest import mock
+from django.test import SimpleTestCase
+from main.utils.process_output import OutputMultiplexer
+
+CHILD_SCRIPT = 'import sys\nfor i in range(100):\n    (sys.stdout if i % 2 else sys.stderr).write(f"line {i}\\n")\nsys.stdout.write("partial")'
+
+
+def spawn():
+    return subprocess.Popen([sys.executable, '-c', CHILD_SCRIPT], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+class TestOutputMultiplexer(SimpleTestCase):
+
+    def run_processes(self, multiplexer, count, log_callback):
+        closed = threading.Semaphore(0)
+        processes = [spawn() for _ in range(count)]
+        for process in processes:
+            multiplexer.add(process, log_callback=log_callback, on_close=closed.release)
+        for _ in processes:
+            self.assertTrue(closed.acquire(timeout=10))
+        return processes
+
+    def test_lines_of_all_processes_are_delivered(self):
+        received = []
+        processes = self.run_processes(OutputMultiplexer(), 3, received.append)
+        self.assertEqual(len(received), 303)
+        self.assertEqual(received.count('line 7\n'), 3)
+        self.assertEqual(received.count('partial\n'), 3)
+        for process in processes:
+            self.assertEqual(process.wait(timeout=10), 0)
+
+    def test_failing_callback_does_not_stop_the_reader(self):
+        multiplexer = OutputMultiplexer()
+        with mock.patch('main.utils.process_output.log_error') as error:
+            self.run_processes(multiplexer, 1, mock.Mock(side_effect=ValueError('broken callback')))
+        self.assertEqual(error.call_count, 101)
+        received = []
+        self.run_processes(multiplexer, 1, received.append)
+        self.assertEqual(len(received), 101)
+
+    def test_forked_child_gets_its_own_reader(self):
+        multiplexer = OutputMultiplexer()
+        self.run_processes(multiplexer, 1, None)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                fresh = multiplexer._selector is None and multiplexer._thread is None
+                received = []
+                self.run_processes(multiplexer, 1, received.append)
+                os._exit(0 if fresh and len(received) == 101 else 1)
+            except BaseException:
+                os._exit(2)
+        self.assertEqual(os.waitpid(pid, 0)[1], 0)
+        self.assertIsNotNone(multiplexer._selector)
@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from main.models import Instances, Ports, PresetMod
+from main.modpreset.readiness import refresh_readiness
+
+User = get_user_model()
+
+
+class TestReadiness(TestCase):
+
+    def setUp(self):
+        self.mods_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.mods_dir, True)
+        for wid in ('1', '2'):
+            os.makedirs(os.path.join(self.mods_dir, wid))
+        user = User.objects.create_user(username='testuser', password='testpassword')
+        self.complete = self.create_instance(user, 'complete', 2302, ['1', '2'])
+        self.incomplete = self.create_instance(user, 'incomplete', 2303, ['1', '3'])
+
+    def create_instance(self, user, name, port, wids):
+        instance = Instances.objects.create(name=name, user=user, port=Ports.objects.create(port_number=port), preset=f'presets/{name}.html')
+        PresetMod.objects.bulk_create(PresetMod(instance=instance, workshop_id=wid, position=position) for position, wid in enumerate(wids))
+        return instance
+
+    def test_only_changed_instances_are_reported(self):
+        self.assertEqual(refresh_readiness(mods_dir=self.mods_dir), [self.complete.id])
+        self.assertEqual(refresh_readiness(mods_dir=self.mods_dir), [])
+        self.complete.refresh_from_db()
+        self.incomplete.refresh_from_db()
+        self.assertTrue(self.complete.is_ready)
+        self.assertFalse(self.incomplete.is_ready)
+
+    def test_installed_and_removed_mods_update_their_instances(self):
+        refresh_readiness(mods_dir=self.mods_dir)
+        os.makedirs(os.path.join(self.mods_dir, '3'))
+        os.rmdir(os.path.join(self.mods_dir, '2'))
+        # Changes within one tick of the filesystem clock keep the mtime the inventory watches
+        stat = os.stat(self.mods_dir)
+        os.utime(self.mods_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(refresh_readiness(wids=['3'], mods_dir=self.mods_dir), [self.incomplete.id])
+        self.assertEqual(refresh_readiness(wids=['2'], mods_dir=self.mods_dir), [self.complete.id])
+        self.assertEqual(refresh_readiness(wids=['4'], mods_dir=self.mods_dir), [])
@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from main.steamcmd.batching import AdaptiveBatcher
+from main.steamcmd.mods_download import download_worker, retry_download
+from main.steamcmd.session import SteamCMDSession
+from main.tests.helpers import start_patches
+
+FAKE_STEAMCMD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_steamcmd')
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'steamcmd'}}
+
+
+class TestSteamCMDSession(SimpleTestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.settings_path = os.path.join(self.base_dir, 'fake_steamcmd.json')
+        env_patcher = mock.patch.dict(os.environ, {'FAKE_STEAMCMD_CONFIG': self.settings_path})
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+        self.addCleanup(shutil.rmtree, self.base_dir, True)
+
+    def configure(self, **settings):
+        with open(self.settings_path, 'w') as file:
+            json.dump({'mod_size': 1024, 'files_per_mod': 1, **settings}, file)
+
+    def test_download_items(self):
+        self.configure(failing_items=['2'])
+        with SteamCMDSession(FAKE_STEAMCMD_DIR, self.base_dir) as session:
+            self.assertTrue(session.login('user', 'password'))
+            failed = session.download_items(107410, ['1', '2', '3'])
+        self.assertEqual(failed, ['2'])
+        content_dir = os.path.join(self.base_dir, 'steamapps', 'workshop', 'content', '107410')
+        self.assertEqual(sorted(os.listdir(content_dir)), ['1', '3'])
+
+    def test_login_failure(self):
+        self.configure(login_return_code=5)
+        with SteamCMDSession(FAKE_STEAMCMD_DIR, self.base_dir) as session:
+            self.assertFalse(session.login('user', 'password'))
+
+    def test_rate_limit(self):
+        self.configure(rate_limit_after=1)
+        with SteamCMDSession(FAKE_STEAMCMD_DIR, self.base_dir) as session:
+            self.assertTrue(session.login('user', 'password'))
+            failed = session.download_items(107410, ['1', '2', '3'])
+            self.assertTrue(session.rate_limited)
+        self.assertEqual(failed, ['2', '3'])
+
+
+class FakeSession:
+
+    def __init__(self, install_dir, failed):
+        self.content_dir = os.path.join(install_dir, 'steamapps', 'workshop', 'content', '107410')
+        self.failed = failed
+        self.rate_limited = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def download_items(self, appid, wids, validate=False):
+        # Failed items leave a partial download behind, like an interrupted SteamCMD transfer
+        for wid in wids:
+            os.makedirs(os.path.join(self.content_dir, wid, 'addons'))
+        return list(self.failed)
+
+
+class TestRetryDownload(SimpleTestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir, True)
+        self.mods_dir = os.path.join(self.base_dir, 'mods')
+        self.download_dir = os.path.join(self.base_dir, 'downloads')
+        paths = {'paths.mods_directory': self.mods_dir, 'paths.download_directory': self.download_dir}
+        config = mock.Mock(get=lambda key, default=None: paths.get(key, default))
+        start_patches(self, {
+            'main.steamcmd.mods_download.config': config,
+            'main.steamcmd.mods_download.load_credentials': mock.Mock(return_value=('user', 'password')),
+            'main.steamcmd.mods_download.steam_guard_provider': mock.Mock(),
+            'main.steamcmd.mods_download.rate_limit_governor': mock.Mock(),
+        })
+
+    def test_only_downloaded_mods_are_installed(self):
+        open_session = lambda steamcmd_dir, install_dir, *args, **kwargs: FakeSession(install_dir, failed=['2'])
+        with mock.patch('main.steamcmd.mods_download.open_session', open_session):
+            failed = retry_download(['1', '2'], 'retry', logger=None)
+        self.assertEqual(failed, ['2'])
+        self.assertEqual(sorted(entry for entry in os.listdir(self.mods_dir) if not entry.startswith('.')), ['1'])
+
+
+class BrokenSession:
+
+    def __init__(self):
+        self.is_alive = True
+        self.rate_limited = False
+        self.close = mock.Mock()
+
+    def download_items(self, appid, wids, validate=False):
+        self.is_alive = False
+        raise BrokenPipeError('SteamCMD exited')
+
+
+# The batcher keeps its learned limits in the cache
+@override_settings(CACHES=LOCMEM_CACHE)
+class TestDownloadWorker(SimpleTestCase):
+
+    def setUp(self):
+        throttle = {'seconds_until_resume.return_value': 0, 'inter_batch_delay.return_value': 0}
+        start_patches(self, {
+            'main.steamcmd.mods_download.steam_guard_provider': mock.Mock(**throttle),
+            'main.steamcmd.mods_download.rate_limit_governor': mock.Mock(**throttle),
+        })
+
+    def test_lost_session_fails_the_batch_and_logs_in_again(self):
+        broken = BrokenSession()
+        working = mock.Mock(is_alive=True, rate_limited=False, **{'download_items.return_value': []})
+        open_session = mock.Mock(side_effect=[broken, working])
+        batches = AdaptiveBatcher(['1', '2'], {'1': 1, '2': 1}, max_items=1)
+        results = []
+        with mock.patch('main.steamcmd.mods_download.open_session', open_session):
+            self.assertTrue(download_worker(batches, 107410, 'user', 'password', '', '', batch_callback=lambda batch, failed: results.append((batch, failed))))
+        self.assertEqual(results, [(['1'], ['1']), (['2'], [])])
+        self.assertEqual(open_session.call_count, 2)
+        broken.close.assert_called_once()
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import shutil
+import socket
+import stat
+import sys
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase
+from main.serverhandling.supervisor import LINE_LIMIT, ServerSupervisor
+from main.serverhandling.supervisor_client import SupervisorUnavailable, send_command
+
+# A line over the reader limit between normal lines, like a server dumping a huge stack trace
+SERVER_SCRIPT = f'''#!{sys.executable}
+import sys
+print("first")
+print("x" * {LINE_LIMIT * 2})
+print("last")
+'''
+
+
+class TestServerSupervisor(SimpleTestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir, True)
+        self.start_file_path = os.path.join(self.base_dir, 'start.sh')
+        with open(self.start_file_path, 'w') as file:
+            file.write(SERVER_SCRIPT)
+        os.chmod(self.start_file_path, 0o700)
+        self.log_file_path = os.path.join(self.base_dir, 'logs', 'server.log')
+
+    def test_output_is_drained_past_an_overlong_line(self):
+        supervisor = ServerSupervisor(socket_path=os.path.join(self.base_dir, 'supervisor.sock'))
+
+        async def run():
+            await supervisor.start_server(1, self.start_file_path, self.base_dir, self.log_file_path)
+            await asyncio.wait_for(supervisor.servers[1].exited.wait(), 30)
+            await supervisor.servers[1].task
+
+        asyncio.run(run())
+        with open(self.log_file_path, 'rb') as file:
+            lines = file.read().splitlines()
+        self.assertEqual(lines[0], b'first')
+        self.assertEqual(lines[-1], b'last')
+        self.assertEqual(sum(len(line) for line in lines[1:-1]), LINE_LIMIT * 2)
+        self.assertEqual(supervisor.servers[1].state()['returncode'], 0)
+
+    def test_failing_log_writes_do_not_stop_the_server(self):
+        supervisor = ServerSupervisor(socket_path=os.path.join(self.base_dir, 'supervisor.sock'), log_callback=mock.Mock())
+
+        async def run():
+            await supervisor.start_server(1, self.start_file_path, self.base_dir, self.log_file_path)
+            await asyncio.wait_for(supervisor.servers[1].task, 30)
+
+        with mock.patch('main.serverhandling.supervisor.BufferedLogSink.write', side_effect=OSError('No space left on device')):
+            asyncio.run(run())
+        self.assertEqual(supervisor.servers[1].state()['returncode'], 0)
+        failures = [call for call in supervisor.log_callback.call_args_list if 'Failed to write' in call.args[0]]
+        self.assertEqual(len(failures), 1)
+
+    def test_socket_is_private_from_the_start(self):
+        socket_path = os.path.join(self.base_dir, 'supervisor.sock')
+        supervisor = ServerSupervisor(socket_path=socket_path)
+
+        async def run():
+            task = asyncio.create_task(supervisor.serve_forever())
+            while not os.path.exists(socket_path):
+                await asyncio.sleep(0.01)
+            mode = stat.S_IMODE(os.stat(socket_path).st_mode)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return mode
+
+        self.assertEqual(asyncio.run(run()), 0o600)
+
+    def test_unreachable_supervisor(self):
+        socket_path = os.path.join(self.base_dir, 'supervisor.sock')
+        with self.assertRaises(SupervisorUnavailable):
+            send_command('ping', socket_path=socket_path)
+        # A supervisor that accepts the connection but never answers
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(socket_path)
+            server.listen()
+            with self.assertRaises(SupervisorUnavailable):
+                send_command('ping', timeout=0.1, socket_path=socket_path)
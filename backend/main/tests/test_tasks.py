@@ -0,0 +1,30 @@
+from unittest import mock
+from django.test import SimpleTestCase
+from main.tasks import download_mods_task, recover_downloads_on_worker_start
+
+
+class TestDownloadModsTask(SimpleTestCase):
+
+    def run_task(self, **kwargs):
+        with mock.patch('main.tasks.running_download_task', return_value='running-task'):
+            return download_mods_task.run(instance_id=1, name='instance', user='admin', mods_directory='/mods', **kwargs)
+
+    def test_download_of_the_preset_is_not_started_twice(self):
+        self.assertEqual(self.run_task(), {'status': 'Pobieranie jest już w toku.', 'task_id': 'running-task'})
+
+    def test_added_mods_wait_for_the_running_download(self):
+        with mock.patch.object(download_mods_task, 'retry', return_value=RuntimeError('retry')) as retry:
+            with self.assertRaisesMessage(RuntimeError, 'retry'):
+                self.run_task(wids=['1', '2'])
+        retry.assert_called_once_with(countdown=60, max_retries=240)
+
+
+class TestRecoverDownloads(SimpleTestCase):
+
+    def test_recovery_is_skipped_while_another_worker_holds_the_lock(self):
+        lock = mock.Mock(**{'acquire.return_value': False})
+        with mock.patch('main.tasks.cache.lock', return_value=lock, create=True), mock.patch('main.tasks.Logger'), mock.patch('main.tasks._task_logger'):
+            with mock.patch('main.tasks.recover_orphaned_downloads') as recover:
+                recover_downloads_on_worker_start(sender=mock.Mock(hostname='worker'))
+        recover.assert_not_called()
+        lock.release.assert_not_called()
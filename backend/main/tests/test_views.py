@@ -1,7 +1,17 @@
-from django.test import TestCase, Client
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
 from knox.models import AuthToken
+from main.models import Instances, Ports
+from main.tests.helpers import start_patches
 
 User = get_user_model()
 
@@ -55,3 +65,154 @@ class TestAccountViewset(TestCase):
     def test_change_password_unauthenticated(self):
         response = self.client.post(self.change_password_url, {'password': 'newpassword123'}, content_type='application/json')
         self.assertEqual(response.status_code, 401)
+
+
+def preset_html(wids):
+    return ''.join(f'<a href="https://steamcommunity.com/sharedfiles/filedetails/?id={wid}">mod</a>' for wid in wids).encode()
+
+
+class TestChangePreset(TestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir, True)
+        self.mods_dir = os.path.join(self.base_dir, 'mods')
+        for wid in ('1', '2', '3'):
+            os.makedirs(os.path.join(self.mods_dir, wid))
+        settings = override_settings(MEDIA_ROOT=os.path.join(self.base_dir, 'media'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = Client()
+        self.user = User.objects.create_superuser(username='admin', password='adminpassword')
+        _, token = AuthToken.objects.create(self.user)
+        self.auth_headers = {'HTTP_AUTHORIZATION': f'Token {token}'}
+        self.instance = Instances.objects.create(
+            name='admin_instance', user=self.user, port=Ports.objects.create(port_number=2302), is_admin_instance=True,
+            preset=SimpleUploadedFile('old_preset.html', preset_html(['1', '2'])),
+        )
+        self.instance.refresh_preset_mods()
+        self.url = reverse('instances-change-preset', args=[self.instance.id])
+
+        paths = {'paths.mods_directory': self.mods_dir, 'paths.arma3': self.base_dir}
+        self.delay = mock.Mock(return_value=mock.Mock(id='new-task'))
+        start_patches(self, {
+            'main.views.config': mock.Mock(get=lambda key, default=None: paths.get(key, default)),
+            'main.views.Logger': mock.Mock(),
+            'main.views.generate_sh_file': mock.Mock(return_value=os.path.join(self.base_dir, 'start.sh')),
+            'main.views.download_mods_task.delay': self.delay,
+        })
+
+    def change_preset(self, wids, running_task=None):
+        with mock.patch('main.views.running_download_task', return_value=running_task):
+            return self.client.post(self.url, {'preset': SimpleUploadedFile('new_preset.html', preset_html(wids))}, **self.auth_headers)
+
+    def test_only_missing_mods_are_downloaded(self):
+        response = self.change_preset(['2', '3', '4'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['added_mods'], ['3', '4'])
+        self.assertEqual(response.data['removed_mods'], ['1'])
+        self.assertEqual(response.data['task_id'], 'new-task')
+        self.assertIsNone(response.data['queued_after'])
+        self.assertEqual(self.delay.call_args.kwargs['wids'], ['4'])
+        self.assertFalse(response.data['result']['is_ready'])
+
+    def test_download_is_queued_behind_a_running_one(self):
+        response = self.change_preset(['1', '4'], running_task='running-task')
+        self.assertEqual(response.data['queued_after'], 'running-task')
+        self.assertIn('po zakończeniu trwającego pobierania', response.data['message'])
+
+    def test_nothing_is_downloaded_when_all_mods_are_installed(self):
+        response = self.change_preset(['3', '1'])
+        self.assertIsNone(response.data['task_id'])
+        self.delay.assert_not_called()
+        self.assertTrue(response.data['result']['is_ready'])
+
+
+class LogViewTestCase(TestCase):
+    LOG_LINES = [f'line {i}\n' for i in range(100)]
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = Client()
+        user = User.objects.create_user(username='testuser', password='testpassword')
+        _, token = AuthToken.objects.create(user)
+        self.auth_headers = {'HTTP_AUTHORIZATION': f'Token {token}'}
+        self.instance = Instances.objects.create(name='test', user=user, port=Ports.objects.create(port_number=2302), preset='presets/test.html')
+        self.instance.log_file.save('log.txt', ContentFile(''.join(self.LOG_LINES).encode()))
+
+
+class TestLogs(LogViewTestCase):
+
+    def get(self, **params):
+        return self.client.get(reverse('instances-logs', args=[self.instance.id]), params, **self.auth_headers)
+
+    def test_tail_headers_describe_the_page(self):
+        response = self.get(tail=2)
+        self.assertEqual(response.status_code, 200)
+        # The content is rendered as a JSON string, which the frontend has always parsed
+        self.assertEqual(json.loads(response.content), 'line 98\nline 99\n')
+        self.assertEqual(response['X-Log-First-Line'], '98')
+        self.assertEqual(response['X-Log-Line-Count'], '100')
+        self.assertEqual(response['X-Log-Size'], str(len(''.join(self.LOG_LINES))))
+        self.assertEqual(response['X-Log-End-Offset'], response['X-Log-Size'])
+
+    def test_continue_from_the_end_offset(self):
+        start = int(self.get(start=10, end=12)['X-Log-Start-Offset'])
+        response = self.get(since=start)
+        self.assertTrue(json.loads(response.content).startswith('line 10\n'))
+        self.assertEqual(response['X-Log-First-Line'], '')
+        self.assertEqual(self.get(start='x').status_code, 400)
+
+
+class TestDownloadLogs(LogViewTestCase):
+
+    def download(self, **headers):
+        response = self.client.get(reverse('instances-download-logs', args=[self.instance.id]), **self.auth_headers, **headers)
+        return response, b''.join(response.streaming_content) if response.streaming else response.content
+
+    def setUp(self):
+        super().setUp()
+        with gzip.open(self.instance.log_file.path + '.1.gz', 'wb') as file:
+            file.write(b'rotated line\n')
+        self.content = b'rotated line\n' + ''.join(self.LOG_LINES).encode()
+
+    def test_whole_log(self):
+        response, content = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, self.content)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_range(self):
+        response, content = self.download(HTTP_RANGE='bytes=5-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(content, self.content[5:20])
+        self.assertEqual(response['Content-Range'], f'bytes 5-19/{len(self.content)}')
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.download(HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_gzip_only_when_accepted(self):
+        response, content = self.download(HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(content), self.content)
+        response, content = self.download(HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(content, self.content)
+
+    def test_rotated_segments_without_active_file(self):
+        os.remove(self.instance.log_file.path)
+        response, content = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, b'rotated line\n')
+        self.assertEqual(self.client.get(reverse('instances-logs', args=[self.instance.id]), {'tail': 5}, **self.auth_headers).status_code, 200)
+        os.remove(self.instance.log_file.path + '.1.gz')
+        self.assertEqual(self.download()[0].status_code, 404)
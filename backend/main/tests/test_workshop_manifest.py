@@ -0,0 +1,32 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase
+from main.modpreset.workshop_manifest import ModManifestStore, check_outdated
+
+
+class TestCheckOutdated(SimpleTestCase):
+
+    def setUp(self):
+        self.mods_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.mods_dir, True)
+        for wid in ('1', '2'):
+            os.makedirs(os.path.join(self.mods_dir, wid, 'addons'))
+            with open(os.path.join(self.mods_dir, wid, 'addons', 'mod.pbo'), 'wb') as file:
+                file.write(b'x' * 100)
+            ModManifestStore(self.mods_dir).save(wid, {'size': 100, 'time_updated': 10})
+        details = {'1': {'size': 100, 'time_updated': 10}, '2': {'size': 100, 'time_updated': 10}}
+        patcher = mock.patch('main.modpreset.workshop_manifest.fetch_workshop_details', return_value=details)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_recorded_size_below_remote_is_outdated(self):
+        self.assertEqual(check_outdated(['1', '2'], self.mods_dir), [])
+        ModManifestStore(self.mods_dir).update('2', files={'addons/mod.pbo': {'size': 50, 'mtime': 0}})
+        self.assertEqual(check_outdated(['1', '2'], self.mods_dir), ['2'])
+
+    def test_mod_without_manifest_is_queued(self):
+        ModManifestStore(self.mods_dir).delete('2')
+        self.assertEqual(check_outdated(['1', '2'], self.mods_dir), ['2'])
+        self.assertIsNone(ModManifestStore(self.mods_dir).get('2'))
@@ -1,6 +1,7 @@
 from rest_framework.routers import DefaultRouter
 from .views import *
 from django.conf import settings
+from django.urls import path
 
 router = DefaultRouter(trailing_slash=True)
 router.register('login', LoginViewset, basename='login')
@@ -9,6 +10,8 @@ router.register('services', ServicesViewset, basename='services')
 router.register('instances', InstancesViewset, basename='instances')
 router.register('moderator_panel', ModeratorPanelViewset, basename='moderator_panel')
 router.register('missions', MissionsViewset, basename='missions')
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path('instances/<int:pk>/logs/stream/', stream_logs, name='instances-logs-stream'),
+]
 if not settings.DEBUG:
     urlpatterns = [url for url in urlpatterns if url.name != 'api-root']
\ No newline at end of file
@@ -30,12 +30,34 @@ class Config:
                 "arma3": "",
                 "mods_directory": "",
                 "logs_directory": "",
-                "download_directory": ""
+                "download_directory": "",
+                "supervisor_socket": ""
             },
             "steam_auth": {
                 "username": "",
                 "password": "",
                 "shared_secret": ""
+            },
+            "download": {
+                "max_workers": 1,
+                "max_retries": 5,
+                "retry_base_delay": 60,
+                "retry_max_delay": 3600,
+                "rate_limit_cooldown": 600,
+                "rate_limit_max_cooldown": 3600,
+                "rate_limit_batch_delay": 5,
+                "journal_ttl": 86400,
+                "steam_guard_min_validity": 5,
+                "batch_target_mb": 2048,
+                "hash_on_install": 0,
+                "mods_quota_gb": 0
+            },
+            "server_logs": {
+                "flush_kb": 64,
+                "flush_interval": 1,
+                "max_segment_mb": 100,
+                "retention": 10,
+                "stream_interval": 0.5
             }
         }
 
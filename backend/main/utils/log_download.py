@@ -0,0 +1,200 @@
+import gzip
+import os
+import re
+import struct
+import zlib
+from .log_sink import log_segments
+
+CHUNK_SIZE = 256 * 1024
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class LogPart:
+    def __init__(self, file, size: int):
+        """An open part of a stitched log, a rotated segment or the active file.
+
+        Args:
+            file: The file object returning the uncompressed content.
+            size (int): The number of uncompressed bytes of the part to serve.
+        """
+        self.file = file
+        self.size = size
+
+
+def _gzip_size(raw) -> int:
+    # The gzip trailer stores the uncompressed size modulo 4 GB, segments are rotated long before that
+    raw.seek(-4, os.SEEK_END)
+    size = struct.unpack("<I", raw.read(4))[0]
+    raw.seek(0)
+    return size
+
+def open_log_parts(log_path: str) -> list[LogPart]:
+    """Opens the rotated segments and the active file of a log, oldest first.
+
+    All parts are opened up front, so a rotation during the download does not change what is served.
+    The active file is served up to its size at the time it was opened.
+
+    Args:
+        log_path (str): The path to the active log file.
+
+    Returns:
+        list[LogPart]: The open parts, to be closed with close_log_parts().
+    """
+    parts = []
+    try:
+        for path in log_segments(log_path) + [log_path]:
+            try:
+                raw = open(path, "rb")
+            except FileNotFoundError:
+                if path == log_path or path.endswith(".gz"):
+                    continue
+                path += ".gz"  # Compressed since it was listed
+                raw = open(path, "rb")
+            if path.endswith(".gz"):
+                parts.append(LogPart(gzip.GzipFile(fileobj=raw), _gzip_size(raw)))
+            else:
+                parts.append(LogPart(raw, os.fstat(raw.fileno()).st_size))
+    except Exception:
+        close_log_parts(parts)
+        raise
+    return parts
+
+def close_log_parts(parts: list[LogPart]) -> None:
+    for part in parts:
+        fileobj = getattr(part.file, "fileobj", None)
+        part.file.close()
+        if fileobj is not None:
+            fileobj.close()  # GzipFile does not close a file object it was given
+
+def parse_range(header: str, total: int) -> tuple[int, int] | None:
+    """Parses a single-range HTTP Range header.
+
+    Args:
+        header (str): The value of the Range header.
+        total (int): The size of the whole content.
+
+    Raises:
+        ValueError: If the range cannot be satisfied.
+
+    Returns:
+        tuple[int, int] | None: The start and the end (exclusive) of the range, None if the header
+            is not a single byte range and the whole content should be served.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last) + 1, total) if last else total
+    else:
+        start, end = max(0, total - int(last)), total  # The last N bytes
+    if start >= total or start >= end:
+        raise ValueError(f"Range {header} cannot be satisfied for {total} bytes")
+    return start, end
+
+def accepts_gzip(header: str) -> bool:
+    """Checks whether an Accept-Encoding header allows a gzip response.
+
+    Codings with a quality of 0 are refused, gzip is accepted if it is listed, or covered by "*",
+    with a quality above 0.
+
+    Args:
+        header (str): The value of the Accept-Encoding header.
+
+    Returns:
+        bool: True if the content may be sent gzip compressed.
+    """
+    qualities = {}
+    for item in header.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+def iter_log_range(parts: list[LogPart], start: int, end: int, chunk_size: int = CHUNK_SIZE):
+    """Yields a byte range of the stitched log in chunks and closes the parts when done.
+
+    Args:
+        parts (list[LogPart]): The parts from open_log_parts().
+        start (int): The first byte to serve.
+        end (int): The byte after the last one to serve.
+        chunk_size (int, optional): The maximum size of a chunk. Defaults to CHUNK_SIZE.
+
+    Yields:
+        bytes: The content, chunk by chunk.
+    """
+    try:
+        part_start = 0
+        for part in parts:
+            part_end = part_start + part.size
+            if part_end > start and part_start < end:
+                # Seeking in a compressed part decompresses up to the position, without keeping it
+                part.file.seek(max(0, start - part_start))
+                remaining = min(end, part_end) - max(start, part_start)
+                while remaining > 0:
+                    chunk = part.file.read(min(chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+            part_start = part_end
+    finally:
+        close_log_parts(parts)
+
+def gzip_chunks(chunks, level: int = 6):
+    """Compresses a stream of chunks into a gzip stream.
+
+    Args:
+        chunks: The chunks to compress.
+        level (int, optional): The compression level. Defaults to 6.
+
+    Yields:
+        bytes: The gzip stream, chunk by chunk.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    try:
+        for chunk in chunks:
+            if compressed := compressor.compress(chunk):
+                yield compressed
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+class LogStream:
+    def __init__(self, parts: list[LogPart], start: int, end: int, compress: bool = False):
+        """The body of a log download, a byte range of the stitched log.
+
+        The response closes its body when it is done, so the parts are closed even if the client goes
+        away before the first chunk is read.
+
+        Args:
+            parts (list[LogPart]): The parts from open_log_parts().
+            start (int): The first byte to serve.
+            end (int): The byte after the last one to serve.
+            compress (bool, optional): Whether to serve the range gzip compressed. Defaults to False.
+        """
+        self.parts = parts
+        chunks = iter_log_range(parts, start, end)
+        self.chunks = gzip_chunks(chunks) if compress else chunks
+
+    def __iter__(self):
+        return self.chunks
+
+    def close(self) -> None:
+        self.chunks.close()
+        close_log_parts(self.parts)
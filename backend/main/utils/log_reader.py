@@ -0,0 +1,201 @@
+import mmap
+import os
+import struct
+import threading
+from array import array
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"A3LOGIX1"
+INDEX_HEADER = struct.Struct("<8sQQQQQ")
+INDEX_STRIDE = 1024
+SCAN_WINDOW = 4 * 1024 * 1024
+COUNT_BLOCK = 64 * 1024
+PAGE_LINES = 1000
+PAGE_BYTES = 1024 * 1024
+
+
+def _nth_line_end(data: bytes, start: int, end: int, n: int) -> int:
+    """Returns the offset after the n-th newline between start and end, which must contain at least n newlines.
+
+    The range is bisected with newline counts until few newlines are left, so long runs of lines are
+    skipped in C instead of one find per line.
+    """
+    while n > 16:
+        middle = (start + end) // 2
+        count = data.count(b"\n", start, middle)
+        if count >= n:
+            end = middle
+        else:
+            n -= count
+            start = middle
+    for _ in range(n):
+        start = data.find(b"\n", start, end) + 1
+    return start
+
+
+class LogReader:
+    def __init__(self, log_path: str, stride: int = INDEX_STRIDE):
+        """Reads parts of a log file through a sparse line-offset index kept next to it.
+
+        The index stores the byte offset of every stride-th line of the active log file, not of its rotated
+        segments, in a "<log>.idx" sidecar. It is brought up to date before every query by scanning only
+        the bytes appended since the last one, and rebuilt when the log was rotated or truncated. Lines are
+        located by counting newlines in blocks rather than one search per line, and a query touches only the
+        pages between the nearest indexed offset and the data it returns, whatever the size of the log.
+
+        Args:
+            log_path (str): The path to the log file.
+            stride (int, optional): The number of lines between two indexed offsets. Defaults to INDEX_STRIDE.
+        """
+        self.log_path = log_path
+        self.index_path = log_path + INDEX_SUFFIX
+        self.stride = stride
+        self.offsets = array("Q", [0])
+        self.indexed_bytes = 0
+        self.line_count = 0
+        self.size = 0
+        self._inode = None
+        self._load_index()
+
+    def _load_index(self) -> None:
+        try:
+            with open(self.index_path, "rb") as file:
+                magic, stride, inode, indexed_bytes, line_count, entries = INDEX_HEADER.unpack(file.read(INDEX_HEADER.size))
+                if magic != INDEX_MAGIC or stride != self.stride:
+                    return
+                offsets = array("Q")
+                offsets.fromfile(file, entries)
+        except (OSError, struct.error, EOFError):
+            return
+        self.offsets, self._inode, self.indexed_bytes, self.line_count = offsets, inode, indexed_bytes, line_count
+
+    def _save_index(self) -> None:
+        temp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                file.write(INDEX_HEADER.pack(INDEX_MAGIC, self.stride, self._inode, self.indexed_bytes, self.line_count, len(self.offsets)))
+                self.offsets.tofile(file)
+            os.replace(temp_path, self.index_path)
+        except OSError:
+            pass  # The index is only a cache, queries still work from memory
+
+    def refresh(self) -> None:
+        """Indexes the lines appended to the log since the last refresh."""
+        stat = os.stat(self.log_path)
+        self.size = stat.st_size
+        if stat.st_ino != self._inode or stat.st_size < self.indexed_bytes:
+            # Rotated or truncated, the old offsets point into another file
+            self.offsets, self.indexed_bytes, self.line_count, self._inode = array("Q", [0]), 0, 0, stat.st_ino
+        if self.size == self.indexed_bytes:
+            return
+
+        with self._map() as data:
+            # A trailing line without a newline is still being written and is indexed once complete
+            end = data.rfind(b"\n", self.indexed_bytes, self.size) + 1
+            position = self.indexed_bytes
+            while position < end:
+                chunk = data[position:min(end, position + SCAN_WINDOW)]
+                start = 0
+                while start < len(chunk):
+                    # Newlines are counted in blocks, only a block holding a checkpoint is searched
+                    block_end = min(len(chunk), start + COUNT_BLOCK)
+                    needed = self.stride - self.line_count % self.stride
+                    count = chunk.count(b"\n", start, block_end)
+                    if count < needed:
+                        self.line_count += count
+                        start = block_end
+                        continue
+                    start = _nth_line_end(chunk, start, block_end, needed)
+                    self.line_count += needed
+                    self.offsets.append(position + start)
+                position += len(chunk)
+        if end:
+            self.indexed_bytes = end
+            self._save_index()
+
+    def _map(self) -> mmap.mmap:
+        with open(self.log_path, "rb") as file:
+            # The file may have been truncated since refresh(), mapping past its end would fail
+            return mmap.mmap(file.fileno(), min(self.size, os.fstat(file.fileno()).st_size), access=mmap.ACCESS_READ)
+
+    def _line_offset(self, data: mmap.mmap, line: int) -> int:
+        """Returns the byte offset where a line starts, scanning at most stride lines from the nearest indexed offset."""
+        if line >= self.line_count:
+            return self.indexed_bytes if line == self.line_count else self.size
+        checkpoint = line // self.stride
+        position = self.offsets[checkpoint]
+        if line % self.stride == 0:
+            return position
+        end = self.offsets[checkpoint + 1] if checkpoint + 1 < len(self.offsets) else self.indexed_bytes
+        return position + _nth_line_end(data[position:end], 0, end - position, line % self.stride)
+
+    def _read(self, start: int, end: int, first_line: int | None) -> dict:
+        content = b""
+        if end > start:
+            with self._map() as data:
+                content = data[start:end]
+        return {
+            "content": content.decode("utf-8", errors="replace"),
+            "start_offset": start,
+            "end_offset": end,
+            "first_line": first_line,
+            "line_count": self.line_count,
+            "size": self.size,
+        }
+
+    def tail(self, lines: int) -> dict:
+        """Returns the last lines of the log.
+
+        Args:
+            lines (int): The number of lines.
+
+        Returns:
+            dict: The content with its start and end offsets, the number of its first line,
+                the number of lines and the size of the log.
+        """
+        self.refresh()
+        if self.size == 0:
+            return self._read(0, 0, 0)
+        first_line = max(0, self.line_count - lines)
+        with self._map() as data:
+            start = self._line_offset(data, first_line)
+        return self._read(start, self.indexed_bytes, first_line)
+
+    def read_lines(self, start: int, end: int) -> dict:
+        """Returns a range of lines of the log.
+
+        Args:
+            start (int): The number of the first line, counted from 0.
+            end (int): The number of the line after the last one.
+
+        Returns:
+            dict: The content with its offsets and line numbers, see tail().
+        """
+        self.refresh()
+        if self.size == 0:
+            return self._read(0, 0, 0)
+        start, end = max(0, start), min(max(start, end), self.line_count)
+        with self._map() as data:
+            start_offset = self._line_offset(data, start)
+            end_offset = self._line_offset(data, end) if end > start else start_offset
+        return self._read(start_offset, end_offset, start)
+
+    def read_since(self, offset: int, max_bytes: int = PAGE_BYTES) -> dict:
+        """Returns the complete lines written after a byte offset.
+
+        Args:
+            offset (int): The end offset returned by a previous query.
+            max_bytes (int, optional): The maximum number of bytes to return, the content is cut at a line end. Defaults to PAGE_BYTES.
+
+        Returns:
+            dict: The content with its offsets, see tail(). Pass end_offset to the next query to continue.
+        """
+        self.refresh()
+        offset = min(max(0, offset), self.indexed_bytes)
+        end = min(self.indexed_bytes, offset + max_bytes)
+        if end < self.indexed_bytes:
+            with self._map() as data:
+                line_end = data.rfind(b"\n", offset, end) + 1
+                # A single line longer than max_bytes is returned whole
+                end = line_end or data.find(b"\n", end, self.indexed_bytes) + 1
+        return self._read(offset, end, None)
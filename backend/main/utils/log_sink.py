@@ -0,0 +1,234 @@
+import gzip
+import os
+import re
+import shutil
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+from .config import config
+from .log_reader import INDEX_SUFFIX
+from .logger import log_error
+
+FLUSH_BYTES = 64 * 1024
+FLUSH_INTERVAL = 1.0
+MAX_SEGMENT_MB = 100
+RETENTION = 10
+
+_compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-gzip")
+_compressions_lock = threading.Lock()
+_pending_compressions = {}
+_flusher_lock = threading.Lock()
+_flusher_sinks = weakref.WeakSet()
+_flusher_thread = None
+
+
+def log_segments(log_path: str) -> list[str]:
+    """Lists the rotated segments of a log, oldest first.
+
+    Segments are named after the log with an increasing number, "log.txt.1.gz" is the oldest.
+    A segment that is still being compressed has no ".gz" suffix yet.
+
+    Args:
+        log_path (str): The path to the active log file.
+
+    Returns:
+        list[str]: The paths of the rotated segments, oldest first.
+    """
+    directory, name = os.path.split(log_path)
+    pattern = re.compile(re.escape(name) + r"\.(\d+)(\.gz)?$")
+    segments = {}
+    try:
+        entries = os.listdir(directory or ".")
+    except FileNotFoundError:
+        return []
+    for entry in entries:
+        match = pattern.match(entry)
+        if match:
+            number = int(match.group(1))
+            # While compressing both files exist, the uncompressed one is complete
+            if number not in segments or not match.group(2):
+                segments[number] = os.path.join(directory, entry)
+    return [segments[number] for number in sorted(segments)]
+
+def delete_log(log_path: str) -> None:
+    """Deletes a log file together with its rotated segments and its line index.
+
+    Args:
+        log_path (str): The path to the active log file.
+    """
+    for path in log_segments(log_path) + [log_path]:
+        for candidate in (path, path + ".gz", path + INDEX_SUFFIX):
+            if os.path.exists(candidate):
+                os.remove(candidate)
+
+def _compress_segment(path: str) -> None:
+    try:
+        with open(path, "rb") as source, gzip.open(path + ".gz.tmp", "wb") as target:
+            shutil.copyfileobj(source, target)
+    except Exception:
+        if os.path.exists(path + ".gz.tmp"):
+            os.remove(path + ".gz.tmp")
+        raise
+    os.replace(path + ".gz.tmp", path + ".gz")
+    os.remove(path)
+
+def _submit_compression(path: str, log_callback: callable = None) -> None:
+    """Compresses a rotated segment in the background.
+
+    Args:
+        path (str): The path to the segment.
+        log_callback (callable, optional): A callback function for logging a failed compression.
+            Defaults to logging it as an error.
+    """
+    def _done(future):
+        with _compressions_lock:
+            _pending_compressions.pop(path, None)
+        if (error := future.exception()) is not None:
+            message = f"Failed to compress log segment {path}: {error}"
+            if log_callback:
+                log_callback(message)
+            else:
+                log_error("log_sink", message)
+
+    with _compressions_lock:
+        future = _compressor.submit(_compress_segment, path)
+        _pending_compressions[path] = future
+    future.add_done_callback(_done)
+
+def _compression_pending(path: str) -> bool:
+    with _compressions_lock:
+        return path in _pending_compressions
+
+def _run_flusher() -> None:
+    while True:
+        sleep(FLUSH_INTERVAL / 2)
+        for sink in list(_flusher_sinks):
+            try:
+                sink.flush_if_due()
+            except Exception:
+                pass  # A failing sink must not stop flushing the others
+
+def _register_for_flushing(sink: "BufferedLogSink") -> None:
+    global _flusher_thread
+    with _flusher_lock:
+        _flusher_sinks.add(sink)
+        if _flusher_thread is None:
+            _flusher_thread = threading.Thread(target=_run_flusher, name="log-flusher", daemon=True)
+            _flusher_thread.start()
+
+
+class BufferedLogSink:
+    def __init__(self, log_path: str, flush_bytes: int = None, flush_interval: float = None,
+                 max_bytes: int = None, retention: int = None, log_callback: callable = None):
+        """Appends lines to a log file in batches and rotates it by size.
+
+        Lines are buffered in memory and written with a single write once the buffer holds flush_bytes,
+        or flush_interval seconds after the oldest buffered line. A shared background thread flushes
+        sinks that stop receiving lines, so the tail of the log never lags by more than the interval.
+        Once the active file exceeds max_bytes it is renamed to the next numbered segment, which is
+        gzip compressed in the background. Only the newest retention segments are kept.
+
+        Args:
+            log_path (str): The path to the log file.
+            flush_bytes (int, optional): The buffer size that triggers a write. Defaults to server_logs.flush_kb from the config.
+            flush_interval (float, optional): The maximum seconds a line stays buffered. Defaults to server_logs.flush_interval from the config.
+            max_bytes (int, optional): The size of the active file that triggers rotation, 0 to never rotate.
+                Defaults to server_logs.max_segment_mb from the config.
+            retention (int, optional): The number of rotated segments to keep, 0 to keep all. Defaults to server_logs.retention from the config.
+            log_callback (callable, optional): A callback function for logging. Defaults to None.
+        """
+        self.log_path = log_path
+        self.flush_bytes = flush_bytes if flush_bytes is not None else config.get("server_logs.flush_kb", FLUSH_BYTES // 1024) * 1024
+        self.flush_interval = flush_interval if flush_interval is not None else config.get("server_logs.flush_interval", FLUSH_INTERVAL)
+        self.max_bytes = max_bytes if max_bytes is not None else config.get("server_logs.max_segment_mb", MAX_SEGMENT_MB) * 1024 ** 2
+        self.retention = retention if retention is not None else config.get("server_logs.retention", RETENTION)
+        self.log_callback = log_callback
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._buffered = 0
+        self._first_buffered_at = None
+        self._file = None
+        self._size = 0
+        self.writes = 0
+        self.rotations = 0
+        _register_for_flushing(self)
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        self._file = open(self.log_path, "ab", buffering=0)
+        self._size = self._file.tell()
+
+    def write(self, line: str | bytes) -> None:
+        """Buffers a line, writing the buffer out if it is full or old enough.
+
+        Args:
+            line (str | bytes): The line, a newline is added if it has none.
+        """
+        if isinstance(line, str):
+            line = line.encode("utf-8", errors="replace")
+        if not line.endswith(b"\n"):
+            line += b"\n"
+        with self._lock:
+            self._buffer.append(line)
+            self._buffered += len(line)
+            if self._first_buffered_at is None:
+                self._first_buffered_at = monotonic()
+            if self._buffered >= self.flush_bytes or monotonic() - self._first_buffered_at >= self.flush_interval:
+                self._flush()
+
+    def flush_if_due(self) -> None:
+        """Writes out the buffer if its oldest line has waited for the flush interval."""
+        with self._lock:
+            if self._first_buffered_at is not None and monotonic() - self._first_buffered_at >= self.flush_interval:
+                self._flush()
+
+    def flush(self) -> None:
+        """Writes out the buffer."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        if self._file is None:
+            self._open()
+        data = b"".join(self._buffer)
+        self._buffer.clear()
+        self._buffered = 0
+        self._first_buffered_at = None
+        self._file.write(data)
+        self._size += len(data)
+        self.writes += 1
+        if self.max_bytes and self._size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+        segments = log_segments(self.log_path)
+        number = int(re.search(r"\.(\d+)(\.gz)?$", segments[-1]).group(1)) + 1 if segments else 1
+        segment = f"{self.log_path}.{number}"
+        os.replace(self.log_path, segment)
+        self.rotations += 1
+        _submit_compression(segment, log_callback=self.log_callback)
+        if self.log_callback:
+            self.log_callback(f"Rotated {self.log_path} into segment {number}")
+
+        for old in (segments + [segment])[:-self.retention] if self.retention else []:
+            if _compression_pending(old):
+                continue  # Still being compressed, removed by a later rotation
+            for path in (old, old + ".gz"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # Removed by the compressor, its .gz is removed in the next iteration
+
+    def close(self) -> None:
+        """Writes out the buffer and closes the file."""
+        with self._lock:
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        _flusher_sinks.discard(self)
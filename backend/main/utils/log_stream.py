@@ -0,0 +1,118 @@
+import asyncio
+import os
+from .config import config
+from .log_reader import LogReader
+from .logger import log_error
+
+POLL_INTERVAL = 0.5
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class LogBroadcaster:
+    def __init__(self, log_path: str, poll_interval: float = None):
+        """Watches one log file and fans new lines out to any number of subscribers.
+
+        A single coroutine per file polls its size and reads the appended lines through a LogReader, so
+        the file is read once per change no matter how many clients watch it. The coroutine runs while
+        the file has subscribers. Every chunk is sent with the byte offset after it, which a reconnecting
+        client passes back to resume. A subscriber that falls behind is dropped instead of buffering
+        without limit, it catches up from the file when it reconnects.
+
+        Args:
+            log_path (str): The path to the log file.
+            poll_interval (float, optional): Seconds between checks for new lines. Defaults to server_logs.stream_interval from the config.
+        """
+        self.log_path = log_path
+        self.poll_interval = poll_interval if poll_interval is not None else config.get("server_logs.stream_interval", POLL_INTERVAL)
+        self.reader = LogReader(log_path)
+        self.position = None
+        self.subscribers: set[asyncio.Queue] = set()
+        self._inode = None
+        self._task = None
+
+    async def subscribe(self) -> tuple[asyncio.Queue, int]:
+        """Registers a subscriber.
+
+        Returns:
+            tuple[asyncio.Queue, int]: The queue receiving (start offset, end offset, text) chunks, None once
+                the subscriber was dropped, and the offset the first chunk will start at.
+        """
+        if self.position is None:
+            position, inode = await asyncio.to_thread(self._current_end)
+            if self.position is None:
+                self.position, self._inode = position, inode
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch(), name=f"log-watch-{self.log_path}")
+        return queue, self.position
+
+    def _current_end(self) -> tuple[int, int | None]:
+        if not os.path.exists(self.log_path):
+            return 0, None
+        # The end of the last complete line, a line still being written is sent once complete.
+        # A separate reader is used, the watcher may be reading with its own at the same time.
+        reader = LogReader(self.log_path)
+        reader.refresh()
+        return reader.indexed_bytes, os.stat(self.log_path).st_ino
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.subscribers.discard(queue)
+
+    def _publish(self, chunk) -> None:
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(chunk)
+            except asyncio.QueueFull:
+                self.subscribers.discard(queue)
+                queue.get_nowait()  # Make room for the signal that the subscriber was dropped
+                queue.put_nowait(None)
+
+    async def _watch(self) -> None:
+        try:
+            while self.subscribers:
+                await asyncio.sleep(self.poll_interval)
+                try:
+                    stat = os.stat(self.log_path)
+                except FileNotFoundError:
+                    continue
+                if stat.st_ino != self._inode or stat.st_size < self.position:
+                    # Rotated or truncated, the new file is read from the start
+                    self.position, self._inode = 0, stat.st_ino
+                try:
+                    while True:
+                        result = await asyncio.to_thread(self.reader.read_since, self.position)
+                        if result["end_offset"] <= self.position:
+                            break
+                        self._publish((result["start_offset"], result["end_offset"], result["content"]))
+                        self.position = result["end_offset"]
+                except (OSError, ValueError):
+                    # Deleted, rotated or truncated while reading, the next round maps the new file
+                    continue
+        except Exception as e:
+            log_error("log_stream", f"Watching log {self.log_path} failed: {e}")
+            # The subscribers end their streams and resume from the file when they reconnect
+            for queue in list(self.subscribers):
+                self.subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+        finally:
+            if _broadcasters.get(self.log_path) is self:
+                del _broadcasters[self.log_path]
+
+_broadcasters: dict[str, LogBroadcaster] = {}
+
+
+def get_log_broadcaster(log_path: str) -> LogBroadcaster:
+    """Returns the broadcaster of a log file, shared by all clients watching it in this process.
+
+    Args:
+        log_path (str): The path to the log file.
+
+    Returns:
+        LogBroadcaster: The broadcaster.
+    """
+    if log_path not in _broadcasters:
+        _broadcasters[log_path] = LogBroadcaster(log_path)
+    return _broadcasters[log_path]
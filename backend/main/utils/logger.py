@@ -1,5 +1,6 @@
 import datetime
 import os
+import threading
 from .config import config
 
 
@@ -33,17 +34,18 @@ class Logger:
         current_date_time = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
         self.log_messages.append(f"{current_date_time} - {message}\n")
         
-    def write_log_to_file(self, log_date: bool = True) -> None:
+    def write_log_to_file(self, log_date: bool = True, append: bool = False) -> None:
         """Writes the log messages to a file.
         
         Args:
             log_date (bool, optional): Whether to include the date in the log file name. Defaults to True.
+            append (bool, optional): Whether to append to an existing file instead of replacing it. Defaults to False.
         """
         if log_date:
             log_file = f"{self.logs_directory}/log_{self.name}_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.txt"
         else:
             log_file = f"{self.logs_directory}/log_{self.name}.txt"
-        with open(log_file, 'w') as f:
+        with open(log_file, 'a' if append else 'w') as f:
             for message in self.log_messages:
                 f.write(message + "\n")
         self.log_messages.clear()  # clear the list after writing to file
@@ -127,4 +129,25 @@ class Logger:
                 instance.logs_directory = logs_directory
             instance.write_log_to_file(log_date)
             
-        cls.write_errors_to_file(log_date, logs_directory if one_directory else None)
\ No newline at end of file
+        cls.write_errors_to_file(log_date, logs_directory if one_directory else None)
+
+
+_error_loggers = {}
+_error_loggers_lock = threading.Lock()
+
+def log_error(name: str, message: str) -> None:
+    """Logs an error of a background thread and writes it to a file right away.
+
+    Logger.error() on the class only collects messages until write_all_logs() runs, which never
+    happens for threads outside of tasks and views.
+
+    Args:
+        name (str): The name of the log, also used as its user.
+        message (str): The error message.
+    """
+    with _error_loggers_lock:
+        if name not in _error_loggers:
+            _error_loggers[name] = Logger(name=name, user=name)
+        logger = _error_loggers[name]
+        logger.log(f"ERROR: {message}")
+        logger.write_log_to_file(log_date=False, append=True)
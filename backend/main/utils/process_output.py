@@ -1,4 +1,11 @@
+import os
+import selectors
 import threading
+import weakref
+from time import sleep
+from .logger import log_error
+
+_multiplexers = weakref.WeakSet()
 
 
 def reader_thread(pipe, log_callback: callable = None) -> None:
@@ -33,4 +40,194 @@ def stream_process_output(process, log_callback: callable = None) -> None:
     stdout_thread.join()
     stderr_thread.join()
 
-    process.wait()
\ No newline at end of file
+    process.wait()
+
+class _ProcessOutput:
+    def __init__(self, process, log_callback: callable, on_close: callable, echo: bool, decode: bool, streams: int):
+        self.process = process
+        self.log_callback = log_callback
+        self.on_close = on_close
+        self.echo = echo
+        self.decode = decode
+        self.open_streams = streams
+
+
+class _Stream:
+    def __init__(self, output: _ProcessOutput, pipe):
+        self.output = output
+        self.pipe = pipe
+        self.partial = b''
+
+
+class OutputMultiplexer:
+    def __init__(self, read_size: int = 64 * 1024, max_line: int = 1024 * 1024):
+        """Reads the stdout and stderr of any number of processes from a single thread.
+
+        The pipes are registered with a selector and read in large non-blocking chunks, lines are split
+        on bytes and only decoded if the callback wants text. Processes whose output has ended are
+        reaped, so no zombies are left behind. The thread, its selector and its wakeup pipe are created on
+        the first registration, and dropped in a forked child, which creates its own when it needs them.
+
+        Args:
+            read_size (int, optional): The maximum number of bytes read from a pipe at once. Defaults to 64 KB.
+            max_line (int, optional): The length after which an unterminated line is passed on as is. Defaults to 1 MB.
+        """
+        self.read_size = read_size
+        self.max_line = max_line
+        self.lines = 0
+        self._lock = threading.Lock()
+        self._reset()
+        _multiplexers.add(self)
+
+    def _reset(self) -> None:
+        # The selector and the wakeup pipe are created with the thread, a forked child starts over
+        self._selector = None
+        self._wakeup_read = self._wakeup_write = None
+        self._pending = []
+        self._exiting = []
+        self._thread = None
+
+    def _after_fork(self) -> None:
+        """Drops the state inherited from the parent, whose reader thread does not exist in the child."""
+        self._lock = threading.Lock()
+        if self._selector is not None:
+            self._selector.close()
+            os.close(self._wakeup_read)
+            os.close(self._wakeup_write)
+        self._reset()
+
+    def _start(self) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ)
+        self._thread = threading.Thread(target=self._run, name="process-output", daemon=True)
+        self._thread.start()
+
+    def add(self, process, log_callback: callable = None, on_close: callable = None, echo: bool = False, decode: bool = True) -> None:
+        """Starts reading the output of a process.
+
+        The pipes must not be read by anything else, they are read directly from their file descriptors.
+
+        Args:
+            process (subprocess.Popen): The process, with stdout and/or stderr set to PIPE.
+            log_callback (callable, optional): Called with every line, including the trailing newline. Defaults to None.
+            on_close (callable, optional): Called once all pipes of the process are closed. Defaults to None.
+            echo (bool, optional): Whether to also print every line to the console. Defaults to False.
+            decode (bool, optional): Whether to pass lines as str instead of bytes. Defaults to True.
+        """
+        pipes = [pipe for pipe in (process.stdout, process.stderr) if pipe is not None]
+        output = _ProcessOutput(process, log_callback, on_close, echo, decode, len(pipes))
+        with self._lock:
+            for pipe in pipes:
+                os.set_blocking(pipe.fileno(), False)
+                self._pending.append(_Stream(output, pipe))
+            if self._thread is None:
+                self._start()
+            self._wake_up()
+
+    def _wake_up(self) -> None:
+        try:
+            os.write(self._wakeup_write, b'\0')
+        except BlockingIOError:
+            pass  # The thread is already woken up
+
+    def _run(self) -> None:
+        while True:
+            try:
+                # Wake up periodically only while there are exited processes left to reap
+                events = self._selector.select(timeout=1 if self._exiting else None)
+            except Exception as e:
+                log_error("process_output", f"Waiting for process output failed: {e}")
+                sleep(1)
+                continue
+            for key, _ in events:
+                try:
+                    if key.fileobj == self._wakeup_read:
+                        self._register_pending()
+                    else:
+                        self._read(key.fileobj, key.data)
+                except Exception as e:
+                    # A failing stream is dropped, the other processes keep being read
+                    log_error("process_output", f"Reading process output failed: {e}")
+                    if key.data is not None:
+                        self._discard(key.fileobj, key.data)
+            try:
+                self._exiting = [process for process in self._exiting if process.poll() is None]
+            except Exception as e:
+                log_error("process_output", f"Reaping exited processes failed: {e}")
+
+    def _register_pending(self) -> None:
+        try:
+            while os.read(self._wakeup_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for stream in pending:
+            self._selector.register(stream.pipe.fileno(), selectors.EVENT_READ, stream)
+
+    def _read(self, fd: int, stream: _Stream) -> None:
+        try:
+            data = os.read(fd, self.read_size)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            if stream.partial:
+                self._emit(stream.output, stream.partial)
+            self._close(fd, stream)
+            return
+
+        *lines, stream.partial = (stream.partial + data).split(b'\n')
+        for line in lines:
+            self._emit(stream.output, line)
+        if len(stream.partial) >= self.max_line:
+            self._emit(stream.output, stream.partial)
+            stream.partial = b''
+
+    def _emit(self, output: _ProcessOutput, line: bytes) -> None:
+        self.lines += 1
+        line = line.rstrip(b'\r') + b'\n'
+        if output.decode or output.echo:
+            text = line.decode('utf-8', errors='replace')
+            if output.echo:
+                print(text, end='')
+        if output.log_callback:
+            try:
+                output.log_callback(text if output.decode else line)
+            except Exception as e:
+                log_error("process_output", f"Output callback of process {output.process.pid} failed: {e}")
+
+    def _close(self, fd: int, stream: _Stream) -> None:
+        self._selector.unregister(fd)
+        stream.pipe.close()
+        output = stream.output
+        output.open_streams -= 1
+        if output.open_streams == 0:
+            if output.process.poll() is None:
+                self._exiting.append(output.process)
+            if output.on_close:
+                try:
+                    output.on_close()
+                except Exception as e:
+                    log_error("process_output", f"Close callback of process {output.process.pid} failed: {e}")
+
+    def _discard(self, fd: int, stream: _Stream) -> None:
+        try:
+            self._close(fd, stream)
+        except Exception as e:
+            log_error("process_output", f"Closing the output of process {stream.output.process.pid} failed: {e}")
+
+
+def _reset_multiplexers_after_fork() -> None:
+    for multiplexer in list(_multiplexers):
+        multiplexer._after_fork()
+
+# Celery prefork children must not share the parent's selector, wakeup pipe and reader thread
+os.register_at_fork(after_in_child=_reset_multiplexers_after_fork)
+
+output_multiplexer = OutputMultiplexer()
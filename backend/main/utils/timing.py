@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+
+
+class PhaseTimer:
+    def __init__(self) -> None:
+        """Accumulates the time spent in named phases, safe to share between threads.
+
+        Phases running in parallel threads are summed, so the totals may exceed the wall-clock time.
+        """
+        self.totals = {}
+        self.counts = {}
+        self._lock = Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Measures the time spent inside the context.
+
+        Args:
+            name (str): The name of the phase.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        """Adds time to a phase.
+
+        Args:
+            name (str): The name of the phase.
+            seconds (float): The time to add in seconds.
+        """
+        with self._lock:
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def summary(self) -> str:
+        """Returns the totals formatted for logging.
+
+        Returns:
+            str: The phases with their total time and number of measurements.
+        """
+        with self._lock:
+            return ", ".join(f"{name} {total:.2f}s ({self.counts[name]}x)" for name, total in self.totals.items())
@@ -1,4 +1,6 @@
-from django.http import HttpResponse
+import asyncio
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from .serializers import *
@@ -7,14 +9,24 @@ from .models import *
 from django.contrib.auth import get_user_model, authenticate
 from django.utils import timezone
 from django.core.files.base import ContentFile
+from knox.auth import TokenAuthentication
 from knox.models import AuthToken
+from rest_framework.exceptions import AuthenticationFailed
 import psutil
 import platform
 from django.db import transaction
 from .modpreset.modpathing import check_installed
-from .modpreset.preset_extraction import preset_parser
+from .modpreset.preset_extraction import diff_workshop_ids
+from .modpreset.readiness import refresh_readiness
 from .modpreset.start_files import generate_sh_file, check_sh_file_exists, generate_server_config
+from .serverhandling.supervisor_client import SupervisorUnavailable, server_status
+from .steamcmd.rate_limit import rate_limit_governor
+from .steamcmd.steam_guard import steam_guard_provider
 from .utils.config import config
+from .utils.log_download import LogStream, accepts_gzip, close_log_parts, open_log_parts, parse_range
+from .utils.log_reader import PAGE_BYTES, PAGE_LINES, LogReader
+from .utils.log_sink import delete_log, log_segments
+from .utils.log_stream import get_log_broadcaster
 from .utils.logger import Logger
 from celery.result import AsyncResult
 from .tasks import *
@@ -22,6 +34,9 @@ from django.core.cache import cache
 from servermanager.celery import app as celery_app
 User = get_user_model()
 
+LOG_STREAM_RETRY_MS = 2000
+LOG_STREAM_HEARTBEAT = 15
+
 def message_response(data, message="Operacja się powiodła"):
     return Response({
         "result": data,
@@ -175,6 +190,17 @@ class ServicesViewset(viewsets.ViewSet):
             'cpuCount': cpu_count,
             'osName': os_name,
         })
+    
+    @action(detail=False, methods=["get"], url_path="download_throttle")
+    def getDownloadThrottle(self, request):
+        return Response({**rate_limit_governor.state(), "steam_guard": steam_guard_provider.metrics()})
+
+    @action(detail=False, methods=["get"], url_path="supervisor")
+    def getSupervisorStatus(self, request):
+        try:
+            return Response({"servers": server_status()})
+        except SupervisorUnavailable:
+            return Response({"message": "Nadzorca serwerów nie działa."}, status=503)
         
 class InstancesViewset(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
@@ -212,7 +238,7 @@ class InstancesViewset(viewsets.ModelViewSet):
                 available_port.save()
             
             create_logger = Logger(name="create", user=user.username)
-            mod_paths = preset_parser(instance.preset.path, log_callback=create_logger.log)
+            mod_paths = instance.refresh_preset_mods(log_callback=create_logger.log)
             if not user.server_config:
                 server_config_file_path = generate_server_config(user.username, "test", config.get("paths.arma3"), log_callback=create_logger.log)
                 user.server_config = server_config_file_path
@@ -220,6 +246,8 @@ class InstancesViewset(viewsets.ModelViewSet):
             start_file_path = generate_sh_file(instance.name, instance.port.port_number, user.username, mod_paths, config.get("paths.mods_directory"), config.get("paths.arma3"), log_callback=create_logger.log)
             instance.start_file_path = start_file_path
             instance.save()
+            refresh_readiness(instance_ids=[instance.id])
+            instance.refresh_from_db(fields=['is_ready'])
             create_logger.write_log_to_file()
 
             return message_response(self.serializer_class(instance).data, "Instancja została utworzona")
@@ -270,12 +298,10 @@ class InstancesViewset(viewsets.ModelViewSet):
             content_file = ContentFile(log_content.encode('utf-8'), name=log_filename)
             instance.log_file.save(log_filename, content_file, save=True)
 
-        workshop_ids = preset_parser(instance.preset.path, log_callback=start_logger.log)
-        mods_dir = config.get("paths.mods_directory")
-        if check_installed(wids=workshop_ids, mods_dir=mods_dir, log_callback=start_logger.log)[1]:
+        # Readiness is kept up to date by every mod install and removal
+        if not instance.is_ready:
+            start_logger.log(f"Instance {instance.name} is not ready, some mods are not installed.")
             start_logger.write_log_to_file()
-            instance.is_ready = False
-            instance.save()
             return Response({"message": "Niektóre mody są niezainstalowane. Proszę je najpierw pobrać."}, status=400)
         if not check_sh_file_exists(instance.name, log_callback=start_logger.log):
             start_logger.write_log_to_file()
@@ -340,6 +366,7 @@ class InstancesViewset(viewsets.ModelViewSet):
         
         
 
+        old_workshop_ids = instance.workshop_ids()
         serializer = self.serializer_class(instance, data=request.data, partial=True)
         if serializer.is_valid():
             if instance.preset and os.path.exists(instance.preset.path):
@@ -350,17 +377,48 @@ class InstancesViewset(viewsets.ModelViewSet):
             return Response(serializer.errors, status=400)
         
         change_preset_logger = Logger(name="change_preset", user=user.username)
-        mod_paths = preset_parser(instance.preset.path, log_callback=change_preset_logger.log)
+        mod_paths = instance.refresh_preset_mods(log_callback=change_preset_logger.log)
+        added_mods, removed_mods = diff_workshop_ids(old_workshop_ids, mod_paths)
+        change_preset_logger.log(f"Preset changed, added mods: {added_mods}, removed mods: {removed_mods}")
         
         if instance.start_file_path and os.path.exists(instance.start_file_path):
             os.remove(instance.start_file_path)
-        start_file_path = generate_sh_file(instance.name, instance.port.port_number, user.username, mod_paths, config.get("paths.mods_directory"), config.get("paths.arma3"), log_callback=change_preset_logger.log, is_admin_instance=True)
+        mods_dir = config.get("paths.mods_directory")
+        start_file_path = generate_sh_file(instance.name, instance.port.port_number, user.username, mod_paths, mods_dir, config.get("paths.arma3"), log_callback=change_preset_logger.log, is_admin_instance=True)
         instance.start_file_path = start_file_path
-        instance.is_ready = False
+        missing_mods = check_installed(wids=mod_paths, mods_dir=mods_dir, log_callback=change_preset_logger.log)[1]
+        instance.is_ready = not missing_mods
         instance.save()
+
+        # Only the mods that are not installed yet are downloaded, usually just the added ones
+        task_id = None
+        running_task_id = running_download_task(instance.id) if missing_mods else None
+        if missing_mods:
+            try:
+                task_id = download_mods_task.delay(
+                    instance_id=instance.id,
+                    user=user.username,
+                    name=instance.name,
+                    mods_directory=mods_dir,
+                    wids=missing_mods,
+                ).id
+            except Exception as e:
+                change_preset_logger.log(f"Failed to queue the download of mods {missing_mods}: {e}")
         
         change_preset_logger.write_log_to_file()
-        return message_response(self.serializer_class(instance).data, "Preset instancji głównej został zmieniony")
+        message = f"Preset instancji głównej został zmieniony. Dodano modów: {len(added_mods)}, usunięto: {len(removed_mods)}."
+        if task_id and running_task_id:
+            message += f" Pobieranie {len(missing_mods)} modów rozpocznie się po zakończeniu trwającego pobierania."
+        elif task_id:
+            message += f" Rozpoczęto pobieranie {len(missing_mods)} modów."
+        return Response({
+            "result": self.serializer_class(instance).data,
+            "message": message,
+            "added_mods": added_mods,
+            "removed_mods": removed_mods,
+            "task_id": task_id,
+            "queued_after": running_task_id if task_id else None,
+        })
 
     @action(detail=True, methods=['post'], url_path='download_mods')
     def download_mods(self, request, pk=None):
@@ -381,8 +439,8 @@ class InstancesViewset(viewsets.ModelViewSet):
                 instance_id=instance.id,
                 user=user.username,
                 name=instance.name,
-                file_path=instance.preset.path,
-                mods_directory=config.get("paths.mods_directory")
+                mods_directory=config.get("paths.mods_directory"),
+                update=str(request.data.get("update", "")).lower() in ("1", "true")
             )
         except Exception as e:
             return Response({"message": f"Nie udało się rozpocząć zadania pobierania: {str(e)}"}, status=500)
@@ -412,39 +470,37 @@ class InstancesViewset(viewsets.ModelViewSet):
         except Instances.DoesNotExist:
             return Response({"message": "Instancja nie została znaleziona"}, status=404)
         
-        tail = request.query_params.get('tail')
         try:
-            tail = int(tail) if tail else None
+            tail, start, end, since = (
+                int(request.query_params[name]) if request.query_params.get(name) else None
+                for name in ('tail', 'start', 'end', 'since')
+            )
         except ValueError:
-            return Response({"message": "Nieprawidłowa wartość parametru tail"}, status=400)
+            return Response({"message": "Nieprawidłowa wartość parametru tail, start, end lub since"}, status=400)
 
         log_path = instance.log_file.path if instance.log_file else None
-        if log_path and os.path.exists(log_path):
+        if not log_path or not (os.path.exists(log_path) or log_segments(log_path)):
+            return Response({"message": "Brak logów lub plik nie istnieje."}, status=404)
+
+        try:
+            reader = LogReader(log_path)
             if tail:
-                with open(log_path, 'rb') as f:
-                    f.seek(0, os.SEEK_END)
-                    buffer_size = 4096
-                    file_size = f.tell()
-                    buffer = b''
-                    lines_found = 0
-                    
-                    # Read file in chunks from the end
-                    while lines_found < tail and file_size > 0:
-                        read_pos = max(0, file_size - buffer_size)
-                        f.seek(read_pos)
-                        chunk = f.read(min(buffer_size, file_size))
-                        buffer = chunk + buffer
-                        lines_found = buffer.count(b'\n')
-                        file_size -= buffer_size
-                    
-                    lines = buffer.splitlines()
-                    content = b'\n'.join(lines[-tail:]).decode(errors='replace')
+                result = reader.tail(tail)
+            elif start is not None:
+                result = reader.read_lines(start, end if end is not None else start + PAGE_LINES)
             else:
-                with open(log_path, 'r', errors='replace') as f:
-                    content = f.read()
-            return Response(content, content_type="text/plain", status=200)
-        else:
-            return Response({"message": "Brak logów lub plik nie istnieje."}, status=404)
+                result = reader.read_since(since or 0, max_bytes=PAGE_BYTES)
+        except FileNotFoundError:
+            # Only rotated segments are left until the server writes again
+            result = {"content": "", "start_offset": 0, "end_offset": 0, "first_line": None, "line_count": 0, "size": 0}
+        # The offsets let the frontend page through the log or continue from where it stopped
+        return Response(result["content"], content_type="text/plain", status=200, headers={
+            "X-Log-Start-Offset": str(result["start_offset"]),
+            "X-Log-End-Offset": str(result["end_offset"]),
+            "X-Log-First-Line": "" if result["first_line"] is None else str(result["first_line"]),
+            "X-Log-Line-Count": str(result["line_count"]),
+            "X-Log-Size": str(result["size"]),
+        })
 
     @action(detail=True, methods=['get'], url_path='logs/download')
     def download_logs(self, request, pk=None):
@@ -453,14 +509,30 @@ class InstancesViewset(viewsets.ModelViewSet):
         except Instances.DoesNotExist:
             return Response({"message": "Instancja nie została znaleziona"}, status=404)
 
-        log_path = instance.log_file.path if instance.log_file else None
-        if log_path and os.path.exists(log_path):
-            with open(log_path, 'r', errors='replace') as f:
-                        logs = f.read()
-        else:
+        # Rotated segments and the active file are served as one log, read chunk by chunk
+        parts = open_log_parts(instance.log_file.path) if instance.log_file else []
+        if not parts:
             return Response({"message": "Brak logów do pobrania"}, status=404)
+        total = sum(part.size for part in parts)
+        try:
+            byte_range = parse_range(request.headers.get("Range", ""), total)
+        except ValueError:
+            close_log_parts(parts)
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{total}"
+            return response
 
-        response = HttpResponse(logs, content_type="text/plain")
+        start, end = byte_range or (0, total)
+        if byte_range is None and accepts_gzip(request.headers.get("Accept-Encoding", "")):
+            response = StreamingHttpResponse(LogStream(parts, start, end, compress=True), content_type="text/plain")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = StreamingHttpResponse(LogStream(parts, start, end), content_type="text/plain", status=206 if byte_range else 200)
+            response["Content-Length"] = str(end - start)
+            if byte_range:
+                response["Content-Range"] = f"bytes {start}-{end - 1}/{total}"
+        response["Accept-Ranges"] = "bytes"
+        response["Vary"] = "Accept-Encoding"
         response['Content-Disposition'] = f'attachment; filename="logs_{pk}.txt"'
         return response
     
@@ -477,6 +549,7 @@ class InstancesViewset(viewsets.ModelViewSet):
         if not instance.log_file:
             return Response({"message": "Brak logów do usunięcia"}, status=404)
 
+        delete_log(instance.log_file.path)
         instance.log_file.delete()
         instance.log_file = None
         instance.save()
@@ -494,4 +567,85 @@ class MissionsViewset(viewsets.ModelViewSet):
             mission = serializer.save()
             return message_response(self.serializer_class(mission).data, "Misja została wgrana")
         else:
-            return Response(serializer.errors, status=400)
\ No newline at end of file
+            return Response(serializer.errors, status=400)
+
+
+def _sse_event(offset: int, content: str, event: str = "log") -> str:
+    # An event without data lines is never dispatched by EventSource
+    data = "".join(f"data: {line}\n" for line in content.splitlines()) or "data: \n"
+    return f"id: {offset}\nevent: {event}\n{data}\n"
+
+def _stream_user(request):
+    # EventSource cannot send headers, so the knox token may also be passed as a query parameter
+    authenticator = TokenAuthentication()
+    try:
+        result = authenticator.authenticate(request)
+        if result is None and request.GET.get("token"):
+            result = authenticator.authenticate_credentials(request.GET["token"].encode())
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+async def _log_events(broadcaster, offset: int | None, tail: int | None):
+    queue, position = await broadcaster.subscribe()
+    try:
+        yield f"retry: {LOG_STREAM_RETRY_MS}\n\n"
+        reader = LogReader(broadcaster.log_path)
+        if offset is None and tail:
+            offset = (await asyncio.to_thread(reader.tail, tail))["start_offset"]
+        if offset is not None and offset > position:
+            offset = 0  # The log was rotated since the client's last event
+        # Lines written before subscribing are read from the file, everything after arrives through the queue
+        while offset is not None and offset < position:
+            result = await asyncio.to_thread(reader.read_since, offset, min(PAGE_BYTES, position - offset))
+            if result["end_offset"] <= offset:
+                break
+            yield _sse_event(result["end_offset"], result["content"])
+            offset = result["end_offset"]
+
+        while True:
+            try:
+                chunk = await asyncio.wait_for(queue.get(), LOG_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if chunk is None:
+                return  # Too slow to keep up, the client reconnects and resumes from its last event
+            start, end, content = chunk
+            if start < position:
+                yield _sse_event(end, "", event="rotated")
+            yield _sse_event(end, content)
+            position = end
+    finally:
+        broadcaster.unsubscribe(queue)
+
+async def stream_logs(request, pk: int):
+    """Streams new lines of an instance log as Server-Sent Events.
+
+    Every event carries the byte offset after its lines as its ID. A reconnecting EventSource sends
+    the last ID in the Last-Event-ID header and receives everything written since. A first connection
+    may pass offset to start from a byte offset or tail to start with the last lines. All clients
+    watching the same log in one process share one file watcher.
+    """
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({"message": "Brak uprawnień do podglądu logów."}, status=401)
+    try:
+        instance = await Instances.objects.aget(pk=pk)
+    except Instances.DoesNotExist:
+        return JsonResponse({"message": "Instancja nie została znaleziona"}, status=404)
+    if not instance.log_file:
+        return JsonResponse({"message": "Brak logów lub plik nie istnieje."}, status=404)
+
+    try:
+        offset = request.headers.get("Last-Event-ID") or request.GET.get("offset")
+        offset = int(offset) if offset else None
+        tail = int(request.GET["tail"]) if request.GET.get("tail") else None
+    except ValueError:
+        return JsonResponse({"message": "Nieprawidłowa wartość parametru offset lub tail"}, status=400)
+
+    broadcaster = get_log_broadcaster(instance.log_file.path)
+    response = StreamingHttpResponse(_log_events(broadcaster, offset, tail), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Stop a proxy from holding events back
+    return response
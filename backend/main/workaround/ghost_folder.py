@@ -1,8 +1,13 @@
+import json
 import os
 import shutil
+from threading import Lock
+from time import time
 
 
 class GhostFolder:
+    journal_name = "journal.json"
+
     def __init__(self, name: str, path: str, log_callback: callable = None) -> None:
         """Represents a ghost folder for temporarily storing downloaded files.
 
@@ -15,6 +20,8 @@ class GhostFolder:
         self.base_path = path
         self.ghost_folder_path = os.path.join(self.base_path, f"{self.name}_download_folder")
         self.log_callback = log_callback
+        self.journal_path = os.path.join(self.ghost_folder_path, self.journal_name)
+        self._journal_lock = Lock()
         self._create_folder()
 
     def _create_folder(self) -> None:
@@ -24,21 +31,93 @@ class GhostFolder:
         if self.log_callback:
             self.log_callback(f"Created ghost folder: {self.ghost_folder_path}")
 
-    def move_files(self, destination_path: str, internal_path: str = None) -> None:
+    def read_journal(self) -> dict | None:
+        """Reads the journal of the download stored in the ghost folder.
+
+        Returns:
+            dict | None: The journal, None if the folder has no journal.
+        """
+        try:
+            with open(self.journal_path, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_journal(self, journal: dict) -> None:
+        journal["updated_at"] = time()
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(journal, file)
+        os.replace(tmp_path, self.journal_path)
+
+    def start_journal(self, mods: list[str], task_id: str = None, hostname: str = None) -> dict:
+        """Starts or resumes the journal of a download.
+
+        Progress recorded by an interrupted download in the same folder is kept.
+
+        Args:
+            mods (list[str]): The workshop IDs of the mods to download.
+            task_id (str, optional): The ID of the task downloading the mods. Defaults to None.
+            hostname (str, optional): The name of the worker running the task. Defaults to None.
+
+        Returns:
+            dict: The journal.
+        """
+        with self._journal_lock:
+            journal = self.read_journal() or {"downloaded": [], "installed": [], "started_at": time()}
+            if journal.get("mods") and self.log_callback:
+                self.log_callback(f"Resuming download journal of {self.ghost_folder_path}, {len(journal['installed'])} mods already installed.")
+            journal["mods"] = sorted(set(journal.get("mods", [])) | set(map(str, mods)))
+            journal["task_id"] = task_id
+            journal["hostname"] = hostname
+            self._write_journal(journal)
+        return journal
+
+    def update_journal(self, downloaded: list[str] = None, installed: list[str] = None, **fields) -> dict:
+        """Records progress in the journal.
+
+        Args:
+            downloaded (list[str], optional): Workshop IDs that finished downloading. Defaults to None.
+            installed (list[str], optional): Workshop IDs moved out of the ghost folder. Defaults to None.
+            **fields: Other journal fields to set.
+
+        Returns:
+            dict: The updated journal.
+        """
+        with self._journal_lock:
+            journal = self.read_journal() or {"mods": [], "downloaded": [], "installed": [], "started_at": time()}
+            if downloaded:
+                journal["downloaded"] = sorted(set(journal["downloaded"]) | set(map(str, downloaded)))
+            if installed:
+                journal["installed"] = sorted(set(journal["installed"]) | set(map(str, installed)))
+            journal.update(fields)
+            self._write_journal(journal)
+        return journal
+
+    def move_files(self, destination_path: str, internal_path: str = None, items: list[str] = None) -> None:
         """Moves files from the ghost folder to a specified destination.
 
+        Items already present in the destination are replaced, so updated mods overwrite their old version.
+
         Args:
             destination_path (str): The path to the destination folder.
             internal_path (str, optional): The internal path within the ghost folder. Defaults to None.
+            items (list[str], optional): The names of the items to move. Defaults to None, which moves everything.
         """
         if internal_path is None:
             internal_path = self.ghost_folder_path
         else:
             internal_path = os.path.join(self.ghost_folder_path, internal_path)
         os.makedirs(destination_path, exist_ok=True)
-        for item_name in os.listdir(internal_path):
+        for item_name in os.listdir(internal_path) if items is None else map(str, items):
             source_item = os.path.join(internal_path, item_name)
+            if not os.path.lexists(source_item):
+                continue
             destination_item = os.path.join(destination_path, item_name)
+            if os.path.isdir(destination_item) and not os.path.islink(destination_item):
+                shutil.rmtree(destination_item)
+            elif os.path.lexists(destination_item):
+                os.remove(destination_item)
             shutil.move(source_item, destination_item)
             if self.log_callback:
                 self.log_callback(f"Moved {source_item} to {destination_item}")
@@ -1,12 +1,64 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+from ..modpreset.workshop_manifest import ModManifestStore
 
-def lowercase_addons_directory(wid: str, source_dir: str, log_callback: callable = None) -> None:
+def _lowercase_tree(path: str) -> int:
+    """Lowercases the names of all files and directories below a directory in a single walk.
+
+    Entries are renamed before descending into them, so every directory is scanned only once.
+
+    Args:
+        path (str): The directory to walk.
+
+    Returns:
+        int: The number of renamed entries.
+    """
+    renamed = 0
+    with os.scandir(path) as entries:
+        entries = list(entries)
+    for entry in entries:
+        entry_path = entry.path
+        lower_name = entry.name.lower()
+        if lower_name != entry.name:
+            entry_path = os.path.join(path, lower_name)
+            os.rename(entry.path, entry_path)
+            renamed += 1
+        if entry.is_dir(follow_symlinks=False):
+            renamed += _lowercase_tree(entry_path)
+    return renamed
+
+def lowercase_marker(addons_path: str) -> dict | None:
+    """Returns the marker describing the current state of an addons directory.
+
+    Adding, removing or renaming entries changes the modification time of the directory,
+    so a matching marker means the directory was not touched since it was lowercased.
+
+    Args:
+        addons_path (str): The path to the addons directory.
+
+    Returns:
+        dict | None: The modification time and the number of entries, None if the directory does not exist.
+    """
+    try:
+        stat = os.stat(addons_path)
+        with os.scandir(addons_path) as entries:
+            count = sum(1 for _ in entries)
+    except OSError:
+        return None
+    return {"mtime": stat.st_mtime_ns, "files": count}
+
+def lowercase_addons_directory(wid: str, source_dir: str, log_callback: callable = None, store: ModManifestStore = None, force: bool = False) -> bool:
     """Lowercases the names of all files and directories in the addons directory of a mod.
 
     Args:
         wid (str): The workshop ID of the mod.
         source_dir (str): The base directory where the mod is located.
         log_callback (callable, optional): A callback function for logging messages. Defaults to None.
+        store (ModManifestStore, optional): The manifest store keeping the lowercase markers. Defaults to None.
+        force (bool, optional): Whether to lowercase the mod even if its marker is up to date. Defaults to False.
+
+    Returns:
+        bool: True if the addons directory was walked, False if it was skipped or not found.
     """
     addons_path_lower = os.path.join(source_dir, str(wid), 'addons')
     addons_path_upper = os.path.join(source_dir, str(wid), 'Addons')
@@ -14,29 +66,44 @@ def lowercase_addons_directory(wid: str, source_dir: str, log_callback: callable
     if os.path.exists(addons_path_upper):
         os.rename(addons_path_upper, addons_path_lower)
 
-    if os.path.exists(addons_path_lower):
-        for root, dirs, files in os.walk(addons_path_lower, topdown=False):
-            for name in files:
-                src = os.path.join(root, name)
-                dst = os.path.join(root, name.lower())
-                if src != dst:
-                    os.rename(src, dst)
-
-            for name in dirs:
-                src = os.path.join(root, name)
-                dst = os.path.join(root, name.lower())
-                if src != dst:
-                    os.rename(src, dst)
-
-        for root, _, files in os.walk(addons_path_lower):
-            for name in files:
-                if name.lower().endswith('.pbo') or name.lower().endswith('.bisign'):
-                    src = os.path.join(root, name)
-                    dst = os.path.join(root, name.lower())
-                    if src != dst:
-                        os.rename(src, dst)
-        if log_callback:
-            log_callback(f"Lowercased addon directory for mod {wid}")
-    else:
+    if not os.path.exists(addons_path_lower):
         if log_callback:
-            log_callback(f"Addons directory not found for mod {wid}")
\ No newline at end of file
+            log_callback(f"Addons directory not found for mod {wid}")
+        return False
+
+    if store and not force:
+        manifest = store.get(wid) or {}
+        if manifest.get("lowercase_marker") and manifest["lowercase_marker"] == lowercase_marker(addons_path_lower):
+            return False
+
+    renamed = _lowercase_tree(addons_path_lower)
+    if store:
+        store.update(wid, lowercase_marker=lowercase_marker(addons_path_lower))
+    if log_callback:
+        log_callback(f"Lowercased addon directory for mod {wid} ({renamed} renamed)")
+    return True
+
+def lowercase_mods(wids: list[str], source_dir: str, store: ModManifestStore = None, force: bool = False, max_workers: int = None, log_callback: callable = None) -> list[str]:
+    """Lowercases the addons directories of many mods in parallel.
+
+    Args:
+        wids (list[str]): The workshop IDs of the mods.
+        source_dir (str): The base directory where the mods are located.
+        store (ModManifestStore, optional): The manifest store keeping the lowercase markers. Mods whose
+            marker is up to date are skipped. Defaults to None.
+        force (bool, optional): Whether to lowercase mods even if their marker is up to date. Defaults to False.
+        max_workers (int, optional): The number of threads. Defaults to the number of CPUs, at most 8.
+        log_callback (callable, optional): A callback function for logging messages. Defaults to None.
+
+    Returns:
+        list[str]: The workshop IDs of the mods that were walked.
+    """
+    if not wids:
+        return []
+    max_workers = max_workers or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(wids)), thread_name_prefix="lowercase") as executor:
+        results = executor.map(
+            lambda wid: lowercase_addons_directory(wid, source_dir, log_callback=log_callback, store=store, force=force),
+            wids,
+        )
+        return [wid for wid, walked in zip(wids, results) if walked]
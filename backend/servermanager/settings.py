@@ -96,6 +96,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'servermanager.wsgi.application'
+# The log stream is served as Server-Sent Events by an async view, which needs an ASGI server:
+# uvicorn servermanager.asgi:application
+ASGI_APPLICATION = 'servermanager.asgi.application'
 
 
 # Database
@@ -170,6 +173,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # CORS_ALLOW_ALL_ORIGINS = True # SECURITY WARNING: Don't run in production!
 CORS_ALLOWED_ORIGINS = env.list('CORS_ALLOWED_ORIGINS', default=['http://localhost:5173'])
 CORS_ALLOW_CREDENTIALS = not DEBUG
+CORS_EXPOSE_HEADERS = ["X-Log-Start-Offset", "X-Log-End-Offset", "X-Log-First-Line", "X-Log-Line-Count", "X-Log-Size"]
 
 # SSL configuration and other security settings
 SECURE_HSTS_SECONDS = 0 if DEBUG else 3600  # 1 hour
@@ -227,6 +231,7 @@ CELERY_TASK_QUEUES = {
 
 CELERY_TASK_ROUTES = {
     'main.tasks.download_mods_task': {'queue': 'download_queue'},
+    'main.tasks.retry_mods_task': {'queue': 'download_queue'},
 }
 
 # Celery Beat Schedule
@@ -235,4 +240,8 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'main.tasks.check_all_servers_status_task',
         'schedule': 1800.0,  # In seconds
     },
+    'evict-unused-mods': {
+        'task': 'main.tasks.evict_unused_mods_task',
+        'schedule': 3600.0,  # In seconds
+    },
 }
\ No newline at end of file